@@ -1,4 +1,6 @@
+import asyncio
 import json
+import logging
 from typing import Optional, List, Dict, Any
 
 from langchain_classic.agents import create_tool_calling_agent, AgentExecutor
@@ -8,7 +10,29 @@ from langchain_core.messages import messages_from_dict, messages_to_dict
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import BaseTool
 
+from core.callbacks import with_metrics_callback
+from core.config import settings
+from core.context_vars import request_namespace, request_usage, retrieval_prefetch
+from core.metrics import USAGE_BUDGET_EVENTS, stage_timer
 from services.llm_service import llm_service
+from services.llm_trace import ReplayTool, replay_trace, with_trace_recorder
+from services.memory_writer import WriteBehindVectorMemory
+from services.retrieval_prefetch import RetrievalPrefetch, start_prefetch
+from tools.retriever import fetch_documents, retrieve_context
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """Stops the agent loop early once the request's usage scope is over budget."""
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        scope = request_usage.get()
+        if scope is not None and scope.over_budget():
+            logger.warning("stopping agent after %d iterations, request %s is over budget", iterations, scope.request_id)
+            USAGE_BUDGET_EVENTS.labels("capped").inc()
+            return False
+        return super()._should_continue(iterations, time_elapsed)
 
 
 class BaseAgent:
@@ -20,33 +44,48 @@ class BaseAgent:
             pinecone_index=None,
             llm: Optional[BaseLanguageModel] = None,
             max_iterations: int = 2,
-            verbose: bool = True,
+            verbose: bool = settings.AGENT_VERBOSE,
             memory_config: Optional[Dict] = None,
             session_id: Optional[str] = None,
             storage_adapter=None,
+            autosave: bool = True,
     ):
-        self.llm = llm or llm_service.get_llm()
-        self.tools = tools
-        self.max_iterations = max_iterations
-        self.verbose = verbose
-        self.system_prompt = system_prompt
-        self.pinecone_index = pinecone_index
-        self.session_id = session_id
-        self.storage_adapter = storage_adapter
-
-        self.memory = self.setup_memory(memory_config or {})
-
-        self.prompt = self.build_prompt(system_prompt)
-
-        agent = create_tool_calling_agent(self.llm, self.tools, self.prompt)
-
-        self.agent_executor = AgentExecutor(
-            agent=agent,
-            tools=self.tools,
-            verbose=self.verbose,
-            max_iterations=self.max_iterations,
-        )
-        print("finished agent init")
+        with stage_timer("agent_construction"):
+            self.llm = llm or llm_service.get_llm()
+            self.tools = [with_metrics_callback(t) for t in self.trace_tools(tools)]
+            self.max_iterations = max_iterations
+            self.verbose = verbose
+            self.system_prompt = system_prompt
+            self.pinecone_index = pinecone_index
+            self.session_id = session_id
+            self.storage_adapter = storage_adapter
+            # long-lived agents (see services.session_cache) save their history when evicted instead
+            self.autosave = autosave
+            self.conversation_memory: Optional[ConversationBufferMemory] = None
+            self.history_loaded = False
+
+            self.memory = self.setup_memory(memory_config or {})
+
+            self.prompt = self.build_prompt(system_prompt)
+
+            # the model sees cache-marked tool definitions, the executor still runs the tool objects
+            agent = create_tool_calling_agent(self.llm, llm_service.cacheable_tools(self.tools, self.llm), self.prompt)
+
+            self.agent_executor = BudgetedAgentExecutor(
+                agent=agent,
+                tools=self.tools,
+                verbose=self.verbose,
+                max_iterations=self.max_iterations,
+            )
+        logger.debug("finished %s init", type(self).__name__)
+
+    @staticmethod
+    def trace_tools(tools: List[BaseTool]) -> List[BaseTool]:
+        if settings.TRACE_MODE == "record":
+            return [with_trace_recorder(t) for t in tools]
+        if settings.TRACE_MODE == "replay":
+            return [ReplayTool.replacing(t, replay_trace()) for t in tools]
+        return tools
 
     def setup_memory(self, config: Dict) -> CombinedMemory:
         memories = []
@@ -59,12 +98,21 @@ class BaseAgent:
                     output_key="output",
             )
 
-            if self.session_id and self.storage_adapter:
-                self.load_chat_history(conversation_memory)
-
+            # stored history is read on first use, alongside the long-term lookup
+            self.conversation_memory = conversation_memory
             memories.append(conversation_memory)
 
-        if config.get('vector_retriever'):
+        if config.get('vector_retriever') and config.get('memory_writer'):
+            memories.append(
+                WriteBehindVectorMemory(
+                    retriever=config['vector_retriever'],
+                    writer=config['memory_writer'],
+                    namespace=config.get('namespace'),
+                    memory_key="long_term_context",
+                    input_key="input",
+                )
+            )
+        elif config.get('vector_retriever'):
             memories.append(
                 VectorStoreRetrieverMemory(
                     retriever=config['vector_retriever'],
@@ -75,6 +123,14 @@ class BaseAgent:
 
         return CombinedMemory(memories=memories)
 
+    def ensure_chat_history(self):
+        if self.history_loaded:
+            return
+        self.history_loaded = True
+        if self.conversation_memory is not None and self.session_id and self.storage_adapter:
+            with stage_timer("storage_load"):
+                self.load_chat_history(self.conversation_memory)
+
     def load_chat_history(self, conversation_memory: ConversationBufferMemory):
         try:
             serialized_history = self.storage_adapter.load(self.session_id)
@@ -83,9 +139,9 @@ class BaseAgent:
                 messages = messages_from_dict(message_dicts)
 
                 conversation_memory.chat_memory.messages = messages
-                print(f"Loaded {len(messages)} messages from storage for session {self.session_id}")
-        except Exception as e:
-            print(f"Error loading chat history: {e}")
+                logger.debug("loaded %d messages from storage for session %s", len(messages), self.session_id)
+        except Exception:
+            logger.exception("error loading chat history for session %s", self.session_id)
 
     def save_chat_history(self):
         if not self.session_id or not self.storage_adapter or not self.memory:
@@ -98,14 +154,16 @@ class BaseAgent:
                     message_dicts = messages_to_dict(messages)
                     serialized = json.dumps(message_dicts)
 
-                    self.storage_adapter.save(self.session_id, serialized)
-                    print(f"saved {len(messages)} messages to storage for session {self.session_id}")
+                    with stage_timer("storage_save"):
+                        self.storage_adapter.save(self.session_id, serialized)
+                    logger.debug("saved %d messages to storage for session %s", len(messages), self.session_id)
                     break
-        except Exception as e:
-            print(f"Error saving chat history: {e}")
+        except Exception:
+            logger.exception("error saving chat history for session %s", self.session_id)
 
     def build_prompt(self, system_prompt: str) -> ChatPromptTemplate:
-        messages = [("system", system_prompt)]
+        # static system prompt first so it is a cacheable prefix; per-request context goes after it
+        messages = [llm_service.cacheable_system_message(system_prompt, self.llm)]
 
         if self.memory:
             for mem in self.memory.memories:
@@ -119,44 +177,87 @@ class BaseAgent:
             ("placeholder", "{agent_scratchpad}"),
         ])
 
-        print(messages)
+        logger.debug("prompt messages: %s", messages, extra={"sampled": True})
 
         return ChatPromptTemplate.from_messages(messages)
 
     def load_memory(self, query: str) -> Dict[str, Any]:
         if not self.memory:
             return {}
-        return self.memory.load_memory_variables({"input": query})
+        with stage_timer("memory_load"):
+            self.ensure_chat_history()
+            return self.memory.load_memory_variables({"input": query})
+
+    async def aload_memory(self, query: str) -> Dict[str, Any]:
+        if not self.memory:
+            return {}
+        inputs = {"input": query}
+        with stage_timer("memory_load"):
+            # the vector lookups are the slow part, so they run while the stored chat history is read
+            retrievers = [m for m in self.memory.memories if isinstance(m, VectorStoreRetrieverMemory)]
+            _, *retrieved = await asyncio.gather(
+                asyncio.to_thread(self.ensure_chat_history),
+                *(m.aload_memory_variables(inputs) for m in retrievers),
+            )
+
+            memory_vars = {}
+            for mem in self.memory.memories:
+                if not isinstance(mem, VectorStoreRetrieverMemory):
+                    memory_vars.update(mem.load_memory_variables(inputs))
+            for variables in retrieved:
+                memory_vars.update(variables)
+            return memory_vars
 
     def save_to_memory(self, input_text: str, output_text: str):
         if not self.memory:
-            print("not self.memory")
             return
         if isinstance(output_text, list):
             output_str_text = " ".join([x.get("text","") for x in output_text])
         else:
             output_str_text = str(output_text)
+        # never write back a history that was not read first
+        self.ensure_chat_history()
         self.memory.save_context(
             {"input": input_text},
             {"output": output_str_text},
         )
 
-        self.save_chat_history()
+        if self.autosave:
+            self.save_chat_history()
+
+    def start_retrieval_prefetch(self, query: str) -> Optional[RetrievalPrefetch]:
+        # a replayed retrieve_context never queries the index, so there is nothing to prefetch
+        if not settings.RETRIEVAL_PREFETCH_ENABLED or settings.TRACE_MODE == "replay":
+            return None
+        if not any(t.name == retrieve_context.name for t in self.tools):
+            return None
+        return start_prefetch(query, request_namespace.get(), fetch_documents)
 
     async def run(self, query: str) -> Dict[str, Any]:
-        memory_vars = self.load_memory(query)
+        # the first step almost always retrieves for the query itself, so start that now
+        # and let it overlap the memory load and the first LLM call
+        prefetch = self.start_retrieval_prefetch(query)
+        token = retrieval_prefetch.set(prefetch)
+        try:
+            return await self.run_agent(query)
+        finally:
+            retrieval_prefetch.reset(token)
+            if prefetch is not None:
+                prefetch.finish()
+
+    async def run_agent(self, query: str) -> Dict[str, Any]:
+        memory_vars = await self.aload_memory(query)
 
-        print(f"Input to agent: {query}")
-        print(f"Memory vars: {memory_vars}")
+        logger.info("running %s", type(self).__name__)
+        logger.debug("agent input: %s memory vars: %s", query, memory_vars, extra={"sampled": True})
 
-        result = await self.agent_executor.ainvoke({
-            "input": query,
-            **memory_vars
-        })
+        with stage_timer("agent_run"):
+            result = await self.agent_executor.ainvoke({
+                "input": query,
+                **memory_vars
+            })
 
-        print(f"Result keys: {result.keys() if isinstance(result, dict) else 'Not a dict'}")
-        print(f"Result type: {type(result)}")
-        print(f"Result content: {result}")
+        logger.debug("agent result: %s", result, extra={"sampled": True})
 
         # Safe extraction
         try:
@@ -168,8 +269,6 @@ class BaseAgent:
             self.save_to_memory(query, output)
 
             return {"output": output}
-        except Exception as e:
-            print(f"Error processing result: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("error processing agent result")
             raise
@@ -5,7 +5,9 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import BaseTool
 
 from agents.base_agent import BaseAgent
+from core.config import settings
 from services.llm_service import llm_service
+from services.memory_writer import vector_memory_writer
 
 
 class ChatAgent(BaseAgent):
@@ -21,9 +23,11 @@ class ChatAgent(BaseAgent):
             pinecone_index=None,
             llm: Optional[BaseLanguageModel] = None,
             max_iterations: int = 6,
-            verbose: bool = True,
+            verbose: bool = settings.AGENT_VERBOSE,
             session_id: Optional[str] = None,
             storage_adapter=None,
+            namespace: Optional[str] = None,
+            autosave: bool = True,
     ):
         super().__init__(
             tools=tools,
@@ -34,12 +38,14 @@ class ChatAgent(BaseAgent):
             verbose=verbose,
             memory_config={
                 'short_term': True,
-                'vector_retriever': vector_retriever
+                'vector_retriever': vector_retriever,
+                'memory_writer': vector_memory_writer if settings.MEMORY_WRITE_BEHIND else None,
+                'namespace': namespace,
             },
             session_id=session_id,
             storage_adapter=storage_adapter,
+            autosave=autosave,
         )
-        print("finished agent init")
 
     async def research(self, query: str) -> Dict[str, Any]:
         return await self.run(query)
@@ -5,6 +5,7 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import BaseTool
 
 from agents.base_agent import BaseAgent
+from core.config import settings
 from services.llm_service import llm_service
 
 
@@ -21,7 +22,7 @@ class ResearchAgent(BaseAgent):
             pinecone_index=None,
             llm: Optional[BaseLanguageModel] = None,
             max_iterations: int = 6,
-            verbose: bool = True,
+            verbose: bool = settings.AGENT_VERBOSE,
     ):
         super().__init__(
             tools=tools,
@@ -32,8 +33,6 @@ class ResearchAgent(BaseAgent):
             verbose=verbose,
             memory_config=None
         )
-        print(pinecone_index)
-        print("finished agent init")
 
     async def research(self, query: str) -> Dict[str, Any]:
         return await self.run(query)
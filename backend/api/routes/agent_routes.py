@@ -1,86 +1,121 @@
+from typing import Awaitable, Callable, Tuple
+
 from fastapi import APIRouter, HTTPException
-from agents.chat_agent import create_chat_agent
-from agents.research_agent import create_research_agent
-from chains.query_decomposition_chain import QueryDecompositionChain
 from core.config import settings
 from core.context_vars import request_namespace
+from core.singleflight import SingleFlight, normalize_query
 from models.agent_models import AgentResponse, AgentRequest
-from services.llm_service import llm_service
-from services.pinecone_vector_service import pinecone_vector_service
-from storage_adapters.file_storage_adapter import FileStorageAdapter
-from tools.retriever import retrieve_context
-from tools.web_search import get_search_web_ddg
+from services.job_queue import research_queue, RESEARCH, DECOMPOSE
+from services.query_router import query_router, Route
+from services.research_runner import output_text, run_direct, run_research_agent, run_decomposition
+from services.session_cache import session_agent_cache, create_session_chat_agent
+from services.usage_accounting import BudgetExceeded, usage_payload, usage_scope
 
 router = APIRouter()
 
+# shared by /research and /research_harder; the endpoint is part of the key
+agent_singleflight = SingleFlight("agents", result_ttl=settings.AGENT_RESULT_CACHE_TTL)
+
 
 @router.post("/chat_agentically", response_model=AgentResponse)
 async def chat_agent(request: AgentRequest):
+    request_namespace.set(request.namespace)
     try:
-        tools = [get_search_web_ddg(), retrieve_context]
-        storage = FileStorageAdapter()
+        with usage_scope("/api/agents/chat_agentically", request.namespace, request.session_id):
+            if request.session_id and settings.SESSION_CACHE_ENABLED:
+                config = (request.namespace, request.max_iterations)
+                async with session_agent_cache.session(request.session_id, config) as agent:
+                    result = await agent.research(
+                        query=request.query
+                    )
+            else:
+                agent = create_session_chat_agent(
+                    request.session_id, (request.namespace, request.max_iterations), autosave=True
+                )
+                result = await agent.research(
+                    query=request.query
+                )
+
+        return AgentResponse(response=output_text(result.get("output", "")))
+
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error in agent execution: {str(e)}")
 
-        vector_retriever = pinecone_vector_service.get_vectorstore(
-            namespace=request.namespace
-        ).as_retriever()
 
-        agent = create_chat_agent(
-            max_iterations=request.max_iterations,
-            tools=tools,
-            pinecone_index=pinecone_vector_service.pc.Index(settings.PINECONE_INDEX_NAME),
-            vector_retriever=vector_retriever,
-            session_id=request.session_id,
-            storage_adapter=storage,
-        )
+def agent_request_key(endpoint: str, request: AgentRequest) -> Tuple:
+    return (
+        endpoint,
+        normalize_query(request.query),
+        request.namespace,
+        request.max_iterations,
+        request.temperature,
+        request.max_tokens,
+        request.route,
+    )
 
-        result = await agent.research(
-            query=request.query
-        )
 
-        output = result.get("output", "")
+async def coalesced(
+        endpoint: str,
+        request: AgentRequest,
+        run: Callable[[AgentRequest], Awaitable[AgentResponse]]
+) -> AgentResponse:
+    if not settings.AGENT_SINGLEFLIGHT_ENABLED:
+        return await run(request)
+    return await agent_singleflight.do(agent_request_key(endpoint, request), lambda: run(request))
 
-        if isinstance(output, list) and len(output) > 0:
-            response_text = output[0].get('text', str(output))
-        elif isinstance(output, str):
-            response_text = output
-        else:
-            response_text = str(output)
 
-        return AgentResponse(response=response_text)
+def queue_payload(request: AgentRequest) -> dict:
+    return {
+        "query": request.query,
+        "namespace": request.namespace,
+        "max_iterations": request.max_iterations,
+        **usage_payload(),
+    }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in agent execution: {str(e)}")
 
+async def execute_route(route: Route, request: AgentRequest) -> str:
+    if route == "direct":
+        return await run_direct(request.query, request.temperature, request.max_tokens)
 
-@router.post("/research", response_model=AgentResponse)
-async def research_agent(request: AgentRequest):
-    try:
-        namespace = request.namespace
-        request_namespace.set(namespace)
+    if route == "agent":
+        if settings.RESEARCH_EXECUTION == "queue":
+            return await research_queue.call(RESEARCH, queue_payload(request))
+        return await run_research_agent(request.query, request.namespace, request.max_iterations)
+
+    if settings.RESEARCH_EXECUTION == "queue":
+        result = await research_queue.call(DECOMPOSE, queue_payload(request))
+    else:
+        result = await run_decomposition(request.query, request.namespace, request.max_iterations)
+    return result["final_answer"]
 
-        tools = [get_search_web_ddg(), retrieve_context]
 
-        agent = create_research_agent(
-            max_iterations=request.max_iterations,
-            tools=tools,
-            pinecone_index=pinecone_vector_service.pc.Index(settings.PINECONE_INDEX_NAME),
-        )
+async def run_routed(endpoint: str, ceiling: Route, request: AgentRequest) -> AgentResponse:
+    route = ceiling
+    if settings.QUERY_ROUTER_ENABLED or request.route not in (None, "auto"):
+        decision = await query_router.route(request.query, endpoint, ceiling, request.route)
+        route = decision.route
 
-        result = await agent.research(
-            query=request.query
-        )
+    return AgentResponse(response=await execute_route(route, request), route=route)
 
-        output = result.get("output", "")
 
-        if isinstance(output, list) and len(output) > 0:
-            response_text = output[0].get('text', str(output))
-        elif isinstance(output, str):
-            response_text = output
-        else:
-            response_text = str(output)
+async def run_research(request: AgentRequest) -> AgentResponse:
+    return await run_routed("research", "agent", request)
 
-        return AgentResponse(response=response_text)
 
+async def run_research_harder(request: AgentRequest) -> AgentResponse:
+    return await run_routed("research_harder", "decompose", request)
+
+
+@router.post("/research", response_model=AgentResponse)
+async def research_agent(request: AgentRequest):
+    try:
+        with usage_scope("/api/agents/research", request.namespace):
+            return await coalesced("research", request, run_research)
+
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in agent execution: {str(e)}")
 
@@ -88,26 +123,10 @@ async def research_agent(request: AgentRequest):
 @router.post("/research_harder", response_model=AgentResponse)
 async def research_agent_subquery(request: AgentRequest):
     try:
-        namespace = request.namespace
-        request_namespace.set(namespace)
-
-        tools = [get_search_web_ddg(), retrieve_context]
-        agent = create_research_agent(
-            max_iterations=request.max_iterations,
-            tools=tools,
-            pinecone_index=pinecone_vector_service.pc.Index(settings.PINECONE_INDEX_NAME),
-        )
-
-        decomp_chain = QueryDecompositionChain(
-            llm=llm_service.get_llm(),
-            research_agent=agent
-        )
-
-        result = await decomp_chain.arun(request.query)
-
-        return AgentResponse(
-            response=result["final_answer"]
-        )
+        with usage_scope("/api/agents/research_harder", request.namespace):
+            return await coalesced("research_harder", request, run_research_harder)
 
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in agent execution: {str(e)}")
@@ -1,39 +1,94 @@
 import os
+from functools import partial
+from typing import List
 from fastapi import APIRouter, HTTPException
-from models.chat_models import Message, ChatRequest, ChatResponse
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from fastapi.responses import StreamingResponse
+from models.chat_models import Message, ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchItem
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from core.admission import admission_controller
+from core.config import settings
+from services.batch_runner import ndjson_lines, run_bounded
 from services.llm_service import llm_service
+from services.usage_accounting import BudgetExceeded, activate_scope, open_usage_scope, usage_scope
 
 router = APIRouter()
 
+CHAT_BATCH_ITEMS_PATH = "/api/chat/batch/items"
+
+
+def to_langchain_messages(request: ChatRequest) -> List[BaseMessage]:
+    lc_messages = []
+
+    if request.system_prompt:
+        lc_messages.append(SystemMessage(content=request.system_prompt))
+
+    for msg in request.messages:
+        if msg.role == "user":
+            lc_messages.append(HumanMessage(content=msg.content))
+        elif msg.role == "assistant":
+            lc_messages.append(AIMessage(content=msg.content))
+        elif msg.role == "system":
+            lc_messages.append(SystemMessage(content=msg.content))
+
+    return lc_messages
+
+
+async def complete(request: ChatRequest) -> ChatResponse:
+    llm_with_params = llm_service.get_llm(
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+    )
+
+    response = await llm_with_params.ainvoke(to_langchain_messages(request))
+
+    return ChatResponse(
+        response=response.content,
+        model=llm_with_params.model
+    )
+
+
+async def complete_admitted(request: ChatRequest) -> ChatResponse:
+    # the batch request holds a single slot, so each fanned-out call is admitted on its own
+    if not settings.ADMISSION_ENABLED:
+        return await complete(request)
+    async with admission_controller.slot(CHAT_BATCH_ITEMS_PATH):
+        return await complete(request)
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     try:
-        lc_messages = []
+        with usage_scope("/api/chat/chat"):
+            return await complete(request)
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
-        if request.system_prompt:
-            lc_messages.append(SystemMessage(content=request.system_prompt))
 
-        for msg in request.messages:
-            if msg.role == "user":
-                lc_messages.append(HumanMessage(content=msg.content))
-            elif msg.role == "assistant":
-                lc_messages.append(AIMessage(content=msg.content))
-            elif msg.role == "system":
-                lc_messages.append(SystemMessage(content=msg.content))
+@router.post("/batch")
+async def chat_batch(request: ChatBatchRequest):
+    """Streams one ChatBatchItem per line (NDJSON) in completion order; match lines up by index."""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_ITEMS} items per batch")
 
-        llm_with_params = llm_service.get_llm(
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-        )
+    try:
+        # one scope for the whole batch, checked before anything is streamed
+        scope = open_usage_scope("/api/chat/batch")
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
-        response = await llm_with_params.ainvoke(lc_messages)
+    concurrency = min(request.concurrency or settings.CHAT_BATCH_CONCURRENCY, settings.CHAT_BATCH_CONCURRENCY)
+    jobs = [partial(complete_admitted, item) for item in request.items]
 
-        return ChatResponse(
-            response=response.content,
-            model=llm_with_params.model
-        )
+    async def items():
+        with activate_scope(scope):
+            async for index, response, error in run_bounded(jobs, concurrency):
+                if error is not None:
+                    yield ChatBatchItem(index=index, error=f"Error processing chat: {error}")
+                else:
+                    yield ChatBatchItem(index=index, response=response.response, model=response.model)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+    return StreamingResponse(ndjson_lines("chat", items()), media_type="application/x-ndjson")
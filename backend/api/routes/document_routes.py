@@ -1,71 +1,258 @@
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Form, UploadFile, File
+from functools import partial
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from langchain_core.documents import Document
 from models.document_models import DocumentUploadResponse, DocumentSearchResponse, DocumentSearchRequest, DocumentChunk, \
-    NamespaceDeleteResponse
-from services.document_service import document_vector_pipeline
+    NamespaceDeleteResponse, TabularUploadResponse, DocumentInfo, DocumentListResponse, NamespaceStatsResponse, \
+    DocumentDeleteResponse, SearchOptions, DocumentSearchBatchRequest, DocumentSearchBatchItem
+from services.batch_runner import ndjson_lines, run_bounded
+from services.document_catalog import DocumentRecord
+from services.document_service import document_vector_pipeline, DocumentExistsError
 from services.pinecone_vector_service import pinecone_vector_service
+from services.retrieval_ranking import diverse_search
+from core.config import settings
+import asyncio
 import json
 
 router = APIRouter()
 
 
+def document_info(record: DocumentRecord) -> DocumentInfo:
+    return DocumentInfo(
+        document_id=record.document_id,
+        filename=record.filename,
+        namespace=record.namespace,
+        chunk_count=record.chunk_count,
+        char_count=record.char_count,
+        metadata=record.metadata,
+        created_at=record.created_at,
+        updated_at=record.updated_at
+    )
+
+
+async def store_document(
+        file: UploadFile,
+        namespace: Optional[str],
+        metadata: Optional[str],
+        document_id: Optional[str],
+        replace: bool
+) -> DocumentUploadResponse:
+    try:
+        meta_dict = None
+        if metadata:
+            meta_dict = json.loads(metadata)
+
+        # UploadFile is already spooled by starlette, so hand the stream over rather than copying it into memory
+        record = await asyncio.to_thread(
+            document_vector_pipeline.process_and_upload,
+            file_data=file.file,
+            filename=file.filename,
+            namespace=namespace,
+            metadata=meta_dict,
+            document_id=document_id,
+            replace=replace
+        )
+
+        return DocumentUploadResponse(
+            message="Doc replaced" if replace else "Doc uploaded",
+            namespace=namespace,
+            document_id=record.document_id,
+            document_count=record.chunk_count
+        )
+    except DocumentExistsError as e:
+        raise HTTPException(status_code=409, detail=f"{e}; use PUT /catalog/{{document_id}} to replace it")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
+
+
 @router.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(
         file: UploadFile = File(...),
         namespace: Optional[str] = Form(None),
-        metadata: Optional[str] = Form(None)
+        metadata: Optional[str] = Form(None),
+        document_id: Optional[str] = Form(None)
 ):
+    return await store_document(file, namespace, metadata, document_id, replace=False)
+
+
+@router.post("/upload_tabular", response_model=TabularUploadResponse)
+async def upload_tabular(
+        file: UploadFile = File(...),
+        namespace: Optional[str] = Form(None),
+        metadata: Optional[str] = Form(None),
+        rows_per_chunk: int = Form(settings.TABULAR_ROWS_PER_CHUNK),
+        metadata_columns: Optional[str] = Form(None),
+        document_id: Optional[str] = Form(None),
+        replace: bool = Form(False)
+):
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Tabular upload only supports .csv files")
+    if rows_per_chunk < 1:
+        raise HTTPException(status_code=400, detail="rows_per_chunk must be at least 1")
+
     try:
-        file_bytes = await file.read()
         meta_dict = None
         if metadata:
             meta_dict = json.loads(metadata)
+        columns = [c.strip() for c in metadata_columns.split(",") if c.strip()] if metadata_columns else None
 
-        vectorstore = document_vector_pipeline.process_and_upload(
-            file_data=file_bytes,
+        row_count, record = await asyncio.to_thread(
+            document_vector_pipeline.process_and_upload_tabular,
+            file_data=file.file,
             filename=file.filename,
             namespace=namespace,
-            metadata=meta_dict
+            metadata=meta_dict,
+            rows_per_chunk=rows_per_chunk,
+            metadata_columns=columns,
+            document_id=document_id,
+            replace=replace
         )
 
-        return DocumentUploadResponse(
-            message="Doc uploaded",
+        return TabularUploadResponse(
+            message="Table uploaded",
             namespace=namespace,
-            document_count=len(vectorstore._texts) if hasattr(vectorstore, "_texts") else 0
+            document_id=record.document_id,
+            document_count=record.chunk_count,
+            row_count=row_count
         )
+    except DocumentExistsError as e:
+        raise HTTPException(status_code=409, detail=f"{e}; set replace=true to replace it")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error uploading table: {str(e)}")
+
+
+def search_by_vector(options: SearchOptions, query_vector: List[float]) -> List[Document]:
+    if options.search_type == "mmr":
+        return diverse_search(
+            pinecone_vector_service,
+            query_vector,
+            k=options.k,
+            fetch_k=options.fetch_k or max(settings.RETRIEVER_FETCH_K, options.k),
+            lambda_mult=settings.RETRIEVER_MMR_LAMBDA if options.lambda_mult is None else options.lambda_mult,
+            namespace=options.namespace,
+            filter=options.filter,
+        )
+    return pinecone_vector_service.similarity_search_by_vector(
+        query_vector,
+        k=options.k,
+        namespace=options.namespace,
+        filter=options.filter,
+    )
+
+
+def document_chunks(documents: List[Document]) -> List[DocumentChunk]:
+    return [DocumentChunk(page_content=doc.page_content, metadata=doc.metadata) for doc in documents]
 
 
 @router.post("/search", response_model=DocumentSearchResponse)
 async def search_documents(request: DocumentSearchRequest):
     try:
-        results = pinecone_vector_service.similarity_search(
-            query=request.query,
-            k=request.k,
-            namespace=request.namespace,
-            filter=request.filter,
-        )
-        return DocumentSearchResponse(
-            results=[
-                DocumentChunk(
-                    page_content=doc.page_content,
-                    metadata=doc.metadata
-                )
-                for doc in results
-            ]
-        )
+        query_vector = await asyncio.to_thread(pinecone_vector_service.embeddings.embed_query, request.query)
+        results = await asyncio.to_thread(search_by_vector, request, query_vector)
+        return DocumentSearchResponse(results=document_chunks(results))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching: {e}")
 
 
+@router.post("/search/batch")
+async def search_documents_batch(request: DocumentSearchBatchRequest):
+    """Streams one DocumentSearchBatchItem per line (NDJSON) in completion order; match lines up by index."""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries must not be empty")
+    if len(request.queries) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_MAX_ITEMS} queries per batch")
+
+    try:
+        # one batched encode for every distinct query instead of one embedding call per query
+        unique_queries = list(dict.fromkeys(request.queries))
+        vectors = await asyncio.to_thread(pinecone_vector_service.embeddings.embed_documents, unique_queries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error embedding queries: {e}")
+    by_query = dict(zip(unique_queries, vectors))
+
+    concurrency = min(request.concurrency or settings.SEARCH_BATCH_CONCURRENCY, settings.SEARCH_BATCH_CONCURRENCY)
+    jobs = [partial(asyncio.to_thread, search_by_vector, request, by_query[query]) for query in request.queries]
+
+    async def items():
+        async for index, results, error in run_bounded(jobs, concurrency):
+            query = request.queries[index]
+            if error is not None:
+                yield DocumentSearchBatchItem(index=index, query=query, error=f"Error searching: {error}")
+            else:
+                yield DocumentSearchBatchItem(index=index, query=query, results=document_chunks(results))
+
+    return StreamingResponse(ndjson_lines("documents_search", items()), media_type="application/x-ndjson")
+
+
 @router.delete("/namespace/{namespace}", response_model=NamespaceDeleteResponse)
 async def delete_namespace(namespace: str):
     try:
-        pinecone_vector_service.delete_namespace(namespace)
+        await asyncio.to_thread(document_vector_pipeline.delete_namespace, namespace)
         return NamespaceDeleteResponse(
             message="Namespace deleted :)",
             namespace=namespace
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting namespace: {e}")
+
+
+@router.get("/catalog", response_model=DocumentListResponse)
+async def list_documents(
+        namespace: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000),
+        offset: int = Query(0, ge=0)
+):
+    records = document_vector_pipeline.catalog.list_documents(namespace, limit=limit, offset=offset)
+    return DocumentListResponse(
+        namespace=namespace,
+        documents=[document_info(record) for record in records]
+    )
+
+
+@router.get("/stats", response_model=NamespaceStatsResponse)
+async def namespace_stats(namespace: Optional[str] = None):
+    stats = document_vector_pipeline.catalog.stats(namespace)
+    return NamespaceStatsResponse(
+        namespace=namespace,
+        document_count=stats.document_count,
+        chunk_count=stats.chunk_count,
+        char_count=stats.char_count,
+        last_updated=stats.last_updated
+    )
+
+
+@router.get("/catalog/{document_id:path}", response_model=DocumentInfo)
+async def get_document(document_id: str, namespace: Optional[str] = None):
+    record = document_vector_pipeline.catalog.get_document(namespace, document_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document_info(record)
+
+
+@router.put("/catalog/{document_id:path}", response_model=DocumentUploadResponse)
+async def replace_document(
+        document_id: str,
+        file: UploadFile = File(...),
+        namespace: Optional[str] = Form(None),
+        metadata: Optional[str] = Form(None)
+):
+    return await store_document(file, namespace, metadata, document_id, replace=True)
+
+
+@router.delete("/catalog/{document_id:path}", response_model=DocumentDeleteResponse)
+async def delete_document(document_id: str, namespace: Optional[str] = None):
+    try:
+        record = await asyncio.to_thread(document_vector_pipeline.delete_document, document_id, namespace)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting document: {e}")
+    if record is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return DocumentDeleteResponse(
+        message="Doc deleted",
+        namespace=namespace,
+        document_id=document_id,
+        chunk_count=record.chunk_count
+    )
@@ -0,0 +1,86 @@
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from models.agent_models import AgentRequest
+from models.job_models import JobSubmitResponse, JobStatusResponse, JobEvent
+from services.job_service import job_service, Job, JobQueueFull
+from services.research_runner import run_decomposition
+from services.usage_accounting import BudgetExceeded, activate_scope, open_usage_scope
+
+router = APIRouter()
+
+
+def job_status(job: Job) -> JobStatusResponse:
+    return JobStatusResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        progress=[JobEvent(**event) for event in job.events if event["event"] != "status"],
+        result=job.result,
+        error=job.error,
+    )
+
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+@router.post("/research_harder", response_model=JobSubmitResponse, status_code=202)
+async def submit_research_harder(request: AgentRequest):
+    # checked at submission; the job itself runs on a worker task, outside this request's context
+    try:
+        scope = open_usage_scope("/api/jobs/research_harder", request.namespace)
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    async def run(job: Job):
+        # decomposition and synthesis run here so progress can be published;
+        # sub-questions still fan out to the worker fleet when RESEARCH_EXECUTION=queue
+        with activate_scope(scope):
+            return await run_decomposition(
+                request.query,
+                request.namespace,
+                request.max_iterations,
+                on_progress=job.publish,
+            )
+
+    try:
+        job = job_service.submit("research_harder", run)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    return JobSubmitResponse(job_id=job.id, status=job.status)
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    return job_status(get_job_or_404(job_id))
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    job = get_job_or_404(job_id)
+
+    async def stream():
+        # replays everything published so far, then follows the job until it finishes
+        index = 0
+        async for event in job_service.subscribe(job):
+            payload = json.dumps(event["data"], default=str)
+            yield f"id: {index}\nevent: {event['event']}\ndata: {payload}\n\n"
+            index += 1
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+@router.delete("/{job_id}", response_model=JobStatusResponse)
+async def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return job_status(job_service.cancel(job_id))
@@ -0,0 +1,36 @@
+import asyncio
+import time
+from dataclasses import asdict
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from models.usage_models import UsageGroup, UsageRow, UsageSummaryResponse, BudgetStatusResponse, BudgetListResponse
+from services.usage_accounting import usage_tracker
+
+router = APIRouter()
+
+
+@router.get("/summary", response_model=UsageSummaryResponse)
+async def usage_summary(
+        group_by: UsageGroup = "namespace",
+        since_hours: float = Query(24.0, gt=0),
+        namespace: Optional[str] = None,
+        limit: int = Query(100, ge=1, le=1000)
+):
+    since = time.time() - since_hours * 3600
+    rows = await asyncio.to_thread(usage_tracker.summary, group_by, since, namespace, limit)
+    return UsageSummaryResponse(
+        group_by=group_by,
+        since=since,
+        rows=[UsageRow(**asdict(row)) for row in rows]
+    )
+
+
+@router.get("/budgets", response_model=BudgetListResponse)
+async def usage_budgets():
+    statuses = await asyncio.to_thread(usage_tracker.budget_statuses)
+    return BudgetListResponse(
+        window_seconds=usage_tracker.budget_window,
+        budgets=[BudgetStatusResponse(**asdict(status)) for status in statuses]
+    )
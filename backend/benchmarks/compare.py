@@ -0,0 +1,48 @@
+"""Compare two benchmark result files, e.g. from before and after a change.
+
+    python -m benchmarks.compare base.json head.json
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(r["endpoint"], r["concurrency"]): r for r in report["results"]}
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    args = parser.parse_args(argv)
+
+    base_report, base = load(args.base)
+    head_report, head = load(args.head)
+    print(f"base {base_report['meta']['commit'][:10]}  head {head_report['meta']['commit'][:10]}")
+    print(f"{'endpoint':32s} {'conc':>4s} {'rps':>10s} {'p50':>10s} {'p95':>10s} {'p99':>10s} {'rss':>10s}")
+
+    for key in sorted(base.keys() & head.keys()):
+        b, h = base[key], head[key]
+        print(
+            f"{key[0]:32s} {key[1]:4d} "
+            f"{change(b['throughput_rps'], h['throughput_rps']):>10s} "
+            f"{change(b['latency_ms']['p50'], h['latency_ms']['p50']):>10s} "
+            f"{change(b['latency_ms']['p95'], h['latency_ms']['p95']):>10s} "
+            f"{change(b['latency_ms']['p99'], h['latency_ms']['p99']):>10s} "
+            f"{change(b['peak_rss_mb'], h['peak_rss_mb']):>10s}"
+        )
+
+    for key in sorted(base.keys() ^ head.keys()):
+        print(f"{key[0]:32s} {key[1]:4d} only in {'base' if key in base else 'head'}")
+
+
+if __name__ == "__main__":
+    main()
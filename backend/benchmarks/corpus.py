@@ -0,0 +1,110 @@
+import csv
+import os
+import random
+
+WORDS = (
+    "research agent vector index embedding query namespace document chunk retrieval latency throughput "
+    "bridge project budget schedule timeline cost analysis report source citation model context window "
+    "pipeline storage memory session upload search result answer question summary evidence claim data"
+).split()
+
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 18))
+    return " ".join(words).capitalize() + "."
+
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(sentence(rng) for _ in range(rng.randint(3, 7)))
+
+
+def write_txt(path: str, size_bytes: int, rng: random.Random):
+    with open(path, "w") as f:
+        while f.tell() < size_bytes:
+            f.write(paragraph(rng) + "\n\n")
+
+
+def write_md(path: str, size_bytes: int, rng: random.Random):
+    with open(path, "w") as f:
+        section = 0
+        while f.tell() < size_bytes:
+            section += 1
+            f.write(f"## Section {section}\n\n{paragraph(rng)}\n\n")
+            for _ in range(rng.randint(2, 5)):
+                f.write(f"- {sentence(rng)}\n")
+            f.write(f"\n{paragraph(rng)}\n\n")
+
+
+def write_csv(path: str, size_bytes: int, rng: random.Random):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "category", "price", "description"])
+        row = 0
+        while f.tell() < size_bytes:
+            row += 1
+            writer.writerow([
+                row,
+                " ".join(rng.choices(WORDS, k=2)),
+                rng.choice(["alpha", "beta", "gamma", "delta"]),
+                f"{rng.uniform(1, 1000):.2f}",
+                sentence(rng),
+            ])
+
+
+def pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, size_bytes: int, rng: random.Random, lines_per_page: int = 60):
+    # minimal hand-written PDF: one Helvetica text stream per page, objects 1-3 reserved
+    # for catalog, page tree and font so pages can be streamed before the page tree
+    offsets = {}
+    page_ids = []
+
+    with open(path, "wb") as f:
+        def write_obj(num: int, body: bytes):
+            offsets[num] = f.tell()
+            f.write(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        write_obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        num = 4
+        while f.tell() < size_bytes:
+            lines = []
+            while len(lines) < lines_per_page:
+                lines.append(pdf_escape(" ".join(rng.choices(WORDS, k=12))))
+            stream = ("BT /F1 9 Tf 12 TL 40 800 Td\n" + "".join(f"({line}) '\n" for line in lines) + "ET").encode()
+
+            write_obj(num + 1, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+            write_obj(num, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {num + 1} 0 R >>"
+            ).encode())
+            page_ids.append(num)
+            num += 2
+
+        kids = " ".join(f"{p} 0 R" for p in page_ids)
+        write_obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+        write_obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = f.tell()
+        f.write(f"xref\n0 {num}\n0000000000 65535 f \n".encode())
+        for i in range(1, num):
+            f.write(f"{offsets[i]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {num} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+WRITERS = {
+    ".txt": write_txt,
+    ".md": write_md,
+    ".csv": write_csv,
+    ".pdf": write_pdf,
+}
+
+
+def generate(directory: str, ext: str, size_mb: float, seed: int = 0) -> str:
+    path = os.path.join(directory, f"corpus_{size_mb:g}mb{ext}")
+    if not os.path.exists(path):
+        WRITERS[ext](path, int(size_mb * 1024 * 1024), random.Random(seed))
+    return path
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import random
+import time
+from typing import Any, List, Optional, Sequence
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import BaseTool
+
+
+class LatencyFakeLLM(BaseChatModel):
+    """Chat model that answers after a configurable delay.
+
+    Recognises the decomposition and synthesis prompts so /research_harder runs
+    end to end, and when retrieve_context is bound it makes one retrieval call
+    before answering, like the real agents usually do.
+    """
+
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    sub_questions: int = 3
+    use_retriever: bool = True
+    bound_tools: List[str] = []
+    model: str = "fake-latency"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.model_copy(update={"bound_tools": [getattr(t, "name", str(t)) for t in tools]})
+
+    def delay(self) -> float:
+        return max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def respond(self, messages: List[BaseMessage]) -> AIMessage:
+        text = "\n".join(str(m.content) for m in messages)
+        prompt_tokens = len(text) // 4
+
+        if "decompose it into" in text:
+            content = json.dumps({
+                "sub_questions": [f"Sub-question {i + 1} about the topic?" for i in range(self.sub_questions)],
+                "reasoning": "split by aspect",
+            })
+            message = AIMessage(content=content)
+        elif (
+                self.use_retriever
+                and "retrieve_context" in self.bound_tools
+                and not any(isinstance(m, ToolMessage) for m in messages)
+        ):
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "retrieve_context",
+                    "args": {"query": str(messages[-1].content)[:200]},
+                    "id": f"call_{random.getrandbits(32):x}",
+                }],
+            )
+        else:
+            message = AIMessage(content="A synthetic answer of moderate length. " * 8)
+
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": len(str(message.content)) // 4,
+            "total_tokens": prompt_tokens + len(str(message.content)) // 4,
+        }
+        return message
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Any = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.delay())
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Any = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.delay())
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+
+class FakeWebSearch(BaseTool):
+    name: str = "duckduckgo_search"
+    description: str = "Search the web for current information."
+    latency_ms: float = 300.0
+
+    def _run(self, query: str, **kwargs: Any) -> str:
+        time.sleep(self.latency_ms / 1000)
+        return self.results(query)
+
+    async def _arun(self, query: str, **kwargs: Any) -> str:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return self.results(query)
+
+    @staticmethod
+    def results(query: str) -> str:
+        return " ".join(f"Result {i} for {query}: some snippet text." for i in range(5))
@@ -0,0 +1,217 @@
+"""Ingestion throughput benchmark.
+
+Generates synthetic corpora of increasing size in every supported format and
+times the load, split, embed and upsert stages of the ingestion path
+separately. Upserts go to a stub index that only builds and serialises the
+request payloads, so no vector database is needed.
+
+    python -m benchmarks.ingestion --sizes 1 10 100 --formats .pdf .csv --output ingest.json
+    python -m benchmarks.ingestion --sizes 10 --formats .pdf --profile cprofile
+    python -m benchmarks.ingestion --sizes 100 --formats .csv --csv-mode rows tabular
+"""
+import argparse
+import cProfile
+import gc
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from benchmarks.corpus import WRITERS, generate
+from benchmarks.load_test import git_commit, peak_rss_mb
+
+
+class StubIndex:
+    """Accepts upserts the way the Pinecone client would, minus the network."""
+
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self.vector_count = 0
+        self.payload_bytes = 0
+
+    def upsert(self, texts: List[str], vectors: List[List[float]], metadatas: List[dict]):
+        for start in range(0, len(texts), self.batch_size):
+            batch = [
+                {"id": str(uuid.uuid4()), "values": vector, "metadata": {**metadata, "text": text}}
+                for text, vector, metadata in zip(
+                    texts[start:start + self.batch_size],
+                    vectors[start:start + self.batch_size],
+                    metadatas[start:start + self.batch_size],
+                )
+            ]
+            self.payload_bytes += len(json.dumps({"vectors": batch}))
+            self.vector_count += len(batch)
+
+
+class StageRecorder:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str, size_bytes: int):
+        gc.collect()
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            result = {
+                "seconds": round(elapsed, 4),
+                "mb_per_s": round(size_bytes / (1024 * 1024) / elapsed, 3) if elapsed else None,
+                "process_peak_rss_mb": round(peak_rss_mb(), 1),
+            }
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                result["stage_peak_alloc_mb"] = round(peak / (1024 * 1024), 1)
+            self.stages[name] = result
+
+
+@contextmanager
+def profiled(mode: Optional[str], output_prefix: str):
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(output_prefix + ".prof")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+    elif mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as exc:
+            raise ImportError("--profile pyinstrument requires the pyinstrument package") from exc
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(output_prefix + ".html", "w") as f:
+                f.write(profiler.output_html())
+            print(profiler.output_text(unicode=True, show_all=False))
+    else:
+        yield
+
+
+def run_case(path: str, args, csv_mode: str = "rows") -> dict:
+    from services.document_service import document_processor_service
+    from services.pinecone_vector_service import pinecone_vector_service
+    from services.tabular_ingestion import TabularChunker
+
+    size_bytes = os.path.getsize(path)
+    filename = os.path.basename(path)
+    recorder = StageRecorder(args.trace_memory)
+    index = StubIndex()
+
+    with open(path, "rb") as f:
+        file_data = f.read()
+
+    with profiled(args.profile, os.path.join(args.profile_dir, filename)):
+        if csv_mode == "tabular":
+            # loading and chunking are a single streaming pass in tabular mode
+            with recorder.stage("load", size_bytes):
+                chunker = TabularChunker(rows_per_chunk=args.rows_per_chunk)
+                chunks = list(chunker.iter_chunks(io.BytesIO(file_data), filename))
+            del file_data
+        else:
+            with recorder.stage("load", size_bytes):
+                documents = document_processor_service.load_document(file_data, filename)
+            del file_data
+
+            with recorder.stage("split", size_bytes):
+                chunks = document_processor_service.process_documents(documents)
+            del documents
+
+        texts = [chunk.page_content for chunk in chunks]
+        metadatas = [chunk.metadata for chunk in chunks]
+
+        with recorder.stage("embed", size_bytes):
+            vectors = []
+            for start in range(0, len(texts), args.embed_batch):
+                vectors.extend(pinecone_vector_service.embeddings.embed_documents(texts[start:start + args.embed_batch]))
+
+        with recorder.stage("upsert", size_bytes):
+            index.upsert(texts, vectors, metadatas)
+
+    total = sum(stage["seconds"] for stage in recorder.stages.values())
+    return {
+        "file": filename,
+        "format": os.path.splitext(filename)[1],
+        "csv_mode": csv_mode if filename.endswith(".csv") else None,
+        "size_mb": round(size_bytes / (1024 * 1024), 2),
+        "chunks": len(chunks),
+        "upsert_payload_mb": round(index.payload_bytes / (1024 * 1024), 2),
+        "total_seconds": round(total, 3),
+        "stages": recorder.stages,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1, 10, 100], help="corpus sizes in MB, up to 1024")
+    parser.add_argument("--formats", nargs="+", default=list(WRITERS), choices=list(WRITERS))
+    parser.add_argument("--corpus-dir", default=None, help="reuse generated corpora between runs")
+    parser.add_argument("--embedding-backend", default=None, help="defaults to EMBEDDING_BACKEND")
+    parser.add_argument("--embed-batch", type=int, default=256)
+    parser.add_argument("--csv-mode", nargs="+", default=["rows"], choices=["rows", "tabular"])
+    parser.add_argument("--rows-per-chunk", type=int, default=50, help="rows per chunk in tabular mode")
+    parser.add_argument("--trace-memory", action="store_true", help="per-stage peak allocations via tracemalloc (slower)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None)
+    parser.add_argument("--profile-dir", default=".")
+    parser.add_argument("--output", default="ingestion_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    os.environ["VECTOR_STORE_PROVIDER"] = "local"
+    if args.embedding_backend:
+        os.environ["EMBEDDING_BACKEND"] = args.embedding_backend
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        corpus_dir = args.corpus_dir or tmpdir
+        os.makedirs(corpus_dir, exist_ok=True)
+
+        results = []
+        for ext in args.formats:
+            for size_mb in args.sizes:
+                path = generate(corpus_dir, ext, size_mb)
+                for csv_mode in (args.csv_mode if ext == ".csv" else ["rows"]):
+                    result = run_case(path, args, csv_mode)
+                    stages = "  ".join(f"{name}={stage['seconds']:.2f}s" for name, stage in result["stages"].items())
+                    label = f"{result['file']} ({csv_mode})" if ext == ".csv" else result["file"]
+                    print(f"{label:32s} chunks={result['chunks']:<8d} {stages}  rss={peak_rss_mb():.0f}MB")
+                    results.append(result)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "embedding_backend": os.environ.get("EMBEDDING_BACKEND", "default"),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""End-to-end load test of the FastAPI app, fully offline.
+
+Runs the real app in-process over an ASGI transport with a fake LLM, a fake
+web search tool and the local in-memory vector store, then drives each
+endpoint at fixed concurrency levels and writes the results as JSON.
+
+    python -m benchmarks.load_test --concurrency 1 8 32 --requests 100 --output bench.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+ENDPOINTS: Dict[str, Callable[[int], dict]] = {
+    "/api/chat/chat": lambda i: {
+        "messages": [{"role": "user", "content": f"Question number {i} about distributed systems?"}],
+    },
+    "/api/documents/search": lambda i: {
+        "query": f"benchmark document topic {i % 20}",
+        "k": 5,
+        "namespace": "bench",
+    },
+    "/api/agents/research": lambda i: {
+        "query": f"What changed in topic {i % 20} this year?",
+        "namespace": "bench",
+        "max_iterations": 4,
+    },
+    "/api/agents/research_harder": lambda i: {
+        "query": f"Compare the cost and schedule outcomes of projects {i % 20} and {i % 20 + 1}.",
+        "namespace": "bench",
+        "max_iterations": 4,
+    },
+    "/api/agents/chat_agentically": lambda i: {
+        "query": f"Tell me about topic {i % 20}",
+        "namespace": "bench",
+        "session_id": f"bench-{uuid.uuid4().hex}",
+        "max_iterations": 4,
+    },
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint and concurrency level")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--search-latency-ms", type=float, default=300.0)
+    parser.add_argument("--embedding-backend", default="fake")
+    parser.add_argument("--seed-documents", type=int, default=500)
+    parser.add_argument("--output", default="bench_results.json")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    # settings are read at import time, so this has to run before any app module is imported
+    os.environ["VECTOR_STORE_PROVIDER"] = "local"
+    os.environ["EMBEDDING_BACKEND"] = args.embedding_backend
+    os.environ.setdefault("ANTHROPIC_API_KEY", "offline")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def install_fakes(args):
+    from langchain_core.documents import Document
+
+    from benchmarks.fakes import LatencyFakeLLM, FakeWebSearch
+    from services.llm_service import llm_service
+    from services import research_runner, session_cache
+    from services.pinecone_vector_service import pinecone_vector_service
+
+    def create_llm(temperature=None, max_tokens=None):
+        return LatencyFakeLLM(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms)
+
+    llm_service.create_llm = create_llm
+    fake_search = lambda: FakeWebSearch(latency_ms=args.search_latency_ms)
+    research_runner.get_search_web_ddg = fake_search
+    session_cache.get_search_web_ddg = fake_search
+
+    documents = [
+        Document(
+            page_content=f"Benchmark document topic {i % 20}. " + "Filler sentence about the topic. " * 25,
+            metadata={"source": f"doc_{i // 10}.txt", "page": i % 10},
+        )
+        for i in range(args.seed_documents)
+    ]
+    pinecone_vector_service.upload_documents(documents, namespace="bench")
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+async def run_scenario(
+        client,
+        endpoint: str,
+        concurrency: int,
+        total: int,
+        make_payload: Optional[Callable[[int], dict]] = None,
+) -> dict:
+    make_payload = make_payload or ENDPOINTS[endpoint]
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def worker():
+        while (i := next(counter)) < total:
+            start = time.perf_counter()
+            try:
+                response = await client.post(endpoint, json=make_payload(i))
+                failed = response.status_code >= 400
+                error_key = str(response.status_code)
+            except Exception as e:
+                failed = True
+                error_key = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if failed:
+                errors[error_key] = errors.get(error_key, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latency_ms = np.array(latencies) * 1000
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 3),
+        "latency_ms": {
+            "mean": round(float(latency_ms.mean()), 2),
+            "p50": round(float(np.percentile(latency_ms, 50)), 2),
+            "p95": round(float(np.percentile(latency_ms, 95)), 2),
+            "p99": round(float(np.percentile(latency_ms, 99)), 2),
+            "max": round(float(latency_ms.max()), 2),
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+    from main import app
+
+    install_fakes(args)
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for endpoint in args.endpoints:
+                await run_scenario(client, endpoint, 1, args.warmup)
+                for concurrency in args.concurrency:
+                    result = await run_scenario(client, endpoint, concurrency, args.requests)
+                    print(
+                        f"{endpoint:32s} c={concurrency:<4d} {result['throughput_rps']:8.2f} rps  "
+                        f"p50={result['latency_ms']['p50']:.0f}ms p95={result['latency_ms']['p95']:.0f}ms "
+                        f"p99={result['latency_ms']['p99']:.0f}ms errors={sum(result['errors'].values())}"
+                    )
+                    results.append(result)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    output = os.path.abspath(args.output)
+
+    # chat_agentically persists histories relative to the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        sys.path.insert(0, cwd)
+        os.chdir(workdir)
+        try:
+            report = asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
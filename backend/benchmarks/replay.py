@@ -0,0 +1,117 @@
+"""Replay a recorded trace through the FastAPI app, fully offline.
+
+Record a real run first, with the live providers:
+
+    TRACE_MODE=record TRACE_PATH=traces/harder.jsonl uvicorn main:app
+    curl -X POST localhost:8000/api/agents/research_harder -H 'Content-Type: application/json' \\
+        -d '{"query": "...", "route": "decompose"}'
+
+then replay the same request against the trace. Every LLM and tool call is
+answered from the trace, sleeping for the recorded latency times
+--latency-scale (0 measures only our own overhead):
+
+    python -m benchmarks.replay traces/harder.jsonl --endpoint /api/agents/research_harder \\
+        --payload '{"query": "...", "route": "decompose"}' --latency-scale 0 --output replay.json
+
+Pin "route" in the payload, since the query router's embeddings are faked
+here. The output has the load_test format, so benchmarks.compare works on it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from benchmarks.load_test import git_commit, run_scenario
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace")
+    parser.add_argument("--endpoint", required=True)
+    parser.add_argument("--payload", required=True, help="JSON body of the recorded request")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1])
+    parser.add_argument("--requests", type=int, default=10, help="replays per concurrency level")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", default="replay_results.json")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args):
+    # settings are read at import time, so this has to run before any app module is imported
+    os.environ["TRACE_MODE"] = "replay"
+    os.environ["TRACE_PATH"] = os.path.abspath(args.trace)
+    os.environ["TRACE_REPLAY_LATENCY_SCALE"] = str(args.latency_scale)
+    os.environ["VECTOR_STORE_PROVIDER"] = "local"
+    os.environ["EMBEDDING_BACKEND"] = "fake"
+    # identical concurrent requests would otherwise be coalesced into one run
+    os.environ["AGENT_SINGLEFLIGHT_ENABLED"] = "false"
+    os.environ.setdefault("ANTHROPIC_API_KEY", "offline")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+async def run(args) -> dict:
+    import httpx
+    from main import app
+    from services.llm_trace import replay_trace
+
+    payload = json.loads(args.payload)
+    make_payload = lambda i: payload
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            await run_scenario(client, args.endpoint, 1, args.warmup, make_payload)
+            for concurrency in args.concurrency:
+                result = await run_scenario(client, args.endpoint, concurrency, args.requests, make_payload)
+                print(
+                    f"{args.endpoint:32s} c={concurrency:<4d} {result['throughput_rps']:8.2f} rps  "
+                    f"p50={result['latency_ms']['p50']:.0f}ms p95={result['latency_ms']['p95']:.0f}ms "
+                    f"p99={result['latency_ms']['p99']:.0f}ms errors={sum(result['errors'].values())}"
+                )
+                results.append(result)
+
+    misses = replay_trace().misses
+    if misses:
+        print(f"{misses} calls did not match the trace exactly and were served in recorded order")
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+            "trace_misses": misses,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    output = os.path.abspath(args.output)
+
+    # chat_agentically persists histories relative to the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        sys.path.insert(0, cwd)
+        os.chdir(workdir)
+        try:
+            report = asyncio.run(run(args))
+        finally:
+            os.chdir(cwd)
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,13 @@
 import asyncio
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from pydantic import BaseModel, Field
 
+from core.metrics import stage_timer
+from services.llm_service import llm_service
+
 
 class SubQueries(BaseModel):
     sub_questions: List[str] = Field(
@@ -15,6 +18,10 @@ class SubQueries(BaseModel):
     )
 
 
+# (event, data), called as decomposition, each sub-answer and synthesis complete
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
 class QueryDecompositionChain:
     def __init__(
             self,
@@ -30,8 +37,8 @@ class QueryDecompositionChain:
     def create_decomposition_chain(self):
         parser = PydanticOutputParser(pydantic_object=SubQueries)
 
-        prompt = ChatPromptTemplate.from_template(
-            """You are a research assistant that breaks down complex questions into simpler sub-questions.
+        # everything except the question is static, so it lives in a cacheable system message
+        instructions = f"""You are a research assistant that breaks down complex questions into simpler sub-questions.
             
             Given a complex research question, decompose it into 2-5 simpler sub-questions that:
             1. **Can be answered INDEPENDENTLY without knowing the answers to other sub-questions**
@@ -48,18 +55,19 @@ class QueryDecompositionChain:
         
             Each question should repeat key context (project names, locations, specific entities) so it can be 
             researched independently.
-            
-            Complex Question: {question}
     
-            {format_instructions}
+            {parser.get_format_instructions()}
     
             Be strategic: all questions will be answered simultaneously, so each question must be answerable on its own, sometimes you need to compare multiple aspects."""
-        )
+
+        prompt = ChatPromptTemplate.from_messages([
+            llm_service.cacheable_system_message(instructions, self.llm),
+            ("human", "Complex Question: {question}"),
+        ])
 
         return (
             {
                 "question": RunnablePassthrough(),
-                "format_instructions": lambda _: parser.get_format_instructions()
             }
             | prompt
             | self.llm
@@ -67,22 +75,23 @@ class QueryDecompositionChain:
         )
 
     def create_synthesis_chain(self):
-        prompt = ChatPromptTemplate.from_template(
-            """You are synthesizing research findings into a comprehensive answer.
-    
-            Original Question: {original_question}
-    
-            Sub-questions and their answers:
-            {sub_answers}
+        instructions = """You are synthesizing research findings into a comprehensive answer.
     
             Task: Provide a well-structured, comprehensive answer to the original question by:
             1. Integrating information from all sub-answers
             2. Resolving any contradictions
             3. Highlighting key insights
-            4. Noting any gaps or limitations
+            4. Noting any gaps or limitations"""
+
+        prompt = ChatPromptTemplate.from_messages([
+            llm_service.cacheable_system_message(instructions, self.llm),
+            ("human", """Original Question: {original_question}
     
-            Synthesized Answer:"""
-        )
+            Sub-questions and their answers:
+            {sub_answers}
+    
+            Synthesized Answer:"""),
+        ])
 
         return prompt | self.llm
 
@@ -99,24 +108,40 @@ class QueryDecompositionChain:
 
     async def arun(
             self,
-            question: str
+            question: str,
+            on_progress: Optional[ProgressCallback] = None
     ) -> Dict[str, Any]:
-        decomposition = await self.decomposition_chain.ainvoke(question)
+        report = on_progress or (lambda event, data: None)
+
+        with stage_timer("decomposition"):
+            decomposition = await self.decomposition_chain.ainvoke(question)
+        report("decomposition", {
+            "sub_questions": decomposition.sub_questions,
+            "reasoning": decomposition.reasoning
+        })
+
+        async def answer_and_report(sub_question: str) -> Dict[str, Any]:
+            answer = await self.answer_with_agent(sub_question)
+            report("sub_answer", answer)
+            return answer
 
         tasks = [
-            self.answer_with_agent(sq) for sq in decomposition.sub_questions
+            answer_and_report(sq) for sq in decomposition.sub_questions
         ]
-        sub_answers = await asyncio.gather(*tasks)
+        with stage_timer("sub_agents"):
+            sub_answers = await asyncio.gather(*tasks)
 
         sub_answers_formatted = "\n\n".join([
             f"Q: {r['question']}\nA: {r['answer']}"
             for r in sub_answers
         ])
 
-        final_answer = await self.synthesis_chain.ainvoke({
-            "original_question": question,
-            "sub_answers": sub_answers_formatted
-        })
+        with stage_timer("synthesis"):
+            final_answer = await self.synthesis_chain.ainvoke({
+                "original_question": question,
+                "sub_answers": sub_answers_formatted
+            })
+        report("synthesis", {"final_answer": final_answer.content})
 
         return {
             "original_question": question,
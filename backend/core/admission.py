@@ -0,0 +1,174 @@
+import asyncio
+import bisect
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+from core.config import settings
+from core.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, ADMISSION_WAIT
+
+INTERACTIVE = 0
+BATCH = 1
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class EndpointLimit:
+    path: str
+    limit: int
+    queue_size: int
+    priority: int
+    active: int = 0
+    waiting: int = 0
+    # running average of how long a request holds its slot, for Retry-After
+    avg_seconds: float = 1.0
+
+
+@dataclass(order=True)
+class Waiter:
+    priority: int
+    seq: int
+    endpoint: EndpointLimit = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """Concurrency limits with a bounded, prioritised wait queue.
+
+    Each endpoint has its own limit and queue; all of them also share
+    global_limit slots, of which batch endpoints may hold at most
+    batch_share so interactive ones always have room. When a slot frees up
+    it goes to the first waiter, interactive before batch and FIFO within a
+    lane, that its endpoint limit allows to run. A full queue, or a wait
+    longer than max_wait, is rejected with a Retry-After estimate.
+    """
+
+    def __init__(
+            self,
+            endpoint_limits: Dict[str, int],
+            interactive_paths: Sequence[str] = (),
+            global_limit: int = settings.ADMISSION_GLOBAL_CONCURRENCY,
+            batch_share: float = settings.ADMISSION_BATCH_SHARE,
+            queue_size: int = settings.ADMISSION_QUEUE_SIZE,
+            max_wait: float = settings.ADMISSION_MAX_WAIT,
+    ):
+        self.endpoints = {
+            path: EndpointLimit(
+                path=path,
+                limit=limit,
+                queue_size=queue_size,
+                priority=INTERACTIVE if path in interactive_paths else BATCH,
+            )
+            for path, limit in endpoint_limits.items()
+        }
+        self.global_limit = global_limit
+        self.batch_limit = max(1, int(global_limit * batch_share))
+        self.max_wait = max_wait
+        self.active = 0
+        self.batch_active = 0
+        self.waiters: List[Waiter] = []
+        self.seq = itertools.count()
+
+    def match(self, path: str) -> Optional[EndpointLimit]:
+        return self.endpoints.get(path.rstrip("/") or "/")
+
+    def can_run(self, endpoint: EndpointLimit) -> bool:
+        if endpoint.active >= endpoint.limit or self.active >= self.global_limit:
+            return False
+        return endpoint.priority == INTERACTIVE or self.batch_active < self.batch_limit
+
+    def grant(self, endpoint: EndpointLimit):
+        endpoint.active += 1
+        self.active += 1
+        if endpoint.priority != INTERACTIVE:
+            self.batch_active += 1
+        ADMISSION_IN_FLIGHT.labels(endpoint.path).set(endpoint.active)
+
+    def dispatch(self):
+        for waiter in list(self.waiters):
+            if self.active >= self.global_limit:
+                break
+            if not waiter.future.done() and self.can_run(waiter.endpoint):
+                self.grant(waiter.endpoint)
+                waiter.future.set_result(None)
+                self.waiters.remove(waiter)
+
+    def retry_after(self, endpoint: EndpointLimit) -> int:
+        return max(1, math.ceil(endpoint.avg_seconds * (endpoint.waiting + 1) / endpoint.limit))
+
+    def reject(self, endpoint: EndpointLimit, reason: str):
+        ADMISSION_REJECTIONS.labels(endpoint.path, reason).inc()
+        raise AdmissionRejected(reason, self.retry_after(endpoint))
+
+    async def acquire(self, endpoint: EndpointLimit):
+        if not self.waiters and self.can_run(endpoint):
+            self.grant(endpoint)
+            ADMISSION_WAIT.labels(endpoint.path).observe(0)
+            return
+        if endpoint.waiting >= endpoint.queue_size:
+            self.reject(endpoint, "queue_full")
+
+        loop = asyncio.get_running_loop()
+        waiter = Waiter(endpoint.priority, next(self.seq), endpoint, loop.create_future())
+        bisect.insort(self.waiters, waiter)
+        endpoint.waiting += 1
+        ADMISSION_QUEUE_DEPTH.labels(endpoint.path).set(endpoint.waiting)
+        start = loop.time()
+        try:
+            self.dispatch()
+            await asyncio.wait_for(waiter.future, self.max_wait)
+        except asyncio.TimeoutError:
+            self.reject(endpoint, "timeout")
+        except asyncio.CancelledError:
+            # the client went away; hand back a slot that was granted in the meantime
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(endpoint)
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+            endpoint.waiting -= 1
+            ADMISSION_QUEUE_DEPTH.labels(endpoint.path).set(endpoint.waiting)
+        ADMISSION_WAIT.labels(endpoint.path).observe(loop.time() - start)
+
+    def release(self, endpoint: EndpointLimit, held_seconds: Optional[float] = None):
+        endpoint.active -= 1
+        self.active -= 1
+        if endpoint.priority != INTERACTIVE:
+            self.batch_active -= 1
+        if held_seconds is not None:
+            endpoint.avg_seconds = 0.8 * endpoint.avg_seconds + 0.2 * held_seconds
+        ADMISSION_IN_FLIGHT.labels(endpoint.path).set(endpoint.active)
+        self.dispatch()
+
+    @asynccontextmanager
+    async def slot(self, path: str) -> AsyncIterator[None]:
+        """Hold one slot of path's limit around work a request fans out, such as batch items.
+
+        Paths without a limit run straight away.
+        """
+        endpoint = self.match(path)
+        if endpoint is None:
+            yield
+            return
+        await self.acquire(endpoint)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(endpoint, time.perf_counter() - start)
+
+
+admission_controller = AdmissionController(
+    endpoint_limits=settings.ADMISSION_ENDPOINT_LIMITS,
+    interactive_paths=settings.ADMISSION_INTERACTIVE_PATHS,
+)
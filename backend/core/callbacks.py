@@ -0,0 +1,128 @@
+import logging
+import time
+from typing import Any, Dict, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from core.metrics import LLM_CALL_LATENCY, LLM_TOKENS, TOOL_CALL_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# no LLM or tool run should outlive this; older entries are runs that never reported an end
+STALE_RUN_AGE = 3600.0
+
+
+class RunTable(dict):
+    """In-flight runs of a callback handler: run id -> (start time, *values).
+
+    A run cancelled from outside, e.g. by a client disconnect, reports neither
+    its end nor an error, so entries older than max_age are dropped now and
+    then as new runs start.
+    """
+
+    def __init__(self, max_age: float = STALE_RUN_AGE, sweep_interval: float = 60.0):
+        super().__init__()
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.last_sweep = time.perf_counter()
+
+    def start(self, run_id: UUID, *values: Any):
+        now = time.perf_counter()
+        if now - self.last_sweep > self.sweep_interval:
+            self.last_sweep = now
+            for stale_id, run in list(self.items()):
+                if now - run[0] > self.max_age:
+                    self.pop(stale_id, None)
+        self[run_id] = (now, *values)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records latency and token usage for LLM and tool runs.
+
+    Attach it to models and tools directly rather than through a run config:
+    config callbacks propagate to every child run, which would count the same
+    LLM call once per enclosing chain.
+    """
+
+    def __init__(self):
+        self.llm_runs: Dict[UUID, Tuple[float, str]] = RunTable()
+        self.tool_runs: Dict[UUID, Tuple[float, str]] = RunTable()
+
+    @staticmethod
+    def model_name(serialized: Dict[str, Any], metadata: Dict[str, Any] | None, kwargs: Dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        return (
+            (metadata or {}).get("ls_model_name")
+            or params.get("model")
+            or params.get("model_name")
+            or (serialized or {}).get("name")
+            or "unknown"
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self.llm_runs.start(run_id, self.model_name(serialized, metadata, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.llm_runs.start(run_id, self.model_name(serialized, metadata, kwargs))
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        start, model = self.llm_runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            LLM_CALL_LATENCY.labels(model=model, status="ok").observe(time.perf_counter() - start)
+
+        usage = self.token_usage(response)
+        for token_type, count in usage.items():
+            LLM_TOKENS.labels(model=model, type=token_type).inc(count)
+        logger.debug("%s tokens: %s", model, usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        start, model = self.llm_runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            LLM_CALL_LATENCY.labels(model=model, status="error").observe(time.perf_counter() - start)
+
+    def on_llm_cancelled(self, *, run_id: UUID):
+        # not a LangChain callback: RoutingChatModel calls it for the hedge losers it cancels
+        start, model = self.llm_runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            LLM_CALL_LATENCY.labels(model=model, status="cancelled").observe(time.perf_counter() - start)
+
+    @staticmethod
+    def token_usage(response: LLMResult) -> Dict[str, int]:
+        # input already includes cache reads and writes; the cache counts show how much of it hit the prompt cache
+        usage = {"input": 0, "output": 0, "cache_read": 0, "cache_write": 0}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                metadata = getattr(message, "usage_metadata", None)
+                if metadata:
+                    usage["input"] += metadata.get("input_tokens", 0)
+                    usage["output"] += metadata.get("output_tokens", 0)
+                    details = metadata.get("input_token_details") or {}
+                    usage["cache_read"] += details.get("cache_read") or 0
+                    usage["cache_write"] += details.get("cache_creation") or 0
+        return usage
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.tool_runs.start(run_id, (serialized or {}).get("name", "unknown"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        start, tool = self.tool_runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            TOOL_CALL_LATENCY.labels(tool=tool, status="ok").observe(time.perf_counter() - start)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        start, tool = self.tool_runs.pop(run_id, (None, "unknown"))
+        if start is not None:
+            TOOL_CALL_LATENCY.labels(tool=tool, status="error").observe(time.perf_counter() - start)
+
+
+metrics_callback = MetricsCallbackHandler()
+
+
+def with_metrics_callback(runnable):
+    callbacks = list(getattr(runnable, "callbacks", None) or [])
+    if metrics_callback not in callbacks:
+        runnable.callbacks = callbacks + [metrics_callback]
+    return runnable
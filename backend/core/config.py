@@ -1,9 +1,9 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, Literal
+from typing import Dict, List, Optional, Literal
 
 
 class Settings(BaseSettings):
-    LLM_PROVIDER: Literal["anthropic"] = "anthropic"
+    LLM_PROVIDER: Literal["anthropic", "ollama", "router"] = "anthropic"
     ANTHROPIC_MODEL_NAME: str = "claude-haiku-4-5-20251001"
     OLLAMA_MODEL_NAME: str = "llama3.1:8b"
     OLLAMA_BASE_URL: str = "http://host.docker.internal:11434"
@@ -11,12 +11,140 @@ class Settings(BaseSettings):
     LLM_MAX_TOKENS: int = 1024
     LLM_MAX_RETRIES: int = 3
     LLM_MAX_TIMEOUT: float = 60.0
+    LLM_PROMPT_CACHING: bool = True
+    LLM_ROUTER_BACKENDS: List[Literal["anthropic", "ollama"]] = ["anthropic", "ollama"]
+    LLM_ROUTER_WINDOW: int = 50
+    LLM_ROUTER_MIN_SAMPLES: int = 5
+    LLM_ROUTER_SWITCH_RATIO: float = 2.0
+    LLM_ROUTER_HEDGING: bool = True
+    LLM_ROUTER_HEDGE_PERCENTILE: float = 95.0
+    LLM_ROUTER_HEDGE_DELAY: float = 5.0
+    LLM_ROUTER_BREAKER_FAILURES: int = 3
+    LLM_ROUTER_BREAKER_ERROR_RATE: float = 0.5
+    LLM_ROUTER_BREAKER_COOLDOWN: float = 30.0
+    # USD per million tokens, matched by model name prefix
+    LLM_PRICING: Dict[str, Dict[str, float]] = {
+        "claude-haiku-4-5": {"input": 1.0, "output": 5.0, "cache_read": 0.1, "cache_write": 1.25},
+        "claude-sonnet-4-5": {"input": 3.0, "output": 15.0, "cache_read": 0.3, "cache_write": 3.75},
+    }
+    USAGE_ACCOUNTING_ENABLED: bool = True
+    USAGE_DB_PATH: str = "./usage.db"
+    # USD per namespace ("" is the default namespace) over the rolling window
+    USAGE_BUDGETS: Dict[str, float] = {}
+    USAGE_DEFAULT_BUDGET: Optional[float] = None
+    USAGE_BUDGET_WINDOW: float = 86400.0
+    USAGE_REQUEST_MAX_COST: Optional[float] = None
+    TRACE_MODE: Literal["off", "record", "replay"] = "off"
+    TRACE_PATH: str = "./traces/trace.jsonl"
+    TRACE_REPLAY_LATENCY_SCALE: float = 1.0
+
+    AGENT_VERBOSE: bool = False
+    SESSION_CACHE_ENABLED: bool = True
+    SESSION_CACHE_MAX_SESSIONS: int = 256
+    SESSION_CACHE_IDLE_TTL: float = 900.0
+    SESSION_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    SESSION_CACHE_AGENT_BYTES: int = 256 * 1024
+    # False defers history writes to eviction/shutdown; a crash then loses up to SESSION_CACHE_IDLE_TTL of chat
+    SESSION_CACHE_WRITE_THROUGH: bool = True
+    MEMORY_WRITE_BEHIND: bool = True
+    MEMORY_WRITE_BATCH_SIZE: int = 32
+    MEMORY_WRITE_FLUSH_INTERVAL: float = 1.0
+    MEMORY_WRITE_QUEUE_SIZE: int = 1000
+    MEMORY_WRITE_SHUTDOWN_TIMEOUT: float = 10.0
+    AGENT_SINGLEFLIGHT_ENABLED: bool = True
+    AGENT_RESULT_CACHE_TTL: float = 0.0
+    QUERY_ROUTER_ENABLED: bool = True
+    QUERY_ROUTER_CLASSIFIER: bool = True
+    QUERY_ROUTER_MIN_MARGIN: float = 0.02
+    QUERY_ROUTER_SHORT_QUERY_WORDS: int = 12
+    QUERY_ROUTER_LONG_QUERY_WORDS: int = 40
+
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_GLOBAL_CONCURRENCY: int = 32
+    ADMISSION_BATCH_SHARE: float = 0.75
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_MAX_WAIT: float = 30.0
+    ADMISSION_ENDPOINT_LIMITS: Dict[str, int] = {
+        "/api/chat/chat": 32,
+        "/api/agents/chat_agentically": 16,
+        "/api/agents/research": 8,
+        "/api/agents/research_harder": 4,
+        "/api/chat/batch": 2,
+        # not a route: each LLM call a chat batch fans out holds one of these
+        "/api/chat/batch/items": 8,
+        "/api/documents/search/batch": 4,
+    }
+    ADMISSION_INTERACTIVE_PATHS: List[str] = ["/api/chat/chat", "/api/agents/chat_agentically"]
+
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 100
+    JOB_RESULT_TTL: float = 3600.0
+
+    RESEARCH_EXECUTION: Literal["local", "queue"] = "local"
+    QUEUE_URL: str = "redis://localhost:6379/0"
+    QUEUE_PREFIX: str = "research"
+    QUEUE_LEASE_SECONDS: float = 30.0
+    QUEUE_HEARTBEAT_SECONDS: float = 10.0
+    QUEUE_MAX_ATTEMPTS: int = 3
+    QUEUE_RESULT_TIMEOUT: float = 600.0
+    QUEUE_RESULT_TTL: int = 3600
+    RESEARCH_WORKER_CONCURRENCY: int = 4
+    RESEARCH_WORKER_DECOMPOSE_CONCURRENCY: int = 2
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 0.1
 
     ANTHROPIC_API_KEY: Optional[str] = None
 
+    VECTOR_STORE_PROVIDER: Literal["pinecone", "local"] = "pinecone"
     PINECONE_API_KEY: Optional[str] = None
     PINECONE_INDEX_NAME: str = "pinecone-index-2"
     PINECONE_ENVIRONMENT: str = "us-east-1"
+    VECTOR_DELETE_BATCH_SIZE: int = 1000
+    RETRIEVER_K: int = 3
+    RETRIEVER_SEARCH_TYPE: Literal["similarity", "mmr"] = "mmr"
+    RETRIEVER_FETCH_K: int = 20
+    RETRIEVER_MMR_LAMBDA: float = 0.5
+    RETRIEVER_MERGE_MIN_OVERLAP: int = 20
+    RETRIEVER_MAX_MERGED_CHARS: int = 3000
+    RETRIEVAL_PREFETCH_ENABLED: bool = True
+    RETRIEVAL_PREFETCH_MIN_OVERLAP: float = 0.6
+    RETRIEVAL_PREFETCH_WORKERS: int = 8
+    BATCH_MAX_ITEMS: int = 1000
+    SEARCH_BATCH_CONCURRENCY: int = 16
+    CHAT_BATCH_CONCURRENCY: int = 8
+    CONTEXT_COMPRESSION_ENABLED: bool = True
+    CONTEXT_TOKEN_BUDGET: int = 400
+    CONTEXT_MIN_SENTENCE_CHARS: int = 20
+    CONTEXT_SOURCE_FIELDS: List[str] = ["source", "page", "row_start", "row_end"]
+    DOCUMENT_CATALOG_PATH: str = "./document_catalog.db"
+
+    EMBEDDING_BACKEND: Literal["huggingface", "onnx", "remote", "fake"] = "huggingface"
+    EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_ONNX_FILE: str = "onnx/model_qint8_avx512_vnni.onnx"
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_NUM_THREADS: int = 0
+    EMBEDDING_MAX_SEQ_LENGTH: int = 256
+    EMBEDDING_QUERY_BATCH_SIZE: int = 32
+    EMBEDDING_QUERY_BATCH_WAIT_MS: float = 2.0
+
+    DOCUMENT_SPOOL_MAX_BYTES: int = 32 * 1024 * 1024
+    DOCUMENT_PARALLEL_WORKERS: int = 0
+    DOCUMENT_PARALLEL_MIN_PAGES: int = 32
+    DOCUMENT_PAGES_PER_TASK: int = 16
+    DOCUMENT_SPLIT_DOCS_PER_TASK: int = 256
+    DOCUMENT_MAX_IN_FLIGHT: int = 0
+    TABULAR_ROWS_PER_CHUNK: int = 50
+    TABULAR_MAX_CHUNK_CHARS: int = 4000
+    TABULAR_MAX_OPEN_GROUPS: int = 1000
+    TABULAR_UPLOAD_BATCH: int = 500
+
+    EMBEDDING_WORKER_BACKEND: Literal["huggingface", "onnx"] = "huggingface"
+    EMBEDDING_WORKER_SOCKET: str = "/tmp/embedding_worker.sock"
+    EMBEDDING_WORKER_PROCESSES: int = 2
+    EMBEDDING_WORKER_QUEUE_SIZE: int = 64
+    EMBEDDING_WORKER_REQUEST_SIZE: int = 256
+    EMBEDDING_WORKER_TIMEOUT: float = 60.0
+    EMBEDDING_WORKER_BUSY_RETRY_TIMEOUT: float = 10.0
 
     class Config:
         env_file = ".env"
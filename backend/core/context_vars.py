@@ -1,3 +1,9 @@
 import contextvars
 
-request_namespace = contextvars.ContextVar("request_namespace", default="A")
\ No newline at end of file
+request_namespace = contextvars.ContextVar("request_namespace", default="A")
+
+# set by BaseAgent.run while a speculative retrieval for the query is in flight
+retrieval_prefetch = contextvars.ContextVar("retrieval_prefetch", default=None)
+
+# the services.usage_accounting.UsageScope LLM calls are attributed to
+request_usage = contextvars.ContextVar("request_usage", default=None)
@@ -0,0 +1,31 @@
+import logging
+import random
+
+from core.config import settings
+
+
+class SamplingFilter(logging.Filter):
+    """Drops a share of records logged with extra={"sampled": True}.
+
+    Used for full payload dumps on the hot path, which are useful now and
+    then but far too expensive to emit for every request.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False):
+            return random.random() < self.rate
+        return True
+
+
+def setup_logging():
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
@@ -0,0 +1,184 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+EMBED_QUERY_BATCH_SIZE = Histogram(
+    "embedding_query_batch_size",
+    "Number of queries encoded together by the query micro-batcher",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Latency of internal pipeline stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "stage_errors_total",
+    "Pipeline stages that raised",
+    ["stage"],
+)
+
+LLM_CALL_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "Latency of individual LLM calls",
+    ["model", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    ["model", "type"],
+)
+
+TOOL_CALL_LATENCY = Histogram(
+    "tool_call_duration_seconds",
+    "Latency of agent tool calls",
+    ["tool", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUESTS_COALESCED = Counter(
+    "requests_coalesced_total",
+    "Requests by single-flight outcome: leader ran the work, shared awaited it, cached reused its result",
+    ["group", "outcome"],
+)
+
+JOBS_FINISHED = Counter(
+    "jobs_finished_total",
+    "Background jobs by kind and terminal status",
+    ["kind", "status"],
+)
+
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth",
+    "Jobs waiting for a worker",
+)
+
+QUEUE_TASKS = Counter(
+    "queue_tasks_total",
+    "Shared-queue tasks by kind and outcome",
+    ["kind", "outcome"],
+)
+
+QUERY_ROUTES = Counter(
+    "query_routes_total",
+    "Agent endpoint queries by chosen route and what decided it",
+    ["endpoint", "route", "source"],
+)
+
+LLM_ROUTER_EVENTS = Counter(
+    "llm_router_events_total",
+    "LLM router decisions per backend: selected, hedged, won, failover, circuit_open",
+    ["backend", "event"],
+)
+
+LLM_CIRCUIT_OPEN = Gauge(
+    "llm_circuit_open",
+    "1 while the router's circuit breaker for an LLM backend is open",
+    ["backend"],
+)
+
+MEMORY_WRITES = Counter(
+    "memory_writes_total",
+    "Long-term memory turns by write-behind outcome",
+    ["outcome"],
+)
+
+SESSION_CACHE_EVENTS = Counter(
+    "session_cache_events_total",
+    "Session agent cache lookups and evictions",
+    ["event"],
+)
+
+SESSION_CACHE_SESSIONS = Gauge(
+    "session_cache_sessions",
+    "Live session agents held in the cache",
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests holding an admission slot, per endpoint",
+    ["endpoint"],
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot, per endpoint",
+    ["endpoint"],
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests turned away with 429, by reason",
+    ["endpoint", "reason"],
+)
+
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds",
+    "Time spent waiting for an admission slot",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+
+RETRIEVAL_CONTEXT_CHARS = Histogram(
+    "retrieval_context_chars",
+    "Characters of retrieved context per tool call, before and after compression",
+    ["stage"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+
+BATCH_ITEMS = Counter(
+    "batch_items_total",
+    "Items processed by the NDJSON batch endpoints",
+    ["endpoint", "outcome"],
+)
+
+RETRIEVAL_PREFETCH = Counter(
+    "retrieval_prefetch_total",
+    "Speculative retrievals started at agent start and what became of them",
+    ["outcome"],
+)
+
+LLM_COST = Counter(
+    "llm_cost_usd_total",
+    "Estimated LLM spend in USD",
+    ["model"],
+)
+
+LLM_UNACCOUNTED_CALLS = Counter(
+    "llm_unaccounted_calls_total",
+    "LLM calls cancelled before reporting token usage, so missing from the usage store",
+    ["model"],
+)
+
+USAGE_BUDGET_EVENTS = Counter(
+    "usage_budget_events_total",
+    "Requests rejected, and agent runs cut short, by namespace budgets",
+    ["event"],
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_LATENCY.labels(stage=stage).observe(time.perf_counter() - start)
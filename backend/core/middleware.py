@@ -0,0 +1,71 @@
+import time
+
+from starlette.responses import JSONResponse
+
+from core.admission import AdmissionController, AdmissionRejected, admission_controller
+from core.metrics import HTTP_REQUEST_LATENCY
+
+
+class MetricsMiddleware:
+    """Times every HTTP request, labelled by route template to keep label cardinality bounded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"]),
+            ).observe(time.perf_counter() - start)
+
+
+class AdmissionMiddleware:
+    """Holds each request to a limited endpoint until the AdmissionController gives it a slot.
+
+    Rejected requests get a 429 with Retry-After. The slot is held until the
+    response has been sent.
+    """
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        endpoint = self.controller.match(scope["path"]) if scope["type"] == "http" else None
+        if endpoint is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(endpoint)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                {"detail": f"Too many concurrent requests ({e.reason}), retry later"},
+                status_code=429,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(endpoint, time.perf_counter() - start)
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from core.metrics import REQUESTS_COALESCED
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers that arrive
+    while it is running await the same task. The task is shielded, so a
+    follower (or the leader) disconnecting does not cancel the run for
+    everyone else. Successful results can be kept for result_ttl seconds to
+    also cover duplicates that arrive just after completion; errors are never
+    cached.
+    """
+
+    def __init__(self, name: str, result_ttl: float = 0.0, max_cached: int = 1024):
+        self.name = name
+        self.result_ttl = result_ttl
+        self.max_cached = max_cached
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self.get_cached(key)
+        if cached is not None:
+            REQUESTS_COALESCED.labels(self.name, "cached").inc()
+            return cached
+
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda t: self.finish(key, t))
+            REQUESTS_COALESCED.labels(self.name, "leader").inc()
+        else:
+            REQUESTS_COALESCED.labels(self.name, "shared").inc()
+
+        return await asyncio.shield(task)
+
+    def get_cached(self, key: Hashable) -> Optional[Any]:
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.results[key]
+            return None
+        return value
+
+    def finish(self, key: Hashable, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        if self.result_ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+
+        self.results[key] = (time.monotonic() + self.result_ttl, task.result())
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_cached:
+            self.results.popitem(last=False)
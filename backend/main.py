@@ -1,19 +1,43 @@
+import asyncio
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from api.routes import chat_routes, document_routes, agent_routes
+from fastapi import FastAPI, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from api.routes import chat_routes, document_routes, agent_routes, job_routes, usage_routes
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from core.logging_config import setup_logging
+from core.middleware import MetricsMiddleware, AdmissionMiddleware
+from services.job_queue import research_queue
+from services.job_service import job_service
+from services.llm_trace import trace_recorder
+from services.memory_writer import vector_memory_writer
+from services.session_cache import session_agent_cache
+from core.config import settings
 
 load_dotenv()
+setup_logging()
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await job_service.start()
+    await session_agent_cache.start()
     yield
+    await job_service.stop()
+    await session_agent_cache.close()
+    if not await asyncio.to_thread(vector_memory_writer.flush, settings.MEMORY_WRITE_SHUTDOWN_TIMEOUT):
+        logger.warning("shutting down with long-term memory writes still queued")
+    await research_queue.redis.aclose()
+    trace_recorder.close()
 
 
 app = FastAPI(title='Research Agent', lifespan=lifespan)
 
+# innermost, so 429s still get CORS headers and show up in request metrics
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -21,12 +45,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 # Routers
 app.include_router(chat_routes.router, prefix="/api/chat")
 app.include_router(document_routes.router, prefix="/api/documents")
 app.include_router(agent_routes.router, prefix="/api/agents")
+app.include_router(job_routes.router, prefix="/api/jobs")
+app.include_router(usage_routes.router, prefix="/api/usage")
 
 # Health checks
 @app.get("/")
@@ -39,6 +66,11 @@ async def health():
     return {"status": "healthy enough for this"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
 
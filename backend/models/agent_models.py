@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Literal
 
 from pydantic import BaseModel
 
@@ -10,7 +10,10 @@ class AgentRequest(BaseModel):
     max_tokens: Optional[int] = None
     namespace: Optional[str] = None
     session_id: Optional[str] = None
+    # skip the query router and force an execution path; "auto" or None lets the router decide
+    route: Optional[Literal["auto", "direct", "agent", "decompose"]] = None
 
 
 class AgentResponse(BaseModel):
     response: str
+    route: Optional[str] = None
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
@@ -17,3 +17,15 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     model: str
+
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatRequest]
+    concurrency: Optional[int] = Field(None, ge=1)
+
+
+class ChatBatchItem(BaseModel):
+    index: int
+    response: Optional[str] = None
+    model: Optional[str] = None
+    error: Optional[str] = None
@@ -1,5 +1,5 @@
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, Field
 
 
 class DocumentMetadata(BaseModel):
@@ -10,14 +10,31 @@ class DocumentMetadata(BaseModel):
 class DocumentUploadResponse(BaseModel):
     message: str
     namespace: Optional[str] = None
+    document_id: Optional[str] = None
     document_count: int
 
 
-class DocumentSearchRequest(BaseModel):
-    query: str
+class TabularUploadResponse(DocumentUploadResponse):
+    row_count: int
+
+
+class SearchOptions(BaseModel):
     k: Optional[int] = 10
     namespace: Optional[str] = None
     filter: Optional[Dict[str, Any]] = None
+    # mmr over-fetches fetch_k candidates, re-ranks them for diversity and merges overlapping neighbours
+    search_type: Literal["similarity", "mmr"] = "similarity"
+    fetch_k: Optional[int] = None
+    lambda_mult: Optional[float] = Field(None, ge=0.0, le=1.0)
+
+
+class DocumentSearchRequest(SearchOptions):
+    query: str
+
+
+class DocumentSearchBatchRequest(SearchOptions):
+    queries: List[str]
+    concurrency: Optional[int] = Field(None, ge=1)
 
 
 class DocumentChunk(BaseModel):
@@ -29,6 +46,44 @@ class DocumentSearchResponse(BaseModel):
     results: List[DocumentChunk]
 
 
+class DocumentSearchBatchItem(BaseModel):
+    index: int
+    query: str
+    results: Optional[List[DocumentChunk]] = None
+    error: Optional[str] = None
+
+
 class NamespaceDeleteResponse(BaseModel):
     message: str
-    namespace: Optional[str] = None
\ No newline at end of file
+    namespace: Optional[str] = None
+
+
+class DocumentInfo(BaseModel):
+    document_id: str
+    filename: str
+    namespace: Optional[str] = None
+    chunk_count: int
+    char_count: int
+    metadata: Optional[Dict[str, Any]] = None
+    created_at: float
+    updated_at: float
+
+
+class DocumentListResponse(BaseModel):
+    namespace: Optional[str] = None
+    documents: List[DocumentInfo]
+
+
+class NamespaceStatsResponse(BaseModel):
+    namespace: Optional[str] = None
+    document_count: int
+    chunk_count: int
+    char_count: int
+    last_updated: Optional[float] = None
+
+
+class DocumentDeleteResponse(BaseModel):
+    message: str
+    namespace: Optional[str] = None
+    document_id: str
+    chunk_count: int
@@ -0,0 +1,28 @@
+from typing import Optional, List, Dict, Any, Literal
+
+from pydantic import BaseModel
+
+JobStatus = Literal["queued", "running", "succeeded", "failed", "cancelled"]
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+
+
+class JobEvent(BaseModel):
+    event: str
+    data: Dict[str, Any]
+    at: float
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: JobStatus
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: List[JobEvent]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
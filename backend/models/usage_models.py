@@ -0,0 +1,34 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel
+
+UsageGroup = Literal["namespace", "session", "endpoint", "request", "model"]
+
+
+class UsageRow(BaseModel):
+    key: Optional[str] = None
+    requests: int
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cache_read_tokens: int
+    cache_write_tokens: int
+    cost: float
+
+
+class UsageSummaryResponse(BaseModel):
+    group_by: UsageGroup
+    since: float
+    rows: List[UsageRow]
+
+
+class BudgetStatusResponse(BaseModel):
+    namespace: Optional[str] = None
+    budget: Optional[float] = None
+    spent: float
+    remaining: Optional[float] = None
+
+
+class BudgetListResponse(BaseModel):
+    window_seconds: float
+    budgets: List[BudgetStatusResponse]
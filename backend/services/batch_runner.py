@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from core.metrics import BATCH_ITEMS
+
+
+async def run_bounded(
+        jobs: Sequence[Callable[[], Awaitable[Any]]],
+        concurrency: int,
+) -> AsyncIterator[Tuple[int, Any, Optional[Exception]]]:
+    """Run jobs with at most concurrency in flight, yielding (index, result, error) as each finishes.
+
+    A failing job is reported in its own tuple and does not stop the others.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, job: Callable[[], Awaitable[Any]]):
+        async with semaphore:
+            try:
+                return index, await job(), None
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.create_task(run(index, job)) for index, job in enumerate(jobs)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # the client went away mid-stream; nothing will read the remaining results
+        for task in tasks:
+            task.cancel()
+
+
+async def ndjson_lines(endpoint: str, items: AsyncIterator[BaseModel]) -> AsyncIterator[str]:
+    async for item in items:
+        BATCH_ITEMS.labels(endpoint, "error" if getattr(item, "error", None) else "ok").inc()
+        yield item.model_dump_json(exclude_none=True) + "\n"
@@ -0,0 +1,124 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from core.config import settings
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n|\n(?=\s*[-*•]|\s*\d+[.)]\s)")
+
+# rough English average; only used to size the budget, not for billing
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def split_sentences(text: str, min_chars: int = settings.CONTEXT_MIN_SENTENCE_CHARS) -> List[str]:
+    sentences = []
+    for part in SENTENCE_BOUNDARY.split(text):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        # fold fragments such as headings or "e.g." splits into the previous sentence
+        if sentences and len(part) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+@dataclass
+class CompressedChunk:
+    source: Dict[str, Any]
+    sentences: List[str]
+    score: float
+
+    def render(self) -> str:
+        source = ", ".join(f"{key}={value}" for key, value in self.source.items()) or "unknown"
+        return f"Source: {source}\nContent: {' '.join(self.sentences)}"
+
+
+class ContextCompressor:
+    """Cuts retrieved chunks down to the sentences most similar to the query.
+
+    Every chunk is split into sentences, all sentences are embedded in one
+    batch and scored by cosine similarity to the query vector. The best ones
+    are kept, across all chunks, until token_budget is used up, and are shown
+    in their original order under a source line that carries only
+    source_fields of the chunk metadata. Tabular chunks have no sentences and
+    are kept or dropped whole, with their header and row lines intact.
+    """
+
+    def __init__(
+            self,
+            embeddings: Embeddings,
+            token_budget: int = settings.CONTEXT_TOKEN_BUDGET,
+            source_fields: Sequence[str] = settings.CONTEXT_SOURCE_FIELDS,
+    ):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.source_fields = source_fields
+
+    @staticmethod
+    def split_document(document: Document) -> List[str]:
+        if "row_start" in document.metadata:
+            table = document.page_content.strip()
+            return [table] if table else []
+        return split_sentences(document.page_content)
+
+    def compress(
+            self,
+            query: str,
+            documents: List[Document],
+            query_vector: Optional[List[float]] = None,
+    ) -> List[CompressedChunk]:
+        sentences = [self.split_document(doc) for doc in documents]
+        flat = [sentence for doc_sentences in sentences for sentence in doc_sentences]
+        if not flat:
+            return []
+
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        q = np.asarray(query_vector, dtype=np.float32)
+        matrix = np.asarray(self.embeddings.embed_documents(flat), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(q)
+        scores = (matrix @ q) / np.where(norms == 0, 1, norms)
+
+        owner = np.repeat(np.arange(len(documents)), [len(s) for s in sentences])
+        offsets = np.concatenate([[0], np.cumsum([len(s) for s in sentences])[:-1]])
+
+        kept = []
+        used = 0
+        for index in np.argsort(-scores, kind="stable"):
+            cost = estimate_tokens(flat[index])
+            # the best sentence always goes in, even if it alone is over budget
+            if kept and used + cost > self.token_budget:
+                continue
+            kept.append(index)
+            used += cost
+
+        chunks = []
+        for doc_index, doc in enumerate(documents):
+            picked = sorted(i for i in kept if owner[i] == doc_index)
+            if not picked:
+                continue
+            chunks.append(CompressedChunk(
+                source={key: doc.metadata[key] for key in self.source_fields if key in doc.metadata},
+                sentences=[sentences[doc_index][i - offsets[doc_index]] for i in picked],
+                score=float(scores[picked].max()),
+            ))
+        chunks.sort(key=lambda chunk: chunk.score, reverse=True)
+        return chunks
+
+    def compress_to_text(
+            self,
+            query: str,
+            documents: List[Document],
+            query_vector: Optional[List[float]] = None,
+    ) -> str:
+        return "\n\n".join(chunk.render() for chunk in self.compress(query, documents, query_vector))
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    namespace TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    char_count INTEGER NOT NULL,
+    metadata TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, document_id)
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    namespace TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    chunk_id TEXT NOT NULL,
+    char_count INTEGER NOT NULL,
+    PRIMARY KEY (namespace, chunk_id)
+);
+CREATE INDEX IF NOT EXISTS chunks_by_document ON chunks (namespace, document_id);
+"""
+
+
+class DocumentExistsError(Exception):
+    pass
+
+
+@dataclass
+class DocumentRecord:
+    namespace: Optional[str]
+    document_id: str
+    filename: str
+    chunk_count: int
+    char_count: int
+    metadata: Optional[Dict[str, Any]]
+    created_at: float
+    updated_at: float
+
+
+@dataclass
+class NamespaceStats:
+    namespace: Optional[str]
+    document_count: int
+    chunk_count: int
+    char_count: int
+    last_updated: Optional[float]
+
+
+def namespace_key(namespace: Optional[str]) -> str:
+    # Pinecone treats no namespace as "", so the catalog does too
+    return namespace or ""
+
+
+def namespace_value(key: str) -> Optional[str]:
+    return key or None
+
+
+class DocumentCatalog:
+    """SQLite record of which documents, and which vector ids, live in each namespace.
+
+    The vector store only knows about chunks; the catalog is what lets a single
+    document be listed, replaced or deleted by id. DocumentVectorPipeline writes
+    to it after each successful upload.
+    """
+
+    def __init__(self, path: str = settings.DOCUMENT_CATALOG_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # one connection shared across the upload threads, serialised by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def record_document(
+            self,
+            namespace: Optional[str],
+            document_id: str,
+            filename: str,
+            chunks: Dict[str, int],
+            metadata: Optional[Dict[str, Any]] = None,
+            replace: bool = True,
+    ) -> List[str]:
+        """Store a document and its chunk ids (id -> chars), replacing any previous version.
+
+        Returns the chunk ids of the replaced version, which the caller still has to delete.
+        With replace=False, raises DocumentExistsError if the document is already
+        cataloged; the check and the write share one transaction, so concurrent
+        uploads of the same id can't both succeed.
+        """
+        ns = namespace_key(namespace)
+        now = time.time()
+        with self.lock, self.connection:
+            previous = self.connection.execute(
+                "SELECT created_at FROM documents WHERE namespace = ? AND document_id = ?", (ns, document_id)
+            ).fetchone()
+            if previous and not replace:
+                raise DocumentExistsError(f"Document {document_id!r} already exists in namespace {namespace!r}")
+            stale = [
+                row["chunk_id"] for row in self.connection.execute(
+                    "SELECT chunk_id FROM chunks WHERE namespace = ? AND document_id = ?", (ns, document_id)
+                )
+            ]
+            self.connection.execute("DELETE FROM chunks WHERE namespace = ? AND document_id = ?", (ns, document_id))
+            self.connection.executemany(
+                "INSERT INTO chunks (namespace, document_id, chunk_id, char_count) VALUES (?, ?, ?, ?)",
+                [(ns, document_id, chunk_id, chars) for chunk_id, chars in chunks.items()],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    ns, document_id, filename, len(chunks), sum(chunks.values()),
+                    json.dumps(metadata) if metadata else None,
+                    previous["created_at"] if previous else now, now,
+                ),
+            )
+        return [chunk_id for chunk_id in stale if chunk_id not in chunks]
+
+    def get_document(self, namespace: Optional[str], document_id: str) -> Optional[DocumentRecord]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM documents WHERE namespace = ? AND document_id = ?",
+                (namespace_key(namespace), document_id),
+            ).fetchone()
+        return self.to_record(row) if row else None
+
+    def list_documents(self, namespace: Optional[str], limit: int = 100, offset: int = 0) -> List[DocumentRecord]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM documents WHERE namespace = ? ORDER BY updated_at DESC, document_id LIMIT ? OFFSET ?",
+                (namespace_key(namespace), limit, offset),
+            ).fetchall()
+        return [self.to_record(row) for row in rows]
+
+    def chunk_ids(self, namespace: Optional[str], document_id: str) -> List[str]:
+        with self.lock:
+            return [
+                row["chunk_id"] for row in self.connection.execute(
+                    "SELECT chunk_id FROM chunks WHERE namespace = ? AND document_id = ?",
+                    (namespace_key(namespace), document_id),
+                )
+            ]
+
+    def remove_document(self, namespace: Optional[str], document_id: str) -> List[str]:
+        """Forget a document and return its chunk ids; empty if it was not cataloged."""
+        ns = namespace_key(namespace)
+        with self.lock, self.connection:
+            chunk_ids = [
+                row["chunk_id"] for row in self.connection.execute(
+                    "SELECT chunk_id FROM chunks WHERE namespace = ? AND document_id = ?", (ns, document_id)
+                )
+            ]
+            self.connection.execute("DELETE FROM chunks WHERE namespace = ? AND document_id = ?", (ns, document_id))
+            self.connection.execute("DELETE FROM documents WHERE namespace = ? AND document_id = ?", (ns, document_id))
+        return chunk_ids
+
+    def remove_namespace(self, namespace: Optional[str]):
+        ns = namespace_key(namespace)
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM chunks WHERE namespace = ?", (ns,))
+            self.connection.execute("DELETE FROM documents WHERE namespace = ?", (ns,))
+
+    def stats(self, namespace: Optional[str]) -> NamespaceStats:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT COUNT(*) AS documents, COALESCE(SUM(chunk_count), 0) AS chunks, "
+                "COALESCE(SUM(char_count), 0) AS chars, MAX(updated_at) AS last_updated "
+                "FROM documents WHERE namespace = ?",
+                (namespace_key(namespace),),
+            ).fetchone()
+        return NamespaceStats(
+            namespace=namespace,
+            document_count=row["documents"],
+            chunk_count=row["chunks"],
+            char_count=row["chars"],
+            last_updated=row["last_updated"],
+        )
+
+    @staticmethod
+    def to_record(row: sqlite3.Row) -> DocumentRecord:
+        return DocumentRecord(
+            namespace=namespace_value(row["namespace"]),
+            document_id=row["document_id"],
+            filename=row["filename"],
+            chunk_count=row["chunk_count"],
+            char_count=row["char_count"],
+            metadata=json.loads(row["metadata"]) if row["metadata"] else None,
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+        )
+
+
+document_catalog = DocumentCatalog()
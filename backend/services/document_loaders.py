@@ -0,0 +1,103 @@
+import csv
+import io
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterator, List
+
+from langchain_core.documents import Document
+
+from core.config import settings
+from services.document_workers import pdf_base_metadata, extract_pdf_pages
+
+# A loader turns a seekable binary stream plus the original filename into documents.
+Loader = Callable[[BinaryIO, str], List[Document]]
+
+loader_registry: Dict[str, Loader] = {}
+
+
+def register_loader(*extensions: str):
+    def decorator(loader: Loader) -> Loader:
+        for ext in extensions:
+            loader_registry[ext.lower()] = loader
+        return loader
+    return decorator
+
+
+def get_loader(ext: str) -> Loader:
+    loader = loader_registry.get(ext.lower())
+    if not loader:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return loader
+
+
+@contextmanager
+def as_stream(file_data: bytes | BinaryIO) -> Iterator[BinaryIO]:
+    """Present the upload as a seekable stream without writing it to disk when avoidable.
+
+    bytes are wrapped in place, seekable streams are used as they are, and
+    anything else is spooled: kept in memory up to DOCUMENT_SPOOL_MAX_BYTES,
+    rolled over to a temp file beyond that.
+    """
+    if isinstance(file_data, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(file_data)
+        return
+
+    if file_data.seekable():
+        file_data.seek(0)
+        yield file_data
+        return
+
+    with tempfile.SpooledTemporaryFile(max_size=settings.DOCUMENT_SPOOL_MAX_BYTES) as spooled:
+        shutil.copyfileobj(file_data, spooled)
+        spooled.seek(0)
+        yield spooled
+
+
+def read_text(stream: BinaryIO) -> str:
+    return stream.read().decode("utf-8")
+
+
+@register_loader(".txt")
+def load_text(stream: BinaryIO, source: str) -> List[Document]:
+    return [Document(page_content=read_text(stream), metadata={"source": source})]
+
+
+@register_loader(".md")
+def load_markdown(stream: BinaryIO, source: str) -> List[Document]:
+    from unstructured.partition.md import partition_md
+
+    elements = partition_md(text=read_text(stream))
+    return [Document(
+        page_content="\n\n".join(str(el) for el in elements),
+        metadata={"source": source},
+    )]
+
+
+@register_loader(".csv")
+def load_csv(stream: BinaryIO, source: str) -> List[Document]:
+    # same row rendering as langchain's CSVLoader
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    try:
+        return [
+            Document(
+                page_content="\n".join(
+                    f"{k.strip() if k is not None else k}: "
+                    f"{v.strip() if isinstance(v, str) else ','.join(map(str.strip, v)) if isinstance(v, list) else v}"
+                    for k, v in row.items()
+                ),
+                metadata={"source": source, "row": i},
+            )
+            for i, row in enumerate(csv.DictReader(text))
+        ]
+    finally:
+        # leave the caller's stream open
+        text.detach()
+
+
+@register_loader(".pdf")
+def load_pdf(stream: BinaryIO, source: str) -> List[Document]:
+    import pypdf
+
+    reader = pypdf.PdfReader(stream)
+    return extract_pdf_pages(reader, pdf_base_metadata(reader, source), 0, len(reader.pages))
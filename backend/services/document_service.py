@@ -1,19 +1,29 @@
+import io
 import os
 import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain
 from pathlib import Path
-from typing import List, BinaryIO, Optional, Dict, Any
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredMarkdownLoader, CSVLoader
+from typing import List, BinaryIO, Optional, Dict, Any, Tuple, Iterable
 from langchain_core.documents import Document
 from langchain_pinecone import PineconeVectorStore
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+from core.config import settings
+from services.document_catalog import DocumentCatalog, DocumentExistsError, DocumentRecord, document_catalog
+from services.document_loaders import get_loader, as_stream
+from services.document_workers import parse_and_split_pdf_pages, split_documents, ordered_map
 from services.pinecone_vector_service import pinecone_vector_service
+from services.tabular_ingestion import TabularChunker
 
 
 class DocumentProcessorService:
     def __init__(
             self,
             chunk_size: int = 1000,
-            chunk_overlap: int = 200
+            chunk_overlap: int = 200,
+            parallel_workers: int = settings.DOCUMENT_PARALLEL_WORKERS,
     ):
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
@@ -21,46 +31,78 @@ class DocumentProcessorService:
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
+        self.parallel_workers = parallel_workers
+        self.max_in_flight = settings.DOCUMENT_MAX_IN_FLIGHT or parallel_workers * 2
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.parallel_workers)
+        return self.pool
+
+    @staticmethod
+    @contextmanager
+    def temp_file(file_data: bytes, ext: str):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
+            tmp_file.write(file_data)
+            tmp_path = tmp_file.name
+
+        try:
+            yield tmp_path
+        finally:
+            os.unlink(tmp_path)
 
     def load_document(
             self,
             file_data: bytes | BinaryIO,
             filename: str
     ) -> List[Document]:
-        ext = Path(filename).suffix.lower()
-
-        loaders = {
-            '.pdf': PyPDFLoader,
-            '.txt': TextLoader,
-            '.md': UnstructuredMarkdownLoader,
-            '.csv': CSVLoader
-        }
-
-        loader_class = loaders.get(ext)
-        if not loader_class:
-            raise ValueError(f"Unsupported file type: {ext}")
+        loader = get_loader(Path(filename).suffix)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
-            if isinstance(file_data, bytes):
-                tmp_file.write(file_data)
-            else:
-                tmp_file.write(file_data.read())
-            tmp_path = tmp_file.name
-
-        try:
-            loader = loader_class(tmp_path)
-            documents = loader.load()
-        finally:
-            os.unlink(tmp_path)
+        with as_stream(file_data) as stream:
+            return loader(stream, filename)
 
-        return documents
+    def load_and_split_pdf_parallel(
+            self,
+            file_data: bytes,
+            filename: str,
+    ) -> Optional[List[Document]]:
+        import pypdf
+
+        total_pages = len(pypdf.PdfReader(io.BytesIO(file_data)).pages)
+        if total_pages < settings.DOCUMENT_PARALLEL_MIN_PAGES:
+            return None
+
+        # pool workers each open the file themselves, so this path still needs it on disk
+        with self.temp_file(file_data, ".pdf") as tmp_path:
+            step = settings.DOCUMENT_PAGES_PER_TASK
+            tasks = (
+                (tmp_path, filename, start, min(start + step, total_pages), self.text_splitter)
+                for start in range(0, total_pages, step)
+            )
+            return list(chain.from_iterable(
+                ordered_map(self.get_pool(), parse_and_split_pdf_pages, tasks, self.max_in_flight)
+            ))
+
+    def split_parallel(self, documents: List[Document]) -> List[Document]:
+        step = settings.DOCUMENT_SPLIT_DOCS_PER_TASK
+        tasks = (
+            (documents[start:start + step], self.text_splitter)
+            for start in range(0, len(documents), step)
+        )
+        return list(chain.from_iterable(
+            ordered_map(self.get_pool(), split_documents, tasks, self.max_in_flight)
+        ))
 
     def process_documents(
             self,
             documents: List[Document],
             metadata: Optional[Dict[str, Any]] = None
     ) -> List[Document]:
-        chunks = self.text_splitter.split_documents(documents)
+        if self.parallel_workers > 1 and len(documents) > settings.DOCUMENT_SPLIT_DOCS_PER_TASK:
+            chunks = self.split_parallel(documents)
+        else:
+            chunks = self.text_splitter.split_documents(documents)
 
         if metadata:
             for chunk in chunks:
@@ -74,6 +116,18 @@ class DocumentProcessorService:
             filename: str,
             metadata: Optional[Dict[str, Any]] = None
     ) -> List[Document]:
+        if self.parallel_workers > 1 and Path(filename).suffix.lower() == ".pdf":
+            # pages are parsed and split together in the pool; small PDFs fall through to the serial path
+            if not isinstance(file_data, bytes):
+                file_data = file_data.read()
+            chunks = self.load_and_split_pdf_parallel(file_data, filename)
+
+            if chunks is not None:
+                if metadata:
+                    for chunk in chunks:
+                        chunk.metadata.update(metadata)
+                return chunks
+
         documents = self.load_document(file_data, filename)
         return self.process_documents(documents, metadata)
 
@@ -83,23 +137,112 @@ class DocumentVectorPipeline:
     def __init__(
             self,
             processor: DocumentProcessorService,
-            vector_service: PineconeVectorStore
+            vector_service: PineconeVectorStore,
+            catalog: DocumentCatalog = document_catalog
     ):
         self.processor = processor
         self.vector_service = vector_service
+        self.catalog = catalog
+
+    def check_new(self, namespace: Optional[str], document_id: str, replace: bool):
+        # fails fast before any parsing or embedding; record_document re-checks atomically
+        if not replace and self.catalog.get_document(namespace, document_id) is not None:
+            raise DocumentExistsError(f"Document {document_id!r} already exists in namespace {namespace!r}")
+
+    def upload_batches(
+            self,
+            batches: Iterable[List[Document]],
+            filename: str,
+            document_id: str,
+            namespace: Optional[str] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+            replace: bool = True
+    ) -> DocumentRecord:
+        """Upload chunk batches under fresh ids and catalog them as one document.
+
+        A previous version is only deleted once the new one is fully uploaded,
+        so searches never see the document missing. If the upload fails part
+        way, or another upload cataloged the same id first and replace is False,
+        whatever was already uploaded is deleted again.
+        """
+        chunk_sizes: Dict[str, int] = {}
+        try:
+            for batch in batches:
+                if not batch:
+                    continue
+                ids = [uuid.uuid4().hex for _ in batch]
+                for chunk in batch:
+                    chunk.metadata["document_id"] = document_id
+                self.vector_service.upload_documents(batch, namespace, ids=ids)
+                chunk_sizes.update(zip(ids, (len(chunk.page_content) for chunk in batch)))
+            stale = self.catalog.record_document(namespace, document_id, filename, chunk_sizes, metadata, replace)
+        except Exception:
+            if chunk_sizes:
+                self.vector_service.delete_ids(list(chunk_sizes), namespace)
+            raise
+
+        if stale:
+            self.vector_service.delete_ids(stale, namespace)
+        return self.catalog.get_document(namespace, document_id)
 
     def process_and_upload(
             self,
             file_data: bytes | BinaryIO,
             filename: str,
             namespace: Optional[str] = None,
-            metadata: Optional[Dict[str, Any]] = None
-    ) -> PineconeVectorStore:
+            metadata: Optional[Dict[str, Any]] = None,
+            document_id: Optional[str] = None,
+            replace: bool = False
+    ) -> DocumentRecord:
+        document_id = document_id or filename
+        self.check_new(namespace, document_id, replace)
+
         chunks = self.processor.load_and_process(file_data, filename, metadata)
 
-        vectorstore = self.vector_service.upload_documents(chunks, namespace)
+        return self.upload_batches([chunks], filename, document_id, namespace, metadata, replace)
 
-        return vectorstore
+    def process_and_upload_tabular(
+            self,
+            file_data: bytes | BinaryIO,
+            filename: str,
+            namespace: Optional[str] = None,
+            metadata: Optional[Dict[str, Any]] = None,
+            rows_per_chunk: int = settings.TABULAR_ROWS_PER_CHUNK,
+            metadata_columns: Optional[List[str]] = None,
+            document_id: Optional[str] = None,
+            replace: bool = False
+    ) -> Tuple[int, DocumentRecord]:
+        """Stream a CSV in row batches and upload multi-row chunks as they fill.
+
+        Returns (rows read, catalog record).
+        """
+        document_id = document_id or filename
+        self.check_new(namespace, document_id, replace)
+        chunker = TabularChunker(rows_per_chunk=rows_per_chunk, metadata_columns=metadata_columns)
+
+        with as_stream(file_data) as stream:
+            record = self.upload_batches(
+                chunker.iter_batches(stream, filename, metadata=metadata),
+                filename, document_id, namespace, metadata, replace,
+            )
+
+        return chunker.row_count, record
+
+    def delete_document(
+            self,
+            document_id: str,
+            namespace: Optional[str] = None
+    ) -> Optional[DocumentRecord]:
+        record = self.catalog.get_document(namespace, document_id)
+        if record is None:
+            return None
+        self.vector_service.delete_ids(self.catalog.chunk_ids(namespace, document_id), namespace)
+        self.catalog.remove_document(namespace, document_id)
+        return record
+
+    def delete_namespace(self, namespace: str):
+        self.vector_service.delete_namespace(namespace)
+        self.catalog.remove_namespace(namespace)
 
 
 document_processor_service = DocumentProcessorService()
@@ -0,0 +1,66 @@
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import TextSplitter
+
+# Runs inside pool processes, so this module must stay cheap to import:
+# no services, no vector store clients.
+
+
+def pdf_base_metadata(reader, source: str) -> Dict[str, Any]:
+    metadata = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    for key, value in (reader.metadata or {}).items():
+        metadata[key.lstrip("/").lower()] = str(value)
+    metadata["source"] = source
+    metadata["total_pages"] = len(reader.pages)
+    return metadata
+
+
+def extract_pdf_pages(reader, base_metadata: Dict[str, Any], start: int, end: int) -> List[Document]:
+    labels = reader.page_labels
+    return [
+        Document(
+            page_content=reader.pages[number].extract_text().strip(),
+            metadata=base_metadata | {"page": number, "page_label": labels[number]},
+        )
+        for number in range(start, end)
+    ]
+
+
+def parse_and_split_pdf_pages(
+        path: str,
+        source: str,
+        start: int,
+        end: int,
+        text_splitter: TextSplitter,
+) -> List[Document]:
+    import pypdf
+
+    reader = pypdf.PdfReader(path)
+    pages = extract_pdf_pages(reader, pdf_base_metadata(reader, source), start, end)
+    return text_splitter.split_documents(pages)
+
+
+def split_documents(documents: List[Document], text_splitter: TextSplitter) -> List[Document]:
+    return text_splitter.split_documents(documents)
+
+
+def ordered_map(
+        pool: Executor,
+        fn: Callable,
+        arg_tuples: Iterable[Tuple],
+        max_in_flight: int,
+) -> Iterator[Any]:
+    """Like pool.map, but never has more than max_in_flight tasks submitted at once.
+
+    Results are yielded in submission order regardless of completion order.
+    """
+    in_flight = deque()
+    for args in arg_tuples:
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+        in_flight.append(pool.submit(fn, *args))
+    while in_flight:
+        yield in_flight.popleft().result()
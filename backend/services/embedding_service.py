@@ -0,0 +1,158 @@
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.config import settings
+from core.metrics import stage_timer
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str, max_length: int):
+    # loaded and configured once per process, shared by every OnnxEmbeddings instance
+    from huggingface_hub import hf_hub_download
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(hf_hub_download(repo_id=model_name, filename="tokenizer.json"))
+    tokenizer.enable_truncation(max_length=max_length)
+    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+    return tokenizer
+
+
+@lru_cache(maxsize=None)
+def load_onnx_session(model_name: str, onnx_file: str, num_threads: int):
+    try:
+        import onnxruntime as ort
+    except ImportError as exc:
+        raise ImportError("EMBEDDING_BACKEND=onnx requires the onnxruntime package") from exc
+
+    if os.path.exists(onnx_file):
+        model_path = onnx_file
+    else:
+        from huggingface_hub import hf_hub_download
+        model_path = hf_hub_download(repo_id=model_name, filename=onnx_file)
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads > 0:
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+
+    return ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+class OnnxEmbeddings(Embeddings):
+    """Sentence-transformers model run through ONNX Runtime on CPU.
+
+    Mean pooling and L2 normalisation match the sentence-transformers pipeline,
+    so vectors are interchangeable with HuggingFaceEmbeddings for the same model.
+    """
+
+    def __init__(
+            self,
+            model_name: str = settings.EMBEDDING_MODEL_NAME,
+            onnx_file: str = settings.EMBEDDING_ONNX_FILE,
+            batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+            num_threads: int = settings.EMBEDDING_NUM_THREADS,
+            max_length: int = settings.EMBEDDING_MAX_SEQ_LENGTH,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.session = load_onnx_session(model_name, onnx_file, num_threads)
+        self.tokenizer = load_tokenizer(model_name, max_length)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # sort by length so each batch pads to a similar size, then restore order
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [texts[i] for i in order[start:start + self.batch_size]]
+            batches.append(self.encode_batch(batch))
+
+        sorted_vectors = np.concatenate(batches)
+        vectors = np.empty_like(sorted_vectors)
+        vectors[order] = sorted_vectors
+        return vectors
+
+    def encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+class InstrumentedEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with stage_timer("embed_documents"):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with stage_timer("embed_query"):
+            return self.embeddings.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with stage_timer("embed_query"):
+            return await self.embeddings.aembed_query(text)
+
+
+def create_embeddings(backend: Optional[str] = None) -> Embeddings:
+    backend = backend or settings.EMBEDDING_BACKEND
+
+    if backend == "huggingface":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if settings.EMBEDDING_NUM_THREADS > 0:
+            import torch
+            torch.set_num_threads(settings.EMBEDDING_NUM_THREADS)
+
+        return HuggingFaceEmbeddings(
+            model_name=settings.EMBEDDING_MODEL_NAME,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"batch_size": settings.EMBEDDING_BATCH_SIZE},
+        )
+    elif backend == "onnx":
+        return OnnxEmbeddings()
+    elif backend == "remote":
+        from services.embedding_worker import RemoteEmbeddings
+        return RemoteEmbeddings()
+    elif backend == "fake":
+        # hash-seeded random vectors; only meaningful for offline tests and benchmarks
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=384)
+    else:
+        raise ValueError(f"Unhandled embedding backend: {backend}")
+
+
+def create_service_embeddings() -> Embeddings:
+    # query micro-batching and stage timing on top of the configured backend
+    from services.query_batcher import MicroBatchingEmbeddings
+
+    embeddings = create_embeddings()
+    if settings.EMBEDDING_QUERY_BATCH_SIZE > 1:
+        embeddings = MicroBatchingEmbeddings(embeddings)
+    return InstrumentedEmbeddings(embeddings)
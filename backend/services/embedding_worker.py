@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.config import settings
+from core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# frame layout: 4-byte big-endian header length, JSON header, optional raw float32 payload
+HEADER = struct.Struct(">I")
+
+
+class EmbeddingServiceBusy(RuntimeError):
+    pass
+
+
+_worker_embeddings: Optional[Embeddings] = None
+
+
+def init_worker(embeddings_factory: Callable[[], Embeddings]):
+    global _worker_embeddings
+    _worker_embeddings = embeddings_factory()
+
+
+def encode_in_worker(texts: List[str]) -> np.ndarray:
+    if hasattr(_worker_embeddings, "encode"):
+        return np.ascontiguousarray(_worker_embeddings.encode(texts), dtype=np.float32)
+    return np.asarray(_worker_embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def local_embeddings_factory(backend: str) -> Embeddings:
+    from services.embedding_service import create_embeddings
+    return create_embeddings(backend)
+
+
+class EmbeddingWorkerServer:
+    """Serves embeddings from a pool of worker processes over a Unix socket.
+
+    Requests wait in a bounded queue; once it is full new requests are
+    answered with a busy status instead of piling up behind a long ingestion.
+    """
+
+    def __init__(
+            self,
+            socket_path: str = settings.EMBEDDING_WORKER_SOCKET,
+            processes: int = settings.EMBEDDING_WORKER_PROCESSES,
+            queue_size: int = settings.EMBEDDING_WORKER_QUEUE_SIZE,
+            embeddings_factory: Optional[Callable[[], Embeddings]] = None,
+    ):
+        self.socket_path = socket_path
+        self.processes = processes
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.embeddings_factory = embeddings_factory or partial(
+            local_embeddings_factory, settings.EMBEDDING_WORKER_BACKEND
+        )
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.dispatchers: List[asyncio.Task] = []
+
+    async def start(self):
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=init_worker,
+            initargs=(self.embeddings_factory,),
+        )
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.processes)]
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            texts, future = await self.queue.get()
+            try:
+                vectors = await loop.run_in_executor(self.pool, encode_in_worker, texts)
+                if not future.done():
+                    future.set_result(vectors)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break
+                request = json.loads(await reader.readexactly(length))
+
+                future = asyncio.get_running_loop().create_future()
+                try:
+                    self.queue.put_nowait((request["texts"], future))
+                except asyncio.QueueFull:
+                    await self.send(writer, {"status": "busy"})
+                    continue
+
+                try:
+                    vectors = await future
+                except Exception as e:
+                    await self.send(writer, {"status": "error", "detail": str(e)})
+                    continue
+
+                rows, dim = vectors.shape
+                await self.send(writer, {"status": "ok", "rows": rows, "dim": dim}, vectors.data)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def send(writer: asyncio.StreamWriter, header: dict, payload=None):
+        encoded = json.dumps(header).encode()
+        writer.write(HEADER.pack(len(encoded)) + encoded)
+        if payload is not None:
+            writer.write(payload)
+        await writer.drain()
+
+
+class RemoteEmbeddings(Embeddings):
+    """Client for EmbeddingWorkerServer.
+
+    Results are received straight into a float32 buffer and exposed as a NumPy
+    view over it, so `encode` never copies the vectors after they arrive.
+    """
+
+    def __init__(
+            self,
+            socket_path: str = settings.EMBEDDING_WORKER_SOCKET,
+            request_size: int = settings.EMBEDDING_WORKER_REQUEST_SIZE,
+            timeout: float = settings.EMBEDDING_WORKER_TIMEOUT,
+            busy_retry_timeout: float = settings.EMBEDDING_WORKER_BUSY_RETRY_TIMEOUT,
+    ):
+        self.socket_path = socket_path
+        self.request_size = request_size
+        self.timeout = timeout
+        self.busy_retry_timeout = busy_retry_timeout
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+
+            parts = [
+                self.request(sock, texts[start:start + self.request_size])
+                for start in range(0, len(texts), self.request_size)
+            ]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def request(self, sock: socket.socket, texts: List[str]) -> np.ndarray:
+        encoded = json.dumps({"texts": texts}).encode()
+        deadline = time.monotonic() + self.busy_retry_timeout
+        backoff = 0.005
+
+        while True:
+            sock.sendall(HEADER.pack(len(encoded)) + encoded)
+            header = self.recv_header(sock)
+
+            if header["status"] == "ok":
+                break
+            if header["status"] == "busy":
+                if time.monotonic() + backoff > deadline:
+                    raise EmbeddingServiceBusy("Embedding worker queue is full")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 0.5)
+                continue
+            raise RuntimeError(f"Embedding worker error: {header.get('detail')}")
+
+        buffer = bytearray(header["rows"] * header["dim"] * 4)
+        self.recv_into(sock, memoryview(buffer))
+        return np.frombuffer(buffer, dtype=np.float32).reshape(header["rows"], header["dim"])
+
+    def recv_header(self, sock: socket.socket) -> dict:
+        size = bytearray(HEADER.size)
+        self.recv_into(sock, memoryview(size))
+        (length,) = HEADER.unpack(size)
+        body = bytearray(length)
+        self.recv_into(sock, memoryview(body))
+        return json.loads(body)
+
+    @staticmethod
+    def recv_into(sock: socket.socket, view: memoryview):
+        while len(view):
+            received = sock.recv_into(view)
+            if not received:
+                raise ConnectionError("Embedding worker closed the connection")
+            view = view[received:]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+
+def main():
+    setup_logging()
+    server = EmbeddingWorkerServer()
+    logger.info("embedding worker listening on %s with %d processes", server.socket_path, server.processes)
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
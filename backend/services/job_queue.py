@@ -0,0 +1,228 @@
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+from core.config import settings
+from core.metrics import QUEUE_TASKS
+from services.usage_accounting import usage_payload
+
+logger = logging.getLogger(__name__)
+
+# task kinds understood by services.research_worker
+RESEARCH = "research"
+DECOMPOSE = "decompose"
+TASK_KINDS = (RESEARCH, DECOMPOSE)
+
+memory_server = None
+
+
+def create_redis_client(url: str = settings.QUEUE_URL):
+    """redis.asyncio client for url; memory:// gives an in-process fakeredis server shared by all clients."""
+    global memory_server
+    if url.startswith("memory://"):
+        try:
+            import fakeredis
+        except ImportError as exc:
+            raise ImportError("QUEUE_URL=memory:// requires the fakeredis package") from exc
+        if memory_server is None:
+            memory_server = fakeredis.FakeServer()
+        return fakeredis.FakeAsyncRedis(server=memory_server, decode_responses=True)
+
+    import redis.asyncio as redis
+    return redis.from_url(url, decode_responses=True)
+
+
+class RemoteTaskError(RuntimeError):
+    pass
+
+
+@dataclass
+class Task:
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class TaskQueue:
+    """At-least-once task queue over the Redis protocol.
+
+    Layout, all under prefix:
+        pending:{kind}     list of task ids waiting for a worker
+        processing:{kind}  list of task ids claimed by a worker
+        leases             sorted set, task id -> lease expiry (unix time)
+        task:{id}          hash with kind, payload and attempt count
+        result:{id}        list the submitter blocks on for the result
+        worker:{id}        expiring key per live worker
+
+    Claiming moves an id from pending to processing atomically and then
+    takes a lease, which the worker extends while it runs. reap() returns
+    tasks whose lease ran out to the front of pending, so a crashed or
+    partitioned worker only delays its tasks. Because of that a task can
+    run more than once; the submitter takes the first result.
+    """
+
+    def __init__(
+            self,
+            redis,
+            prefix: str = settings.QUEUE_PREFIX,
+            lease_seconds: float = settings.QUEUE_LEASE_SECONDS,
+            max_attempts: int = settings.QUEUE_MAX_ATTEMPTS,
+            result_ttl: int = settings.QUEUE_RESULT_TTL,
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+
+    def key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        task_id = uuid.uuid4().hex
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.key("task", task_id), mapping={
+                "kind": kind,
+                "payload": json.dumps(payload),
+                "attempts": 0,
+            })
+            pipe.lpush(self.key("pending", kind), task_id)
+            await pipe.execute()
+        return task_id
+
+    async def wait_result(self, task_id: str, timeout: float = settings.QUEUE_RESULT_TIMEOUT) -> Any:
+        item = await self.redis.blpop([self.key("result", task_id)], timeout=timeout)
+        if item is None:
+            raise TimeoutError(f"No result for task {task_id} after {timeout}s")
+        result = json.loads(item[1])
+        if "error" in result:
+            raise RemoteTaskError(result["error"])
+        return result["result"]
+
+    async def call(self, kind: str, payload: Dict[str, Any], timeout: float = settings.QUEUE_RESULT_TIMEOUT) -> Any:
+        return await self.wait_result(await self.submit(kind, payload), timeout)
+
+    async def claim(self, kind: str, timeout: float = 1.0) -> Optional[Task]:
+        # BRPOPLPUSH rather than BLMOVE: same semantics, and fakeredis does not block on BLMOVE
+        task_id = await self.redis.brpoplpush(self.key("pending", kind), self.key("processing", kind), timeout)
+        if task_id is None:
+            return None
+
+        await self.redis.zadd(self.key("leases"), {task_id: time.time() + self.lease_seconds})
+        attempts = await self.redis.hincrby(self.key("task", task_id), "attempts", 1)
+        data = await self.redis.hgetall(self.key("task", task_id))
+        if "payload" not in data:
+            # finished elsewhere after a redelivery; drop the stale id and the hash hincrby just recreated
+            await self.redis.delete(self.key("task", task_id))
+            await self.forget(kind, task_id)
+            return None
+        return Task(id=task_id, kind=kind, payload=json.loads(data["payload"]), attempts=attempts)
+
+    async def extend(self, task_ids: Iterable[str]):
+        expiry = time.time() + self.lease_seconds
+        leases = {task_id: expiry for task_id in task_ids}
+        if leases:
+            await self.redis.zadd(self.key("leases"), leases, xx=True)
+
+    async def complete(self, task: Task, result: Any = None, error: Optional[str] = None):
+        body = {"error": error} if error is not None else {"result": result}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(self.key("result", task.id), json.dumps(body, default=str))
+            pipe.expire(self.key("result", task.id), self.result_ttl)
+            pipe.delete(self.key("task", task.id))
+            await pipe.execute()
+        await self.forget(task.kind, task.id)
+        QUEUE_TASKS.labels(task.kind, "failed" if error is not None else "completed").inc()
+
+    async def release(self, task: Task):
+        """Hand a task back without counting the attempt, e.g. on worker shutdown."""
+        if await self.redis.zrem(self.key("leases"), task.id):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lrem(self.key("processing", task.kind), 1, task.id)
+                pipe.hincrby(self.key("task", task.id), "attempts", -1)
+                pipe.rpush(self.key("pending", task.kind), task.id)
+                await pipe.execute()
+            QUEUE_TASKS.labels(task.kind, "released").inc()
+
+    async def forget(self, kind: str, task_id: str):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.key("leases"), task_id)
+            pipe.lrem(self.key("processing", kind), 1, task_id)
+            await pipe.execute()
+
+    async def reap(self, kinds: Iterable[str] = TASK_KINDS) -> int:
+        now = time.time()
+        leases = self.key("leases")
+
+        # ids claimed by a worker that died before taking the lease
+        for kind in kinds:
+            for task_id in await self.redis.lrange(self.key("processing", kind), 0, -1):
+                await self.redis.zadd(leases, {task_id: now + self.lease_seconds}, nx=True)
+
+        redelivered = 0
+        for task_id in await self.redis.zrangebyscore(leases, 0, now):
+            # only one reaper wins the zrem, so a task is never requeued twice
+            if not await self.redis.zrem(leases, task_id):
+                continue
+            data = await self.redis.hgetall(self.key("task", task_id))
+            if "kind" not in data:
+                continue
+            kind = data["kind"]
+            task = Task(id=task_id, kind=kind, payload={}, attempts=int(data["attempts"]))
+
+            if task.attempts >= self.max_attempts:
+                logger.warning("Task %s lost its lease %d times, giving up", task_id, task.attempts)
+                await self.complete(task, error=f"Task abandoned after {task.attempts} attempts")
+                continue
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.lrem(self.key("processing", kind), 1, task_id)
+                pipe.rpush(self.key("pending", kind), task_id)
+                await pipe.execute()
+            QUEUE_TASKS.labels(kind, "redelivered").inc()
+            redelivered += 1
+        return redelivered
+
+    async def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        await self.redis.set(self.key("worker", worker_id), json.dumps(info), ex=int(self.lease_seconds))
+
+    async def workers(self) -> Dict[str, Dict[str, Any]]:
+        workers = {}
+        async for key in self.redis.scan_iter(match=self.key("worker", "*")):
+            value = await self.redis.get(key)
+            if value is not None:
+                workers[key.rsplit(":", 1)[1]] = json.loads(value)
+        return workers
+
+
+class QueuedResearchAgent:
+    """Stands in for a ResearchAgent and runs each query on the worker fleet.
+
+    Passed to QueryDecompositionChain so sub-questions fan out across workers.
+    """
+
+    def __init__(
+            self,
+            queue: TaskQueue,
+            namespace: Optional[str] = None,
+            max_iterations: Optional[int] = None,
+    ):
+        self.queue = queue
+        self.namespace = namespace
+        self.max_iterations = max_iterations
+
+    async def research(self, query: str) -> Dict[str, Any]:
+        output = await self.queue.call(RESEARCH, {
+            "query": query,
+            "namespace": self.namespace,
+            "max_iterations": self.max_iterations,
+            **usage_payload(),
+        })
+        return {"input": query, "output": output}
+
+
+research_queue = TaskQueue(create_redis_client())
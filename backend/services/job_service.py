@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from core.metrics import JOBS_FINISHED, JOB_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"succeeded", "failed", "cancelled"}
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    run: Callable[["Job"], Awaitable[Any]]
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Any = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        self.events.append({"event": event, "data": data, "at": time.time()})
+        # wake current subscribers, later ones wait on a fresh event
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def set_status(self, status: str, **data):
+        self.status = status
+        self.publish("status", {"status": status, **data})
+
+
+class JobService:
+    """Bounded in-process worker pool for long-running agent work.
+
+    Jobs wait in a bounded queue and are picked up by a fixed number of
+    worker tasks, so capacity no longer depends on how many HTTP connections
+    are open. Finished jobs stay queryable for result_ttl seconds.
+    """
+
+    def __init__(
+            self,
+            workers: int = settings.JOB_WORKERS,
+            queue_size: int = settings.JOB_QUEUE_SIZE,
+            result_ttl: float = settings.JOB_RESULT_TTL,
+    ):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.result_ttl = result_ttl
+        self.jobs: Dict[str, Job] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker_tasks: List[asyncio.Task] = []
+        self.stopping = False
+
+    async def start(self):
+        self.stopping = False
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.worker_tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self.stopping = True
+        for job in self.jobs.values():
+            if not job.done:
+                self.cancel(job.id)
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.worker_tasks = []
+
+    def submit(self, kind: str, run: Callable[[Job], Awaitable[Any]]) -> Job:
+        if self.queue is None:
+            raise RuntimeError("Job service is not running")
+        self.prune()
+
+        job = Job(id=uuid.uuid4().hex, kind=kind, run=run)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull("Job queue is full, try again later")
+
+        self.jobs[job.id] = job
+        job.set_status("queued")
+        JOB_QUEUE_DEPTH.set(self.queue.qsize())
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.prune()
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # still queued, the worker skips it when it comes up
+            self.finish(job, "cancelled")
+        return job
+
+    async def subscribe(self, job: Job) -> AsyncIterator[Dict[str, Any]]:
+        seen = 0
+        while True:
+            waiter = job.changed
+            while seen < len(job.events):
+                yield job.events[seen]
+                seen += 1
+            if job.done:
+                return
+            await waiter.wait()
+
+    def prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job.done and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def finish(self, job: Job, status: str, **data):
+        job.finished_at = time.time()
+        job.set_status(status, **data)
+        JOBS_FINISHED.labels(job.kind, status).inc()
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            JOB_QUEUE_DEPTH.set(self.queue.qsize())
+            try:
+                if not job.done:
+                    await self.execute(job)
+            finally:
+                self.queue.task_done()
+
+    async def execute(self, job: Job):
+        job.started_at = time.time()
+        job.set_status("running")
+        job.task = asyncio.create_task(job.run(job))
+        try:
+            job.result = await job.task
+        except asyncio.CancelledError:
+            job.task.cancel()
+            self.finish(job, "cancelled")
+            if self.stopping:
+                raise
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.error = str(e)
+            self.finish(job, "failed", error=job.error)
+        else:
+            self.finish(job, "succeeded")
+
+
+job_service = JobService()
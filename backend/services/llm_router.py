@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict
+
+from core.config import settings
+from core.metrics import LLM_ROUTER_EVENTS, LLM_CIRCUIT_OPEN
+
+logger = logging.getLogger(__name__)
+
+
+class BackendHealth:
+    """Rolling latency and error stats plus a circuit breaker for one provider.
+
+    Shared between a backend and every tool-bound copy of it, so all agents
+    see the same picture of provider health.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            window: int = settings.LLM_ROUTER_WINDOW,
+            breaker_failures: int = settings.LLM_ROUTER_BREAKER_FAILURES,
+            breaker_error_rate: float = settings.LLM_ROUTER_BREAKER_ERROR_RATE,
+            breaker_cooldown: float = settings.LLM_ROUTER_BREAKER_COOLDOWN,
+            min_samples: int = settings.LLM_ROUTER_MIN_SAMPLES,
+    ):
+        self.name = name
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.breaker_failures = breaker_failures
+        self.breaker_error_rate = breaker_error_rate
+        self.breaker_cooldown = breaker_cooldown
+        self.min_samples = min_samples
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+
+    @property
+    def error_rate(self) -> float:
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if len(self.latencies) < self.min_samples:
+            return None
+        return float(np.percentile(self.latencies, percentile))
+
+    def available(self) -> bool:
+        """Closed breaker, or open past its cooldown with no trial request running yet (half-open)."""
+        if self.open_until == 0.0:
+            return True
+        return time.monotonic() >= self.open_until and not self.trial_in_flight
+
+    def acquire(self) -> bool:
+        """Claims the half-open trial; True if this caller got it and must record or release it."""
+        if self.open_until and time.monotonic() >= self.open_until and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(1)
+        self.consecutive_failures = 0
+        if self.open_until:
+            logger.info("LLM backend %s recovered, closing circuit", self.name)
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        LLM_CIRCUIT_OPEN.labels(self.name).set(0)
+
+    def record_failure(self):
+        self.outcomes.append(0)
+        self.consecutive_failures += 1
+        tripped = (
+            self.consecutive_failures >= self.breaker_failures
+            or (len(self.outcomes) >= self.min_samples and self.error_rate >= self.breaker_error_rate)
+        )
+        if tripped or self.trial_in_flight:
+            self.open_until = time.monotonic() + self.breaker_cooldown
+            self.trial_in_flight = False
+            logger.warning(
+                "LLM backend %s degraded (error rate %.2f), opening circuit for %.0fs",
+                self.name, self.error_rate, self.breaker_cooldown,
+            )
+            LLM_ROUTER_EVENTS.labels(self.name, "circuit_open").inc()
+            LLM_CIRCUIT_OPEN.labels(self.name).set(1)
+
+    def release(self):
+        # only for the caller that claimed the trial: a cancelled hedge loser, or a trial never sent,
+        # says nothing about provider health
+        self.trial_in_flight = False
+
+
+class RoutingChatModel(BaseChatModel):
+    """Chat model that spreads calls over several provider backends.
+
+    Backends are listed in order of preference. Each call goes to the first
+    one whose circuit is closed, unless another healthy backend has been
+    faster by more than switch_ratio at the median. Errors fail over to the
+    next backend straight away. When a call outlives the chosen backend's
+    hedge_percentile latency, the same request is also sent to the next
+    backend and whichever answers first wins.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    backends: List[Runnable]
+    health: List[BackendHealth]
+    switch_ratio: float = settings.LLM_ROUTER_SWITCH_RATIO
+    hedging: bool = settings.LLM_ROUTER_HEDGING
+    hedge_percentile: float = settings.LLM_ROUTER_HEDGE_PERCENTILE
+    hedge_delay: float = settings.LLM_ROUTER_HEDGE_DELAY
+
+    @property
+    def _llm_type(self) -> str:
+        return "routing"
+
+    @property
+    def model(self) -> str:
+        return "router:" + ",".join(health.name for health in self.health)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RoutingChatModel":
+        from services.llm_service import llm_service
+
+        # each provider gets tools in its own format, e.g. cache-marked definitions for Anthropic
+        return self.model_copy(update={
+            "backends": [
+                backend.bind_tools(llm_service.cacheable_tools(tools, backend), **kwargs)
+                for backend in self.backends
+            ],
+        })
+
+    def candidates(self) -> Tuple[List[int], Set[int]]:
+        """Backends to try in order, and the ones among them whose half-open trial this call claimed.
+
+        Trials are claimed here rather than when a backend is called, so
+        concurrent calls can't all pick the same half-open backend. Claimed
+        trials that end up unused must be released.
+        """
+        available = [i for i, health in enumerate(self.health) if health.available()]
+        if not available:
+            # everything is degraded: try the backend that tripped first rather than failing outright
+            return [min(range(len(self.health)), key=lambda i: self.health[i].open_until)], set()
+
+        preferred = available[0]
+        preferred_p50 = self.health[preferred].latency_percentile(50)
+        if preferred_p50 is not None:
+            for i in available[1:]:
+                p50 = self.health[i].latency_percentile(50)
+                if p50 is not None and p50 * self.switch_ratio < preferred_p50:
+                    available.remove(i)
+                    available.insert(0, i)
+                    break
+        return available, {i for i in available if self.health[i].acquire()}
+
+    def release_unused(self, trials: Set[int], used: Sequence[int]):
+        for index in trials.difference(used):
+            self.health[index].release()
+
+    def hedge_after(self, index: int) -> Optional[float]:
+        if not self.hedging:
+            return None
+        return self.health[index].latency_percentile(self.hedge_percentile) or self.hedge_delay
+
+    def notify_cancelled(self, index: int, run_id: uuid.UUID):
+        # a cancelled ainvoke fires neither on_llm_end nor on_llm_error, so the
+        # backend's handlers would never hear about the run again
+        model = self.backends[index]
+        while hasattr(model, "bound"):
+            model = model.bound
+        callbacks = getattr(model, "callbacks", None) or []
+        for handler in getattr(callbacks, "handlers", callbacks):
+            on_cancelled = getattr(handler, "on_llm_cancelled", None)
+            if on_cancelled is not None:
+                on_cancelled(run_id=run_id)
+
+    async def call_backend(self, index: int, is_trial: bool, messages: List[BaseMessage], stop, kwargs) -> BaseMessage:
+        health = self.health[index]
+        LLM_ROUTER_EVENTS.labels(health.name, "selected").inc()
+        run_id = uuid.uuid4()
+        start = time.perf_counter()
+        try:
+            message = await self.backends[index].ainvoke(messages, config={"run_id": run_id}, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            # a call that didn't claim the trial must not free one another call holds
+            if is_trial:
+                health.release()
+            self.notify_cancelled(index, run_id)
+            raise
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.perf_counter() - start)
+        message.response_metadata["llm_backend"] = health.name
+        return message
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        order, trials = self.candidates()
+        pending = {}
+        next_candidate = 0
+        last_error: Optional[Exception] = None
+
+        def launch():
+            nonlocal next_candidate
+            index = order[next_candidate]
+            next_candidate += 1
+            task = asyncio.create_task(self.call_backend(index, index in trials, messages, stop, kwargs))
+            pending[task] = index
+            return index
+
+        launch()
+        try:
+            while pending:
+                first = min(pending.values(), key=order.index)
+                can_hedge = len(pending) == 1 and next_candidate < len(order)
+                timeout = self.hedge_after(first) if can_hedge else None
+
+                done, _ = await asyncio.wait(set(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge = launch()
+                    LLM_ROUTER_EVENTS.labels(self.health[hedge].name, "hedged").inc()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is None:
+                        if next_candidate > 1:
+                            LLM_ROUTER_EVENTS.labels(self.health[index].name, "won").inc()
+                        return ChatResult(generations=[ChatGeneration(message=task.result())])
+                    last_error = task.exception()
+                    logger.warning("LLM backend %s failed: %s", self.health[index].name, last_error)
+
+                if not pending and next_candidate < len(order):
+                    failover = launch()
+                    LLM_ROUTER_EVENTS.labels(self.health[failover].name, "failover").inc()
+        finally:
+            for task in pending:
+                task.cancel()
+            self.release_unused(trials, order[:next_candidate])
+
+        raise last_error
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        # sync callers get failover but no hedging
+        last_error: Optional[Exception] = None
+        order, trials = self.candidates()
+        tried = []
+        try:
+            for index in order:
+                health = self.health[index]
+                tried.append(index)
+                start = time.perf_counter()
+                try:
+                    message = self.backends[index].invoke(messages, stop=stop, **kwargs)
+                except Exception as e:
+                    health.record_failure()
+                    last_error = e
+                    continue
+                health.record_success(time.perf_counter() - start)
+                message.response_metadata["llm_backend"] = health.name
+                return ChatResult(generations=[ChatGeneration(message=message)])
+        finally:
+            self.release_unused(trials, tried)
+        raise last_error
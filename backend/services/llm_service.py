@@ -1,36 +1,100 @@
+from typing import Any, List, Sequence
+
 from langchain_anthropic import ChatAnthropic
+from langchain_anthropic.chat_models import convert_to_anthropic_tool
+from langchain_core.messages import SystemMessage
 from langchain_ollama import ChatOllama
+from core.callbacks import metrics_callback
 from core.config import settings
+from services.llm_router import BackendHealth, RoutingChatModel
+from services.llm_trace import ReplayChatModel, replay_trace, with_trace_recorder
+from services.usage_accounting import usage_callback
 
 
 class LLMService:
     def __init__(self):
+        # router health is per provider and outlives the per-request models built by get_llm
+        self.router_health = {}
         self.llm = self.create_llm()
 
+    @staticmethod
+    def model_callbacks():
+        # on each provider model, not the router, so usage is counted once per backend call
+        if settings.USAGE_ACCOUNTING_ENABLED:
+            return [metrics_callback, usage_callback]
+        return [metrics_callback]
+
     def create_llm(self, temperature=None, max_tokens=None):
+        if settings.TRACE_MODE == "replay":
+            return ReplayChatModel(trace=replay_trace(), callbacks=self.model_callbacks())
+
         temp = temperature if temperature is not None else settings.LLM_TEMPERATURE
         max_tok = max_tokens if max_tokens is not None else settings.LLM_MAX_TOKENS
 
-        if settings.LLM_PROVIDER == "anthropic":
+        if settings.LLM_PROVIDER == "router":
+            # the router fails over itself, so backends don't retry first
+            llm = RoutingChatModel(
+                backends=[
+                    self.create_provider_llm(name, temp, max_tok, max_retries=0)
+                    for name in settings.LLM_ROUTER_BACKENDS
+                ],
+                health=[self.router_health.setdefault(name, BackendHealth(name)) for name in settings.LLM_ROUTER_BACKENDS],
+            )
+        else:
+            llm = self.create_provider_llm(settings.LLM_PROVIDER, temp, max_tok)
+
+        if settings.TRACE_MODE == "record":
+            # on the outermost model, so a hedged or failed-over router call is one trace entry
+            with_trace_recorder(llm)
+        return llm
+
+    def create_provider_llm(self, provider, temperature, max_tokens, max_retries=settings.LLM_MAX_RETRIES):
+        if provider == "anthropic":
             return ChatAnthropic(
                 model=settings.ANTHROPIC_MODEL_NAME,
-                temperature=temp,
-                max_tokens=max_tok,
-                max_retries=settings.LLM_MAX_RETRIES,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                max_retries=max_retries,
                 timeout=settings.LLM_MAX_TIMEOUT,
+                callbacks=self.model_callbacks(),
             )
-        elif settings.LLM_PROVIDER == "ollama":
+        elif provider == "ollama":
             return ChatOllama(
                 model=settings.OLLAMA_MODEL_NAME,
                 base_url=settings.OLLAMA_BASE_URL,
-                temperature=temp,
-                num_predict=max_tok,
+                temperature=temperature,
+                num_predict=max_tokens,
+                callbacks=self.model_callbacks(),
             )
         else:
-            raise ValueError(f"Unhandled LLM provider: {settings.LLM_PROVIDER}")
+            raise ValueError(f"Unhandled LLM provider: {provider}")
 
     def get_llm(self, temperature=None, max_tokens=None):
         return self.create_llm(temperature, max_tokens)
 
+    # Prompt caching: Anthropic caches the request prefix up to each cache_control
+    # breakpoint (tools, then system, then messages), so the static parts are marked
+    # and everything per-request is kept after them.
+
+    @staticmethod
+    def supports_prompt_caching(llm) -> bool:
+        if isinstance(llm, RoutingChatModel):
+            # content blocks are fine for Ollama too, it just ignores cache_control
+            return any(LLMService.supports_prompt_caching(backend) for backend in llm.backends)
+        return settings.LLM_PROMPT_CACHING and isinstance(llm, ChatAnthropic)
+
+    def cacheable_system_message(self, text: str, llm) -> SystemMessage:
+        if not self.supports_prompt_caching(llm):
+            return SystemMessage(content=text)
+        return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+
+    def cacheable_tools(self, tools: Sequence[Any], llm) -> List[Any]:
+        # the router converts per backend in RoutingChatModel.bind_tools
+        if not tools or isinstance(llm, RoutingChatModel) or not self.supports_prompt_caching(llm):
+            return list(tools)
+        definitions = [convert_to_anthropic_tool(tool) for tool in tools]
+        definitions[-1]["cache_control"] = {"type": "ephemeral"}
+        return definitions
+
 
 llm_service = LLMService()
@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, ToolMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+from langchain_core.tools import BaseTool
+
+from core.callbacks import RunTable
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Record/replay of LLM and tool calls. A recorded trace is JSONL, one line per
+# finished call:
+#   {"kind": "llm", "key": ..., "name": model, "latency": s, "message": {...}}
+#   {"kind": "tool", "key": ..., "name": tool, "latency": s, "output": "..."}
+# LLM calls are keyed by a hash of the prompt, tool calls by their arguments,
+# so concurrent calls (decomposition sub-questions) replay to the right caller
+# whatever order they arrive in.
+
+
+class TraceMismatchError(RuntimeError):
+    pass
+
+
+def message_text(content: Any) -> str:
+    # prompt caching turns system prompts into content blocks; the text is what matters
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+
+def request_key(messages: Sequence[BaseMessage]) -> str:
+    payload = [
+        [
+            message.type,
+            message_text(message.content),
+            [[call["name"], call["args"]] for call in getattr(message, "tool_calls", None) or []],
+        ]
+        for message in messages
+    ]
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:24]
+
+
+def tool_key(inputs: Any) -> str:
+    if isinstance(inputs, dict):
+        return json.dumps(inputs, sort_keys=True, default=str)
+    return str(inputs)
+
+
+class TraceRecorder(BaseCallbackHandler):
+    """Appends every finished LLM and tool call to a JSONL trace.
+
+    Attach it to models and tools directly, like MetricsCallbackHandler, so
+    each call is recorded once rather than once per enclosing chain.
+    """
+
+    def __init__(self, path: str = settings.TRACE_PATH):
+        self.path = path
+        self.file = None
+        # runs cancelled mid-flight never report an end; the RunTable ages them out
+        self.runs: Dict[UUID, Tuple[float, str, str]] = RunTable()
+        self.lock = threading.Lock()
+
+    def write(self, event: Dict[str, Any]):
+        line = json.dumps(event, separators=(",", ":"), default=str)
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line + "\n")
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self.runs.start(run_id, request_key(messages[0]), name)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        start, key, name = run
+        generation = response.generations[0][0]
+        self.write({
+            "kind": "llm",
+            "key": key,
+            "name": name,
+            "latency": round(time.perf_counter() - start, 4),
+            "message": message_to_dict(generation.message),
+        })
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        name = (serialized or {}).get("name", "unknown")
+        self.runs.start(run_id, tool_key(inputs if inputs is not None else input_str), name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        start, key, name = run
+        self.write({
+            "kind": "tool",
+            "key": key,
+            "name": name,
+            "latency": round(time.perf_counter() - start, 4),
+            "output": output.content if isinstance(output, ToolMessage) else output,
+        })
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+
+trace_recorder = TraceRecorder()
+
+
+def with_trace_recorder(runnable):
+    callbacks = list(getattr(runnable, "callbacks", None) or [])
+    if trace_recorder not in callbacks:
+        runnable.callbacks = callbacks + [trace_recorder]
+    return runnable
+
+
+class TraceReplay:
+    """Serves recorded calls back by key.
+
+    Calls with the same key get the recorded responses in turn, cycling, so a
+    trace can be replayed repeatedly and concurrently. A call with no exact
+    match gets the next recorded call of the same kind and name instead, and
+    is counted in misses.
+    """
+
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.exact: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self.by_name: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self.cursors: Dict[Tuple, int] = defaultdict(int)
+        self.misses = 0
+        self.lock = threading.Lock()
+        for event in events:
+            # the model name is not part of the exact key, replay serves whichever model asks
+            name = event["name"] if event["kind"] == "tool" else ""
+            self.exact[(event["kind"], name, event["key"])].append(event)
+            self.by_name[(event["kind"], name)].append(event)
+
+    @classmethod
+    def load(cls, path: str) -> "TraceReplay":
+        with open(path, encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def next_event(self, candidates_key: Tuple, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        index = self.cursors[candidates_key]
+        self.cursors[candidates_key] += 1
+        return candidates[index % len(candidates)]
+
+    def take(self, kind: str, key: str, name: str = "") -> Dict[str, Any]:
+        with self.lock:
+            exact_key = (kind, name, key)
+            if self.exact.get(exact_key):
+                return self.next_event(exact_key, self.exact[exact_key])
+            fallback_key = (kind, name)
+            if not self.by_name.get(fallback_key):
+                raise TraceMismatchError(f"trace has no recorded {kind} call {name}".rstrip())
+            self.misses += 1
+            logger.warning("no recorded %s call matches %s %s, replaying the next one in order", kind, name, key)
+            return self.next_event(fallback_key, self.by_name[fallback_key])
+
+
+@lru_cache(maxsize=None)
+def replay_trace(path: str = settings.TRACE_PATH) -> TraceReplay:
+    return TraceReplay.load(path)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Answers from a recorded trace instead of calling a provider.
+
+    latency_scale=1 sleeps for the recorded latency, 0 answers immediately.
+    """
+
+    trace: Any
+    latency_scale: float = settings.TRACE_REPLAY_LATENCY_SCALE
+    model: str = "replay"
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        # tool calls come back from the recorded messages
+        return self
+
+    def replay(self, messages: List[BaseMessage]) -> Tuple[float, ChatResult]:
+        event = self.trace.take("llm", request_key(messages))
+        message = messages_from_dict([event["message"]])[0]
+        return event["latency"] * self.latency_scale, ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        delay, result = self.replay(messages)
+        time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        delay, result = self.replay(messages)
+        await asyncio.sleep(delay)
+        return result
+
+
+class ReplayTool(BaseTool):
+    """Stands in for a recorded tool, with the same name and schema."""
+
+    trace: Any
+    latency_scale: float = settings.TRACE_REPLAY_LATENCY_SCALE
+
+    @classmethod
+    def replacing(cls, tool: BaseTool, trace: TraceReplay, latency_scale: float = settings.TRACE_REPLAY_LATENCY_SCALE):
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            trace=trace,
+            latency_scale=latency_scale,
+        )
+
+    def replay(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[float, Any]:
+        # single string input tools get it positionally, schema tools as keyword arguments
+        event = self.trace.take("tool", tool_key(kwargs or (args[0] if args else "")), self.name)
+        return event["latency"] * self.latency_scale, event["output"]
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        delay, output = self.replay(args, kwargs)
+        time.sleep(delay)
+        return output
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        delay, output = self.replay(args, kwargs)
+        await asyncio.sleep(delay)
+        return output
@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Any, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from core.metrics import stage_timer
+from services.embedding_service import create_service_embeddings
+
+
+class LocalVectorService:
+    """In-process stand-in for PineconeVectorService, one in-memory store per namespace.
+
+    Selected with VECTOR_STORE_PROVIDER=local for offline development and benchmarks.
+    """
+
+    def __init__(self):
+        self.embeddings = create_service_embeddings()
+        self.stores: Dict[Optional[str], InMemoryVectorStore] = {}
+
+    def get_index(self):
+        return None
+
+    def upload_documents(
+            self,
+            documents: List[Document],
+            namespace: Optional[str] = None,
+            ids: Optional[List[str]] = None
+    ) -> InMemoryVectorStore:
+        vectorstore = self.get_vectorstore(namespace)
+        with stage_timer("vector_upsert"):
+            vectorstore.add_documents(documents, ids=ids)
+        return vectorstore
+
+    def get_vectorstore(
+            self,
+            namespace: Optional[str] = None
+    ) -> InMemoryVectorStore:
+        if namespace not in self.stores:
+            self.stores[namespace] = InMemoryVectorStore(embedding=self.embeddings)
+        return self.stores[namespace]
+
+    def similarity_search(
+            self,
+            query: str,
+            k: int = 10,
+            namespace: Optional[str] = None,
+            filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        vectorstore = self.get_vectorstore(namespace)
+        match = None
+        if filter:
+            match = lambda doc: all(doc.metadata.get(key) == value for key, value in filter.items())
+        with stage_timer("vector_query"):
+            return vectorstore.similarity_search(query, k=k, filter=match)
+
+    def similarity_search_by_vector(
+            self,
+            embedding: List[float],
+            k: int = 10,
+            namespace: Optional[str] = None,
+            filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        vectorstore = self.get_vectorstore(namespace)
+        match = None
+        if filter:
+            match = lambda doc: all(doc.metadata.get(key) == value for key, value in filter.items())
+        with stage_timer("vector_query"):
+            return vectorstore.similarity_search_by_vector(embedding, k=k, filter=match)
+
+    def similarity_search_with_vectors(
+            self,
+            embedding: List[float],
+            k: int = 10,
+            namespace: Optional[str] = None,
+            filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, List[float]]]:
+        vectorstore = self.get_vectorstore(namespace)
+        documents = self.similarity_search_by_vector(embedding, k=k, namespace=namespace, filter=filter)
+        return [(doc, vectorstore.store[doc.id]["vector"]) for doc in documents]
+
+    def delete_ids(
+            self,
+            ids: List[str],
+            namespace: Optional[str] = None
+    ):
+        if namespace in self.stores:
+            with stage_timer("vector_delete"):
+                self.stores[namespace].delete(ids)
+
+    def delete_namespace(
+            self,
+            namespace: str
+    ):
+        self.stores.pop(namespace, None)
@@ -0,0 +1,120 @@
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from langchain_classic.memory import VectorStoreRetrieverMemory
+from langchain_core.documents import Document
+
+from core.config import settings
+from core.metrics import MEMORY_WRITES, stage_timer
+
+logger = logging.getLogger(__name__)
+
+
+class VectorMemoryWriter:
+    """Write-behind queue for long-term memory turns.
+
+    Turns are queued and a background thread embeds and upserts them in
+    batches, one upload per namespace, once batch_size turns are waiting or
+    flush_interval has passed. A turn becomes searchable after its batch is
+    written rather than before the response returns. When the queue is full
+    new turns are dropped rather than slowing requests down.
+    """
+
+    def __init__(
+            self,
+            vector_service=None,
+            batch_size: int = settings.MEMORY_WRITE_BATCH_SIZE,
+            flush_interval: float = settings.MEMORY_WRITE_FLUSH_INTERVAL,
+            queue_size: int = settings.MEMORY_WRITE_QUEUE_SIZE,
+    ):
+        self.vector_service = vector_service
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def get_vector_service(self):
+        if self.vector_service is None:
+            from services.pinecone_vector_service import pinecone_vector_service
+            self.vector_service = pinecone_vector_service
+        return self.vector_service
+
+    def ensure_worker(self):
+        if self.worker is None:
+            with self.lock:
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self.run, name="memory-writer", daemon=True)
+                    self.worker.start()
+
+    def enqueue(self, namespace: Optional[str], documents: List[Document]):
+        self.ensure_worker()
+        for document in documents:
+            try:
+                self.pending.put_nowait((namespace, document))
+            except queue.Full:
+                MEMORY_WRITES.labels("dropped").inc()
+                logger.warning("memory write queue full, dropping turn for namespace %s", namespace)
+
+    def run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self.write(batch)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def write(self, batch):
+        by_namespace: Dict[Optional[str], List[Document]] = defaultdict(list)
+        for namespace, document in batch:
+            by_namespace[namespace].append(document)
+
+        for namespace, documents in by_namespace.items():
+            try:
+                with stage_timer("memory_write"):
+                    self.get_vector_service().upload_documents(documents, namespace)
+            except Exception:
+                MEMORY_WRITES.labels("failed").inc(len(documents))
+                logger.exception("failed to write %d memory turns to namespace %s", len(documents), namespace)
+            else:
+                MEMORY_WRITES.labels("written").inc(len(documents))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued turn has been written; False if timeout ran out first."""
+        if self.worker is None:
+            return True
+        done = threading.Event()
+        threading.Thread(target=lambda: (self.pending.join(), done.set()), daemon=True).start()
+        return done.wait(timeout)
+
+
+class WriteBehindVectorMemory(VectorStoreRetrieverMemory):
+    """VectorStoreRetrieverMemory that hands new turns to a VectorMemoryWriter instead of upserting inline."""
+
+    writer: Any
+    namespace: Optional[str] = None
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.writer.enqueue(self.namespace, self._form_documents(inputs, outputs))
+
+    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        self.save_context(inputs, outputs)
+
+
+vector_memory_writer = VectorMemoryWriter()
@@ -1,10 +1,11 @@
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Tuple
 
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone as PineconeClient, ServerlessSpec
 from core.config import settings
+from core.metrics import stage_timer
+from services.embedding_service import create_service_embeddings
 
 
 class PineconeVectorService:
@@ -17,7 +18,7 @@ class PineconeVectorService:
         if not settings.PINECONE_API_KEY:
             raise ValueError("Pinecone API key not found")
         self.pc = PineconeClient(api_key=settings.PINECONE_API_KEY)
-        self.embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        self.embeddings = create_service_embeddings()
         self.ensure_index_exists()
 
     def ensure_index_exists(self):
@@ -37,17 +38,23 @@ class PineconeVectorService:
                 )
             )
 
+    def get_index(self):
+        return self.pc.Index(self.index_name)
+
     def upload_documents(
             self,
             documents: List[Document],
-            namespace: Optional[str] = None
+            namespace: Optional[str] = None,
+            ids: Optional[List[str]] = None
     ) -> PineconeVectorStore:
-        vectorstore = PineconeVectorStore.from_documents(
-            documents=documents,
-            embedding=self.embeddings,
-            index_name=self.index_name,
-            namespace=namespace,
-        )
+        with stage_timer("vector_upsert"):
+            vectorstore = PineconeVectorStore.from_documents(
+                documents=documents,
+                embedding=self.embeddings,
+                index_name=self.index_name,
+                namespace=namespace,
+                ids=ids,
+            )
         return vectorstore
 
     def get_vectorstore(
@@ -68,18 +75,76 @@ class PineconeVectorService:
             filter: Optional[Dict[str, Any]] = None
     ) -> List[Document]:
         vectorstore = self.get_vectorstore(namespace)
-        return vectorstore.similarity_search(
-            query,
-            k=k,
-            filter=filter
-        )
+        with stage_timer("vector_query"):
+            return vectorstore.similarity_search(
+                query,
+                k=k,
+                filter=filter
+            )
+
+    def similarity_search_by_vector(
+            self,
+            embedding: List[float],
+            k: int = 10,
+            namespace: Optional[str] = None,
+            filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        vectorstore = self.get_vectorstore(namespace)
+        with stage_timer("vector_query"):
+            return vectorstore.similarity_search_by_vector(
+                embedding,
+                k=k,
+                filter=filter
+            )
+
+    def similarity_search_with_vectors(
+            self,
+            embedding: List[float],
+            k: int = 10,
+            namespace: Optional[str] = None,
+            filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, List[float]]]:
+        with stage_timer("vector_query"):
+            response = self.get_index().query(
+                vector=embedding,
+                top_k=k,
+                namespace=namespace or "",
+                filter=filter,
+                include_values=True,
+                include_metadata=True,
+            )
+        results = []
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            # PineconeVectorStore keeps the chunk text under the "text" metadata key
+            text = metadata.pop("text", "")
+            results.append((Document(id=match.id, page_content=text, metadata=metadata), list(match.values)))
+        return results
+
+    def delete_ids(
+            self,
+            ids: List[str],
+            namespace: Optional[str] = None,
+            batch_size: int = settings.VECTOR_DELETE_BATCH_SIZE
+    ):
+        index = self.get_index()
+        with stage_timer("vector_delete"):
+            for start in range(0, len(ids), batch_size):
+                index.delete(ids=ids[start:start + batch_size], namespace=namespace)
 
     def delete_namespace(
             self,
             namespace: str
     ):
-        index = self.pc.Index(self.index_name)
+        index = self.get_index()
         index.delete(delete_all=True, namespace=namespace)
 
 
-pinecone_vector_service = PineconeVectorService()
+def create_vector_service():
+    if settings.VECTOR_STORE_PROVIDER == "local":
+        from services.local_vector_service import LocalVectorService
+        return LocalVectorService()
+    return PineconeVectorService()
+
+
+pinecone_vector_service = create_vector_service()
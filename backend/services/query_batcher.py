@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from core.config import settings
+from core.metrics import EMBED_QUERY_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Coalesces concurrent embed_query calls into batched encodes.
+
+    The first waiting query opens a batch; it is flushed once it holds
+    max_batch_size queries or max_wait_ms has passed, whichever comes first.
+    """
+
+    def __init__(
+            self,
+            embeddings: Embeddings,
+            max_batch_size: int = settings.EMBEDDING_QUERY_BATCH_SIZE,
+            max_wait_ms: float = settings.EMBEDDING_QUERY_BATCH_WAIT_MS,
+    ):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pending: queue.Queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            with self.lock:
+                if self.worker is None or not self.worker.is_alive():
+                    self.worker = threading.Thread(target=self.run, name="query-batcher", daemon=True)
+                    self.worker.start()
+
+    def run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self.flush(batch)
+            except Exception:
+                # one bad batch must not take the thread, and with it every later query, down
+                logger.exception("query embedding batch failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("query embedding batch failed"))
+
+    def flush(self, batch):
+        # callers cancelled while waiting (asyncio.wrap_future cancels the future) are dropped
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        EMBED_QUERY_BATCH_SIZE.observe(len(batch))
+
+        # identical queries in one batch are only encoded once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = self.embeddings.embed_documents(unique_texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            future.set_result(list(by_text[text]))
+
+    def submit(self, text: str) -> Future:
+        self.ensure_worker()
+        future: Future = Future()
+        self.pending.put((text, future))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from core.config import settings
+from core.metrics import QUERY_ROUTES
+
+logger = logging.getLogger(__name__)
+
+Route = Literal["direct", "agent", "decompose"]
+ROUTE_ORDER: List[Route] = ["direct", "agent", "decompose"]
+
+COMPARISON = re.compile(
+    r"\b(compare|comparison|comparing|versus|vs\.?|differences? between|pros and cons|trade-?offs?|"
+    r"relationship between|how does .+ differ)\b",
+    re.IGNORECASE,
+)
+FRESHNESS = re.compile(r"\b(latest|current|currently|today|recent|recently|news|this (week|month|year)|20\d\d|price)\b", re.IGNORECASE)
+DOCUMENT_REFERENCE = re.compile(r"\b(document|documents|file|upload(ed)?|according to|source|sources|cite|report)\b", re.IGNORECASE)
+DIRECT_FORMS = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|define|definition of|translate|spell|rephrase|"
+    r"what does \S+ stand for|what is the meaning of)\b",
+    re.IGNORECASE,
+)
+ARITHMETIC = re.compile(r"^[\s\d+\-*/().=?^%x]+$|^\s*what is [\d\s+\-*/().^%x]+\??\s*$", re.IGNORECASE)
+
+# Example questions per route for the embedding classifier. Only consulted when the heuristic has no opinion.
+PROTOTYPES: Dict[Route, List[str]] = {
+    "direct": [
+        "What does API stand for?",
+        "Define photosynthesis.",
+        "Translate 'good morning' into French.",
+        "What is the capital of France?",
+        "Explain what a hash map is.",
+        "Rephrase this sentence to sound more formal.",
+    ],
+    "agent": [
+        "What is the latest release of Python?",
+        "Who won the most recent Champions League final?",
+        "What does the uploaded report say about the budget?",
+        "Find sources on the health effects of intermittent fasting.",
+        "What is the current population of Tokyo?",
+        "Summarise the key findings in the document about the bridge project.",
+    ],
+    "decompose": [
+        "Compare the cost and schedule outcomes of the two bridge projects and explain the differences.",
+        "What are the pros and cons of nuclear versus solar power for a small country?",
+        "How did interest rate changes affect housing prices and employment over the last decade?",
+        "Evaluate the economic, environmental and social impact of the new highway.",
+        "Which cloud provider is best for our workload considering cost, latency and compliance?",
+        "Analyse the causes of the project overrun and recommend changes for future projects.",
+    ],
+}
+
+
+@dataclass
+class RouteDecision:
+    route: Route
+    source: Literal["override", "heuristic", "classifier", "default"]
+    reason: str
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+def heuristic_route(query: str) -> Optional[RouteDecision]:
+    words = len(query.split())
+    questions = query.count("?")
+
+    if COMPARISON.search(query):
+        return RouteDecision("decompose", "heuristic", "comparison")
+    if questions >= 2:
+        return RouteDecision("decompose", "heuristic", "multiple questions")
+    if words > settings.QUERY_ROUTER_LONG_QUERY_WORDS:
+        return RouteDecision("decompose", "heuristic", "long query")
+
+    needs_tools = FRESHNESS.search(query) or DOCUMENT_REFERENCE.search(query)
+    if needs_tools:
+        return RouteDecision("agent", "heuristic", "needs fresh or indexed sources")
+    if ARITHMETIC.match(query):
+        return RouteDecision("direct", "heuristic", "arithmetic")
+    if words <= settings.QUERY_ROUTER_SHORT_QUERY_WORDS and DIRECT_FORMS.match(query):
+        return RouteDecision("direct", "heuristic", "short self-contained request")
+    return None
+
+
+class QueryRouter:
+    """Picks the cheapest execution path likely to answer a query well.
+
+    direct: one LLM call, no tools. agent: a single ResearchAgent run.
+    decompose: QueryDecompositionChain with parallel sub-agents.
+
+    Cheap regex heuristics decide the clear cases. The rest are classified by
+    cosine similarity to a handful of example questions per route, embedded
+    once with the service embeddings. When neither is confident the router
+    falls back to a single agent run.
+    """
+
+    def __init__(
+            self,
+            embeddings: Optional[Embeddings] = None,
+            prototypes: Dict[Route, List[str]] = PROTOTYPES,
+            min_margin: float = settings.QUERY_ROUTER_MIN_MARGIN,
+    ):
+        self.embeddings = embeddings
+        self.prototypes = prototypes
+        self.min_margin = min_margin
+        self.centroids: Optional[Dict[Route, np.ndarray]] = None
+        self.centroid_lock = asyncio.Lock()
+
+    async def get_centroids(self) -> Dict[Route, np.ndarray]:
+        async with self.centroid_lock:
+            if self.centroids is None:
+                centroids = {}
+                for route, examples in self.prototypes.items():
+                    vectors = np.asarray(await self.embeddings.aembed_documents(examples), dtype=np.float32)
+                    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                    centroid = vectors.mean(axis=0)
+                    centroids[route] = centroid / np.linalg.norm(centroid)
+                self.centroids = centroids
+        return self.centroids
+
+    async def classify(self, query: str) -> RouteDecision:
+        centroids = await self.get_centroids()
+        vector = np.asarray(await self.embeddings.aembed_query(query), dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+
+        scores = {route: float(centroid @ vector) for route, centroid in centroids.items()}
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        margin = scores[ranked[0]] - scores[ranked[1]]
+        if margin < self.min_margin:
+            return RouteDecision("agent", "default", f"classifier margin {margin:.3f} too small", scores)
+        return RouteDecision(ranked[0], "classifier", f"nearest prototypes, margin {margin:.3f}", scores)
+
+    async def route(
+            self,
+            query: str,
+            endpoint: str,
+            ceiling: Route,
+            override: Optional[str] = None,
+    ) -> RouteDecision:
+        """Route a query for endpoint. Automatic decisions never exceed ceiling; overrides are taken as given."""
+        if override and override != "auto":
+            decision = RouteDecision(override, "override", "requested by client")
+        else:
+            decision = heuristic_route(query)
+            if decision is None and self.embeddings is not None:
+                decision = await self.classify(query)
+            if decision is None:
+                decision = RouteDecision("agent", "default", "no heuristic match")
+            if ROUTE_ORDER.index(decision.route) > ROUTE_ORDER.index(ceiling):
+                decision.reason += f", capped at {ceiling}"
+                decision.route = ceiling
+
+        QUERY_ROUTES.labels(endpoint, decision.route, decision.source).inc()
+        logger.info(
+            "routed %s query to %s via %s (%s): %.80r",
+            endpoint, decision.route, decision.source, decision.reason, query,
+        )
+        return decision
+
+
+def create_query_router() -> QueryRouter:
+    if settings.QUERY_ROUTER_CLASSIFIER:
+        from services.pinecone_vector_service import pinecone_vector_service
+        return QueryRouter(embeddings=pinecone_vector_service.embeddings)
+    return QueryRouter()
+
+
+query_router = create_query_router()
@@ -0,0 +1,100 @@
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agents.research_agent import create_research_agent
+from chains.query_decomposition_chain import QueryDecompositionChain, ProgressCallback
+from core.config import settings
+from core.context_vars import request_namespace
+from services.job_queue import QueuedResearchAgent, research_queue
+from services.llm_service import llm_service
+from services.pinecone_vector_service import pinecone_vector_service
+from tools.retriever import retrieve_context
+from tools.web_search import get_search_web_ddg
+
+# Shared by the API routes and services.research_worker, so the same request
+# runs identically in-process and on the worker fleet.
+
+DIRECT_SYSTEM_PROMPT = """You are a helpful research assistant.
+    Answer directly and concisely from your own knowledge.
+    If the question needs current or source-backed information, say so briefly."""
+
+
+def output_text(output: Any) -> str:
+    if isinstance(output, list) and len(output) > 0:
+        return output[0].get('text', str(output))
+    elif isinstance(output, str):
+        return output
+    else:
+        return str(output)
+
+
+async def run_direct(
+        query: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+) -> str:
+    llm = llm_service.get_llm(temperature=temperature, max_tokens=max_tokens)
+    result = await llm.ainvoke([
+        SystemMessage(content=DIRECT_SYSTEM_PROMPT),
+        HumanMessage(content=query),
+    ])
+    return output_text(result.content)
+
+
+async def run_research_agent(
+        query: str,
+        namespace: Optional[str] = None,
+        max_iterations: Optional[int] = 10,
+) -> str:
+    request_namespace.set(namespace)
+
+    tools = [get_search_web_ddg(), retrieve_context]
+
+    agent = create_research_agent(
+        max_iterations=max_iterations,
+        tools=tools,
+        pinecone_index=pinecone_vector_service.get_index(),
+    )
+
+    result = await agent.research(
+        query=query
+    )
+
+    return output_text(result.get("output", ""))
+
+
+def build_decomposition_chain(
+        namespace: Optional[str] = None,
+        max_iterations: Optional[int] = 10,
+        fan_out: bool = settings.RESEARCH_EXECUTION == "queue",
+) -> QueryDecompositionChain:
+    if fan_out:
+        # each sub-question becomes its own task on the worker fleet
+        agent = QueuedResearchAgent(research_queue, namespace=namespace, max_iterations=max_iterations)
+    else:
+        tools = [get_search_web_ddg(), retrieve_context]
+        agent = create_research_agent(
+            max_iterations=max_iterations,
+            tools=tools,
+            pinecone_index=pinecone_vector_service.get_index(),
+        )
+
+    return QueryDecompositionChain(
+        llm=llm_service.get_llm(),
+        research_agent=agent
+    )
+
+
+async def run_decomposition(
+        query: str,
+        namespace: Optional[str] = None,
+        max_iterations: Optional[int] = 10,
+        on_progress: Optional[ProgressCallback] = None,
+        fan_out: bool = settings.RESEARCH_EXECUTION == "queue",
+) -> Dict[str, Any]:
+    request_namespace.set(namespace)
+
+    decomp_chain = build_decomposition_chain(namespace, max_iterations, fan_out)
+
+    return await decomp_chain.arun(query, on_progress=on_progress)
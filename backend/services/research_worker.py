@@ -0,0 +1,140 @@
+"""Research worker: runs agent and decomposition tasks pulled from the shared queue.
+
+    python -m services.research_worker
+
+Start as many as needed on any host that can reach QUEUE_URL. Research and
+decomposition tasks get separate consumer slots: a decomposition blocks on
+the research tasks it fans out, so it must never be able to take every slot.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.config import settings
+from core.logging_config import setup_logging
+from services.job_queue import TaskQueue, Task, research_queue, RESEARCH, DECOMPOSE
+from services.usage_accounting import worker_usage_scope
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+async def handle_research(payload: Dict[str, Any]) -> str:
+    from services.research_runner import run_research_agent
+    with worker_usage_scope(payload, "worker:research"):
+        return await run_research_agent(payload["query"], payload.get("namespace"), payload.get("max_iterations"))
+
+
+async def handle_decompose(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from services.research_runner import run_decomposition
+    with worker_usage_scope(payload, "worker:decompose"):
+        return await run_decomposition(
+            payload["query"],
+            payload.get("namespace"),
+            payload.get("max_iterations"),
+            fan_out=True,
+        )
+
+
+class ResearchWorker:
+    def __init__(
+            self,
+            queue: TaskQueue,
+            handlers: Dict[str, Handler],
+            concurrency: Dict[str, int],
+            heartbeat_seconds: float = settings.QUEUE_HEARTBEAT_SECONDS,
+            worker_id: Optional[str] = None,
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.heartbeat_seconds = heartbeat_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.active: Dict[str, Task] = {}
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        loops = [
+            asyncio.create_task(self.consume(kind))
+            for kind, slots in self.concurrency.items()
+            for _ in range(slots)
+        ]
+        loops.append(asyncio.create_task(self.maintain()))
+        try:
+            await self.stopping.wait()
+        finally:
+            for loop in loops:
+                loop.cancel()
+            await asyncio.gather(*loops, return_exceptions=True)
+
+    def stop(self):
+        self.stopping.set()
+
+    async def consume(self, kind: str):
+        handler = self.handlers[kind]
+        while True:
+            task = await self.queue.claim(kind)
+            if task is None:
+                continue
+
+            self.active[task.id] = task
+            try:
+                result = await handler(task.payload)
+            except asyncio.CancelledError:
+                # shutting down: hand the task to another worker right away instead of waiting out the lease
+                await asyncio.shield(self.queue.release(task))
+                raise
+            except Exception as e:
+                logger.exception("Task %s (%s) failed", task.id, kind)
+                await self.queue.complete(task, error=str(e))
+            else:
+                await self.queue.complete(task, result=result)
+            finally:
+                self.active.pop(task.id, None)
+
+    async def maintain(self):
+        while True:
+            try:
+                await self.queue.extend(list(self.active))
+                await self.queue.heartbeat(self.worker_id, {"active": len(self.active), "pid": os.getpid()})
+                redelivered = await self.queue.reap(self.handlers)
+                if redelivered:
+                    logger.warning("Redelivered %d tasks with expired leases", redelivered)
+            except Exception:
+                logger.exception("Queue maintenance failed")
+            await asyncio.sleep(self.heartbeat_seconds)
+
+
+def create_research_worker(queue: TaskQueue = research_queue) -> ResearchWorker:
+    return ResearchWorker(
+        queue=queue,
+        handlers={RESEARCH: handle_research, DECOMPOSE: handle_decompose},
+        concurrency={
+            RESEARCH: settings.RESEARCH_WORKER_CONCURRENCY,
+            DECOMPOSE: settings.RESEARCH_WORKER_DECOMPOSE_CONCURRENCY,
+        },
+    )
+
+
+async def serve():
+    worker = create_research_worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    logger.info("research worker %s consuming from %s", worker.worker_id, settings.QUEUE_URL)
+    await worker.run()
+
+
+def main():
+    setup_logging()
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
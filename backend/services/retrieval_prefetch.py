@@ -0,0 +1,111 @@
+import logging
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from core.config import settings
+from core.metrics import RETRIEVAL_PREFETCH
+from core.singleflight import normalize_query
+
+logger = logging.getLogger(__name__)
+
+prefetch_executor = ThreadPoolExecutor(
+    max_workers=settings.RETRIEVAL_PREFETCH_WORKERS, thread_name_prefix="retrieval-prefetch"
+)
+
+
+# words that say nothing about what to retrieve; left in, "what is the GDP of
+# Germany" would count as a close match for "what is the GDP of France"
+STOPWORDS = frozenset("""
+    a about all also an and any are as at be been but by can could did do does
+    for from had has have how i in into is it its me more most my of on or our
+    please should so some tell than that the their them then there these they
+    this those to was we were what when where which who whom why will with
+    would you your
+""".split())
+
+
+def content_words(text: str) -> set:
+    return set(re.findall(r"\w+", text.casefold())) - STOPWORDS
+
+
+def query_overlap(a: str, b: str) -> float:
+    """Shared content words over the content words of the longer query.
+
+    Agents tend to pass a trimmed rewrite of the user question to the tool;
+    that still scores high once stopwords are gone, while a query that shares
+    only a template or one entity of a longer question does not.
+    """
+    words_a = content_words(a)
+    words_b = content_words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / max(len(words_a), len(words_b))
+
+
+class RetrievalPrefetch:
+    """A retrieval for the raw user query, started before the agent asks for it.
+
+    The first retrieve_context call whose query overlaps the prefetched one by
+    at least min_overlap (and targets the same namespace) takes the result
+    instead of querying the index itself. A prefetch nobody takes by the end
+    of the run is counted as wasted.
+    """
+
+    def __init__(
+            self,
+            query: str,
+            namespace: Optional[str],
+            future: Future,
+            min_overlap: float = settings.RETRIEVAL_PREFETCH_MIN_OVERLAP,
+    ):
+        self.query = query
+        self.namespace = namespace
+        self.future = future
+        self.min_overlap = min_overlap
+        self.claimed = False
+        self.lock = threading.Lock()
+
+    def matches(self, query: str, namespace: Optional[str]) -> bool:
+        return namespace == self.namespace and query_overlap(query, self.query) >= self.min_overlap
+
+    def take(self, query: str, namespace: Optional[str]) -> Optional[Any]:
+        """The prefetched result if it can serve this call, otherwise None."""
+        with self.lock:
+            if self.claimed:
+                return None
+            if not self.matches(query, namespace):
+                RETRIEVAL_PREFETCH.labels("miss").inc()
+                return None
+            self.claimed = True
+
+        try:
+            # may still be in flight; waiting on it is never slower than starting over
+            result = self.future.result()
+        except Exception:
+            logger.warning("retrieval prefetch failed, querying again", exc_info=True)
+            RETRIEVAL_PREFETCH.labels("error").inc()
+            return None
+        RETRIEVAL_PREFETCH.labels("hit").inc()
+        return result
+
+    def same_query(self, query: str) -> bool:
+        return normalize_query(query) == normalize_query(self.query)
+
+    def finish(self):
+        with self.lock:
+            if self.claimed:
+                return
+            self.claimed = True
+        self.future.cancel()
+        RETRIEVAL_PREFETCH.labels("wasted").inc()
+
+
+def start_prefetch(
+        query: str,
+        namespace: Optional[str],
+        fetch: Callable[[str, Optional[str]], Any],
+) -> RetrievalPrefetch:
+    RETRIEVAL_PREFETCH.labels("started").inc()
+    return RetrievalPrefetch(query, namespace, prefetch_executor.submit(fetch, query, namespace))
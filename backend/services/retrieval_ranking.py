@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from core.config import settings
+
+
+def mmr_order(
+        query_vector: Sequence[float],
+        vectors: Sequence[Sequence[float]],
+        k: int,
+        lambda_mult: float = settings.RETRIEVER_MMR_LAMBDA,
+) -> List[int]:
+    """Indexes of up to k candidates in maximal-marginal-relevance order.
+
+    lambda_mult=1 is plain relevance ranking, 0 maximises diversity.
+    """
+    if len(vectors) == 0 or k <= 0:
+        return []
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_vector, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+    # highest similarity of each candidate to anything already picked
+    redundancy = np.full(len(matrix), -np.inf, dtype=np.float32)
+    available = np.ones(len(matrix), dtype=bool)
+
+    order = []
+    for _ in range(min(k, len(matrix))):
+        if order:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return order
+
+
+def same_origin(a: Document, b: Document) -> bool:
+    return all(a.metadata.get(key) == b.metadata.get(key) for key in ("source", "page", "document_id"))
+
+
+def merge_overlap(first: str, second: str, min_overlap: int = settings.RETRIEVER_MERGE_MIN_OVERLAP) -> Optional[str]:
+    """first + second if second starts where first ends (splitter overlap) or one contains the other."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+    probe = first[-min_overlap:]
+    if len(probe) < min_overlap:
+        return None
+    start = second.find(probe)
+    while start != -1:
+        end = start + min_overlap
+        if first.endswith(second[:end]):
+            return first + second[end:]
+        start = second.find(probe, start + 1)
+    return None
+
+
+def collapse_adjacent(
+        documents: Sequence[Document],
+        k: int,
+        max_chars: int = settings.RETRIEVER_MAX_MERGED_CHARS,
+) -> List[Document]:
+    """Walk documents in rank order, folding each into an earlier result it overlaps, until k results."""
+    results: List[Document] = []
+    for doc in documents:
+        for i, kept in enumerate(results):
+            if not same_origin(kept, doc):
+                continue
+            merged = merge_overlap(kept.page_content, doc.page_content) or merge_overlap(doc.page_content, kept.page_content)
+            if merged is not None and len(merged) <= max_chars:
+                results[i] = Document(
+                    id=kept.id,
+                    page_content=merged,
+                    metadata={**kept.metadata, "merged_chunks": kept.metadata.get("merged_chunks", 1) + 1},
+                )
+                break
+        else:
+            if len(results) == k:
+                break
+            results.append(doc)
+    return results
+
+
+def diverse_search(
+        vector_service,
+        query_vector: List[float],
+        k: int = settings.RETRIEVER_K,
+        fetch_k: int = settings.RETRIEVER_FETCH_K,
+        lambda_mult: float = settings.RETRIEVER_MMR_LAMBDA,
+        namespace: Optional[str] = None,
+        filter: Optional[Dict[str, Any]] = None,
+) -> List[Document]:
+    """Over-fetch fetch_k candidates with their vectors, MMR re-rank them and collapse overlapping neighbours into k results."""
+    candidates = vector_service.similarity_search_with_vectors(query_vector, k=max(fetch_k, k), namespace=namespace, filter=filter)
+    if not candidates:
+        return []
+    documents, vectors = zip(*candidates)
+    order = mmr_order(query_vector, vectors, len(documents), lambda_mult)
+    return collapse_adjacent([documents[i] for i in order], k)
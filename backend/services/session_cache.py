@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Hashable, Optional, Set
+
+from agents.chat_agent import create_chat_agent
+from core.config import settings
+from core.metrics import SESSION_CACHE_EVENTS, SESSION_CACHE_SESSIONS
+from services.pinecone_vector_service import pinecone_vector_service
+from storage_adapters.file_storage_adapter import FileStorageAdapter
+from tools.retriever import retrieve_context
+from tools.web_search import get_search_web_ddg
+
+logger = logging.getLogger(__name__)
+
+AgentFactory = Callable[[str, Hashable], Any]
+
+
+@dataclass
+class SessionEntry:
+    config: Hashable
+    agent: Any = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    size: int = 0
+    users: int = 0
+    dirty: bool = False
+
+
+class SessionAgentCache:
+    """LRU cache of live agents keyed by session id.
+
+    A warm agent keeps its chat history in memory, so follow-up messages skip
+    agent construction and the history read. With write_through, the history
+    is still written after every turn, by a background task under the session
+    lock once the response is out. Without it, the history is only written
+    when the session is evicted, when its config changes, and on shutdown, so
+    a crash loses every turn since. Sessions are evicted after idle_ttl
+    seconds, and least recently used ones first while the cache holds more
+    than max_sessions or an estimated max_bytes.
+
+    Each session has its own lock, so messages on one session run one at a
+    time while different sessions run in parallel. Sessions in use are never
+    evicted. With several API processes, route a session to one process, or
+    each process will work from its own copy of the history.
+    """
+
+    def __init__(
+            self,
+            factory: AgentFactory,
+            max_sessions: int = settings.SESSION_CACHE_MAX_SESSIONS,
+            idle_ttl: float = settings.SESSION_CACHE_IDLE_TTL,
+            max_bytes: int = settings.SESSION_CACHE_MAX_BYTES,
+            agent_bytes: int = settings.SESSION_CACHE_AGENT_BYTES,
+            write_through: bool = settings.SESSION_CACHE_WRITE_THROUGH,
+    ):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.agent_bytes = agent_bytes
+        self.write_through = write_through
+        self.writes: Set[asyncio.Task] = set()
+        self.entries: "OrderedDict[str, SessionEntry]" = OrderedDict()
+        self.sweeper: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def session(self, session_id: str, config: Hashable) -> AsyncIterator[Any]:
+        """Yield the session's agent, building it if needed, with the session lock held."""
+        entry = self.entries.get(session_id)
+        if entry is None:
+            entry = self.entries[session_id] = SessionEntry(config=config)
+        self.entries.move_to_end(session_id)
+        entry.users += 1
+        try:
+            async with entry.lock:
+                if entry.agent is not None and entry.config != config:
+                    # e.g. another namespace: persist the history and rebuild around it
+                    await self.flush(entry)
+                    entry.agent = None
+                    SESSION_CACHE_EVENTS.labels("rebuild").inc()
+                if entry.agent is None:
+                    entry.config = config
+                    entry.agent = self.factory(session_id, config)
+                    SESSION_CACHE_EVENTS.labels("miss").inc()
+                else:
+                    SESSION_CACHE_EVENTS.labels("hit").inc()
+
+                try:
+                    yield entry.agent
+                finally:
+                    entry.last_used = time.monotonic()
+                    entry.size = self.estimate_size(entry.agent)
+                    entry.dirty = True
+                    if self.write_through:
+                        self.write_behind(session_id, entry)
+        finally:
+            entry.users -= 1
+            await self.evict()
+
+    def estimate_size(self, agent) -> int:
+        memory = getattr(agent, "conversation_memory", None)
+        messages = memory.chat_memory.messages if memory is not None else []
+        return self.agent_bytes + sum(len(str(message.content)) for message in messages)
+
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self.entries.values())
+
+    @staticmethod
+    async def flush(entry: SessionEntry):
+        if entry.agent is not None and entry.dirty:
+            entry.dirty = False
+            try:
+                await asyncio.to_thread(entry.agent.save_chat_history)
+            except BaseException:
+                entry.dirty = True
+                raise
+
+    def write_behind(self, session_id: str, entry: SessionEntry):
+        task = asyncio.create_task(self.write(session_id, entry))
+        self.writes.add(task)
+        task.add_done_callback(self.writes.discard)
+
+    async def write(self, session_id: str, entry: SessionEntry):
+        # takes the session lock, so it runs after the turn that scheduled it has released it
+        async with entry.lock:
+            try:
+                await self.flush(entry)
+            except Exception:
+                logger.exception("failed to write history for session %s, retrying on eviction", session_id)
+
+    async def wait_for_writes(self):
+        while self.writes:
+            await asyncio.gather(*self.writes, return_exceptions=True)
+
+    async def evict(self):
+        now = time.monotonic()
+        for session_id, entry in list(self.entries.items()):
+            if entry.users:
+                continue
+            if now - entry.last_used > self.idle_ttl:
+                reason = "evicted_idle"
+            elif len(self.entries) > self.max_sessions or self.total_bytes() > self.max_bytes:
+                reason = "evicted_capacity"
+            else:
+                continue
+            await self.drop(session_id, entry, reason)
+        SESSION_CACHE_SESSIONS.set(len(self.entries))
+
+    async def drop(self, session_id: str, entry: SessionEntry, reason: str):
+        # the entry stays reachable while its history is written, so a message
+        # arriving meanwhile waits on the lock and then reuses the same agent
+        async with entry.lock:
+            try:
+                await self.flush(entry)
+            except Exception:
+                logger.exception("failed to flush session %s, keeping it cached", session_id)
+                return
+        if entry.users == 0 and self.entries.get(session_id) is entry:
+            del self.entries[session_id]
+            SESSION_CACHE_EVENTS.labels(reason).inc()
+
+    async def sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.evict()
+            except Exception:
+                logger.exception("session cache sweep failed")
+
+    async def start(self):
+        self.sweeper = asyncio.create_task(self.sweep_forever(min(self.idle_ttl / 2, 60.0)))
+
+    async def close(self):
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+            await asyncio.gather(self.sweeper, return_exceptions=True)
+            self.sweeper = None
+        await self.wait_for_writes()
+        for session_id, entry in list(self.entries.items()):
+            await self.drop(session_id, entry, "evicted_shutdown")
+        SESSION_CACHE_SESSIONS.set(len(self.entries))
+
+
+def create_session_chat_agent(session_id: Optional[str], config: Hashable, autosave: bool = False):
+    namespace, max_iterations = config
+    return create_chat_agent(
+        max_iterations=max_iterations,
+        tools=[get_search_web_ddg(), retrieve_context],
+        pinecone_index=pinecone_vector_service.get_index(),
+        vector_retriever=pinecone_vector_service.get_vectorstore(namespace=namespace).as_retriever(),
+        session_id=session_id,
+        storage_adapter=FileStorageAdapter(),
+        namespace=namespace,
+        autosave=autosave,
+    )
+
+
+session_agent_cache = SessionAgentCache(create_session_chat_agent)
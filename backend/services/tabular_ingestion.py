@@ -0,0 +1,119 @@
+import csv
+import io
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from core.config import settings
+
+
+class TabularChunker:
+    """Groups CSV rows into multi-row chunks instead of one document per row.
+
+    Each chunk is rendered as CSV with the header line repeated, so every chunk
+    is self-describing for the embedding model and the LLM. Columns listed in
+    metadata_columns are dropped from the embedded text and stored as metadata
+    instead; rows are grouped by their values so each chunk carries a single
+    value per column and stays filterable with a plain equality filter.
+    """
+
+    def __init__(
+            self,
+            rows_per_chunk: int = settings.TABULAR_ROWS_PER_CHUNK,
+            max_chunk_chars: int = settings.TABULAR_MAX_CHUNK_CHARS,
+            metadata_columns: Optional[Sequence[str]] = None,
+            max_open_groups: int = settings.TABULAR_MAX_OPEN_GROUPS,
+    ):
+        self.rows_per_chunk = rows_per_chunk
+        self.max_chunk_chars = max_chunk_chars
+        self.metadata_columns = list(metadata_columns or [])
+        self.max_open_groups = max_open_groups
+        self.row_count = 0
+
+    def iter_chunks(
+            self,
+            stream: BinaryIO,
+            source: str,
+            metadata: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Document]:
+        text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        try:
+            yield from self._iter_chunks(csv.reader(text), source, metadata or {})
+        finally:
+            text.detach()
+
+    def iter_batches(
+            self,
+            stream: BinaryIO,
+            source: str,
+            batch_size: int = settings.TABULAR_UPLOAD_BATCH,
+            metadata: Optional[Dict[str, str]] = None,
+    ) -> Iterator[List[Document]]:
+        batch = []
+        for chunk in self.iter_chunks(stream, source, metadata):
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _iter_chunks(self, reader, source: str, metadata: Dict[str, str]) -> Iterator[Document]:
+        header = next(reader, None)
+        if header is None:
+            return
+
+        missing = [column for column in self.metadata_columns if column not in header]
+        if missing:
+            raise ValueError(f"Metadata columns not in CSV header: {', '.join(missing)}")
+
+        key_indexes = [header.index(column) for column in self.metadata_columns]
+        text_indexes = [i for i in range(len(header)) if i not in key_indexes]
+        header_line = render_row([header[i] for i in text_indexes])
+
+        # open chunk per metadata key: (first row number, last row number, rendered rows, char count)
+        groups: Dict[Tuple[str, ...], Tuple[int, int, List[str], int]] = {}
+
+        def flush(key: Tuple[str, ...]) -> Document:
+            first_row, last_row, lines, _ = groups.pop(key)
+            return Document(
+                page_content=header_line + "".join(lines),
+                metadata={
+                    **metadata,
+                    **dict(zip(self.metadata_columns, key)),
+                    "source": source,
+                    "row_start": first_row,
+                    "row_end": last_row,
+                },
+            )
+
+        for row_number, row in enumerate(reader):
+            self.row_count += 1
+            row += [""] * (len(header) - len(row))
+            key = tuple(row[i] for i in key_indexes)
+            line = render_row([row[i] for i in text_indexes])
+
+            if key in groups and groups[key][3] + len(line) > self.max_chunk_chars:
+                yield flush(key)
+
+            if key not in groups:
+                if len(groups) >= self.max_open_groups:
+                    # too many distinct keys to buffer; emit the group that has waited longest
+                    yield flush(next(iter(groups)))
+                groups[key] = (row_number, row_number, [], len(header_line))
+
+            first_row, _, lines, size = groups[key]
+            lines.append(line)
+            groups[key] = (first_row, row_number, lines, size + len(line))
+
+            if len(lines) >= self.rows_per_chunk:
+                yield flush(key)
+
+        for key in list(groups):
+            yield flush(key)
+
+
+def render_row(values: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
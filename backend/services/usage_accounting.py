@@ -0,0 +1,361 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from core.callbacks import MetricsCallbackHandler, RunTable
+from core.config import settings
+from core.context_vars import request_usage
+from core.metrics import LLM_COST, LLM_UNACCOUNTED_CALLS, USAGE_BUDGET_EVENTS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_calls (
+    ts REAL NOT NULL,
+    request_id TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    session_id TEXT,
+    model TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_read_tokens INTEGER NOT NULL,
+    cache_write_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_calls_by_namespace ON llm_calls (namespace, ts);
+CREATE INDEX IF NOT EXISTS llm_calls_by_time ON llm_calls (ts);
+"""
+
+# API group_by values and the columns they aggregate on
+GROUP_COLUMNS = {
+    "namespace": "namespace",
+    "session": "session_id",
+    "endpoint": "endpoint",
+    "request": "request_id",
+    "model": "model",
+}
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, namespace: Optional[str], spent: float, budget: float):
+        super().__init__(f"Namespace {namespace!r} has used ${spent:.4f} of its ${budget:.4f} budget")
+        self.namespace = namespace
+        self.spent = spent
+        self.budget = budget
+
+
+@dataclass
+class UsageScope:
+    """What the LLM calls of one request are attributed to, and its running cost."""
+    request_id: str
+    endpoint: str
+    namespace: Optional[str]
+    session_id: Optional[str]
+    budget: Optional[float] = None
+    # namespace spend in the budget window when the request started; concurrent
+    # requests don't see each other's spend, so budgets are soft by up to one request each
+    spent_before: float = 0.0
+    request_max_cost: Optional[float] = None
+    cost: float = 0.0
+    tokens: Dict[str, int] = field(default_factory=lambda: {"input": 0, "output": 0, "cache_read": 0, "cache_write": 0})
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, usage: Dict[str, int], cost: float):
+        with self.lock:
+            self.cost += cost
+            for token_type, count in usage.items():
+                self.tokens[token_type] += count
+
+    def over_budget(self) -> bool:
+        if self.request_max_cost is not None and self.cost >= self.request_max_cost:
+            return True
+        return self.budget is not None and self.spent_before + self.cost >= self.budget
+
+
+@dataclass
+class UsageSummary:
+    key: Optional[str]
+    requests: int
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cache_read_tokens: int
+    cache_write_tokens: int
+    cost: float
+
+
+@dataclass
+class BudgetStatus:
+    namespace: Optional[str]
+    budget: Optional[float]
+    spent: float
+    remaining: Optional[float]
+
+
+def namespace_key(namespace: Optional[str]) -> str:
+    return namespace or ""
+
+
+class UsageTracker:
+    """Token usage and estimated cost of every LLM call, in SQLite, with per-namespace budgets.
+
+    Prices are USD per million tokens, looked up by the longest pricing key
+    the model name starts with; models without a price (local Ollama) cost 0.
+    Budgets are USD per namespace over a rolling window of budget_window
+    seconds; namespaces not listed in budgets get default_budget.
+    """
+
+    def __init__(
+            self,
+            path: str = settings.USAGE_DB_PATH,
+            pricing: Dict[str, Dict[str, float]] = settings.LLM_PRICING,
+            budgets: Dict[str, float] = settings.USAGE_BUDGETS,
+            default_budget: Optional[float] = settings.USAGE_DEFAULT_BUDGET,
+            budget_window: float = settings.USAGE_BUDGET_WINDOW,
+            request_max_cost: Optional[float] = settings.USAGE_REQUEST_MAX_COST,
+    ):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+        self.pricing = pricing
+        self.budgets = budgets
+        self.default_budget = default_budget
+        self.budget_window = budget_window
+        self.request_max_cost = request_max_cost
+
+    def price(self, model: str) -> Dict[str, float]:
+        matches = [key for key in self.pricing if model.startswith(key)]
+        return self.pricing[max(matches, key=len)] if matches else {}
+
+    def cost(self, model: str, usage: Dict[str, int]) -> float:
+        price = self.price(model)
+        if not price:
+            return 0.0
+        # input_tokens already counts the cache reads and writes, which are billed at their own rates
+        uncached = max(0, usage["input"] - usage["cache_read"] - usage["cache_write"])
+        return (
+            uncached * price.get("input", 0.0)
+            + usage["output"] * price.get("output", 0.0)
+            + usage["cache_read"] * price.get("cache_read", price.get("input", 0.0))
+            + usage["cache_write"] * price.get("cache_write", price.get("input", 0.0))
+        ) / 1_000_000
+
+    def budget_for(self, namespace: Optional[str]) -> Optional[float]:
+        return self.budgets.get(namespace_key(namespace), self.default_budget)
+
+    def spent(self, namespace: Optional[str], since: Optional[float] = None) -> float:
+        since = time.time() - self.budget_window if since is None else since
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT COALESCE(SUM(cost), 0) AS cost FROM llm_calls WHERE namespace = ? AND ts >= ?",
+                (namespace_key(namespace), since),
+            ).fetchone()
+        return row["cost"]
+
+    def open_scope(
+            self,
+            endpoint: str,
+            namespace: Optional[str] = None,
+            session_id: Optional[str] = None,
+            request_id: Optional[str] = None,
+            enforce: bool = True,
+    ) -> UsageScope:
+        """A scope for one request; raises BudgetExceeded if enforce and the namespace has none left."""
+        budget = self.budget_for(namespace)
+        spent = self.spent(namespace) if budget is not None else 0.0
+        if enforce and budget is not None and spent >= budget:
+            USAGE_BUDGET_EVENTS.labels("rejected").inc()
+            raise BudgetExceeded(namespace, spent, budget)
+        return UsageScope(
+            request_id=request_id or uuid.uuid4().hex,
+            endpoint=endpoint,
+            namespace=namespace,
+            session_id=session_id,
+            budget=budget,
+            spent_before=spent,
+            request_max_cost=self.request_max_cost,
+        )
+
+    def record(self, scope: Optional[UsageScope], model: str, usage: Dict[str, int]):
+        cost = self.cost(model, usage)
+        LLM_COST.labels(model=model).inc(cost)
+        if scope is None:
+            # a call outside any request, e.g. the query router warming up
+            scope = UsageScope(request_id="", endpoint="", namespace=None, session_id=None)
+        scope.add(usage, cost)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO llm_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(), scope.request_id, scope.endpoint, namespace_key(scope.namespace), scope.session_id,
+                    model, usage["input"], usage["output"], usage["cache_read"], usage["cache_write"], cost,
+                ),
+            )
+
+    def summary(
+            self,
+            group_by: str = "namespace",
+            since: Optional[float] = None,
+            namespace: Optional[str] = None,
+            limit: int = 100,
+    ) -> List[UsageSummary]:
+        column = GROUP_COLUMNS[group_by]
+        conditions, params = ["ts >= ?"], [since or 0.0]
+        if namespace is not None:
+            conditions.append("namespace = ?")
+            params.append(namespace_key(namespace))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {column} AS key, COUNT(DISTINCT request_id) AS requests, COUNT(*) AS calls, "
+                "SUM(input_tokens) AS input_tokens, SUM(output_tokens) AS output_tokens, "
+                "SUM(cache_read_tokens) AS cache_read_tokens, SUM(cache_write_tokens) AS cache_write_tokens, "
+                f"SUM(cost) AS cost FROM llm_calls WHERE {' AND '.join(conditions)} "
+                f"GROUP BY {column} ORDER BY cost DESC, calls DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [
+            UsageSummary(
+                key=(row["key"] or None) if group_by == "namespace" else row["key"],
+                requests=row["requests"],
+                calls=row["calls"],
+                input_tokens=row["input_tokens"],
+                output_tokens=row["output_tokens"],
+                cache_read_tokens=row["cache_read_tokens"],
+                cache_write_tokens=row["cache_write_tokens"],
+                cost=row["cost"],
+            )
+            for row in rows
+        ]
+
+    def budget_statuses(self) -> List[BudgetStatus]:
+        since = time.time() - self.budget_window
+        with self.lock:
+            spent = {
+                row["namespace"]: row["cost"] for row in self.connection.execute(
+                    "SELECT namespace, SUM(cost) AS cost FROM llm_calls WHERE ts >= ? GROUP BY namespace", (since,)
+                )
+            }
+        statuses = []
+        for ns in sorted(set(spent) | set(self.budgets)):
+            budget = self.budgets.get(ns, self.default_budget)
+            used = spent.get(ns, 0.0)
+            statuses.append(BudgetStatus(
+                namespace=ns or None,
+                budget=budget,
+                spent=used,
+                remaining=None if budget is None else max(0.0, budget - used),
+            ))
+        return statuses
+
+
+usage_tracker = UsageTracker()
+
+
+@contextmanager
+def activate_scope(scope: Optional[UsageScope]):
+    token = request_usage.set(scope)
+    try:
+        yield scope
+    finally:
+        request_usage.reset(token)
+
+
+def open_usage_scope(
+        endpoint: str,
+        namespace: Optional[str] = None,
+        session_id: Optional[str] = None,
+        request_id: Optional[str] = None,
+        enforce: bool = True,
+) -> Optional[UsageScope]:
+    if not settings.USAGE_ACCOUNTING_ENABLED:
+        return None
+    return usage_tracker.open_scope(endpoint, namespace, session_id, request_id, enforce)
+
+
+@contextmanager
+def usage_scope(
+        endpoint: str,
+        namespace: Optional[str] = None,
+        session_id: Optional[str] = None,
+        request_id: Optional[str] = None,
+        enforce: bool = True,
+):
+    """Attribute the LLM calls made inside to one request; raises BudgetExceeded before starting if over budget."""
+    with activate_scope(open_usage_scope(endpoint, namespace, session_id, request_id, enforce)) as scope:
+        yield scope
+
+
+def usage_payload() -> Dict[str, Any]:
+    """The current scope, for queue payloads, so worker-side calls are attributed to the same request."""
+    scope = request_usage.get()
+    if scope is None:
+        return {}
+    return {"usage": {"request_id": scope.request_id, "endpoint": scope.endpoint, "session_id": scope.session_id}}
+
+
+def worker_usage_scope(payload: Dict[str, Any], endpoint: str):
+    usage = payload.get("usage") or {}
+    # the API checked the budget when the request came in; in-flight work is only capped, not refused
+    return usage_scope(
+        usage.get("endpoint", endpoint),
+        payload.get("namespace"),
+        usage.get("session_id"),
+        usage.get("request_id"),
+        enforce=False,
+    )
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Records the token usage of every LLM run against the request scope it started in.
+
+    Attached to the provider models themselves, not the router around them,
+    so each backend call that completes is counted exactly once, including
+    hedged duplicates that win. A call cancelled mid-flight, such as a hedge
+    loser, never reports its usage; it is counted in LLM_UNACCOUNTED_CALLS
+    instead, and whatever the provider billed for it is missing here.
+    """
+
+    def __init__(self, tracker: UsageTracker):
+        self.tracker = tracker
+        self.runs: Dict[UUID, tuple] = RunTable()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self.runs.start(run_id, MetricsCallbackHandler.model_name(serialized, metadata, kwargs), request_usage.get())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self.runs.start(run_id, MetricsCallbackHandler.model_name(serialized, metadata, kwargs), request_usage.get())
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        _, model, scope = self.runs.pop(run_id, (None, "unknown", None))
+        usage = MetricsCallbackHandler.token_usage(response)
+        try:
+            self.tracker.record(scope, model, usage)
+        except Exception:
+            logger.exception("failed to record usage for %s", model)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.runs.pop(run_id, None)
+
+    def on_llm_cancelled(self, *, run_id: UUID):
+        run = self.runs.pop(run_id, None)
+        if run is not None:
+            LLM_UNACCOUNTED_CALLS.labels(model=run[1]).inc()
+
+
+usage_callback = UsageCallbackHandler(usage_tracker)
@@ -0,0 +1,7 @@
+import os
+
+# keep the suite offline: service modules build their clients at import time
+os.environ.setdefault("VECTOR_STORE_PROVIDER", "local")
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("DOCUMENT_CATALOG_PATH", ":memory:")
+os.environ.setdefault("USAGE_DB_PATH", ":memory:")
@@ -0,0 +1,147 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from core.admission import AdmissionController, AdmissionRejected
+from core.middleware import AdmissionMiddleware
+
+
+def make_controller(**kwargs):
+    kwargs.setdefault("global_limit", 4)
+    kwargs.setdefault("batch_share", 0.5)
+    kwargs.setdefault("queue_size", 2)
+    kwargs.setdefault("max_wait", 1.0)
+    return AdmissionController(
+        endpoint_limits={"/chat": 4, "/research": 2},
+        interactive_paths=["/chat"],
+        **kwargs,
+    )
+
+
+class TestAdmissionController:
+    @pytest.mark.asyncio
+    async def test_endpoint_limit_and_queue_full(self):
+        controller = make_controller()
+        research = controller.match("/research/")
+
+        await controller.acquire(research)
+        await controller.acquire(research)
+        queued = [asyncio.create_task(controller.acquire(research)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(research)
+        assert rejected.value.reason == "queue_full"
+        assert rejected.value.retry_after >= 1
+
+        controller.release(research, 0.1)
+        await asyncio.sleep(0.01)
+        assert queued[0].done() and not queued[1].done()
+
+        controller.release(research)
+        await asyncio.gather(*queued)
+        assert research.active == 2 and research.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_share_leaves_room_for_interactive(self):
+        controller = make_controller(global_limit=2, batch_share=0.5)
+        chat, research = controller.match("/chat"), controller.match("/research")
+
+        await controller.acquire(research)
+        waiting_research = asyncio.create_task(controller.acquire(research))
+        await asyncio.sleep(0.01)
+
+        # batch may only hold one of the two global slots
+        assert not waiting_research.done()
+        await asyncio.wait_for(controller.acquire(chat), 0.1)
+
+        controller.release(research)
+        await waiting_research
+
+    @pytest.mark.asyncio
+    async def test_interactive_waiters_served_first(self):
+        controller = make_controller(global_limit=1, batch_share=1.0)
+        chat, research = controller.match("/chat"), controller.match("/research")
+        order = []
+
+        async def wait(endpoint, name):
+            await controller.acquire(endpoint)
+            order.append(name)
+
+        await controller.acquire(research)
+        tasks = [
+            asyncio.create_task(wait(research, "research")),
+            asyncio.create_task(wait(chat, "chat")),
+        ]
+        await asyncio.sleep(0.01)
+
+        controller.release(research)
+        await asyncio.sleep(0.01)
+        controller.release(chat)
+        await asyncio.gather(*tasks)
+
+        assert order == ["chat", "research"]
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout_and_cancel_leave_no_slot_behind(self):
+        controller = make_controller(max_wait=0.05)
+        research = controller.match("/research")
+        await controller.acquire(research)
+        await controller.acquire(research)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire(research)
+        assert rejected.value.reason == "timeout"
+
+        cancelled = asyncio.create_task(controller.acquire(research))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        assert (research.active, research.waiting, controller.waiters) == (2, 0, [])
+
+
+    @pytest.mark.asyncio
+    async def test_slot_holds_endpoint_capacity(self):
+        controller = make_controller()
+
+        async with controller.slot("/research"):
+            async with controller.slot("/research"):
+                assert controller.match("/research").active == 2 and controller.batch_active == 2
+            async with controller.slot("/unlimited"):
+                pass
+
+        assert controller.active == 0 and controller.batch_active == 0
+
+
+class TestAdmissionMiddleware:
+    @pytest.mark.asyncio
+    async def test_returns_429_with_retry_after(self):
+        release = asyncio.Event()
+        app = FastAPI()
+
+        @app.post("/research")
+        async def research():
+            await release.wait()
+            return {"ok": True}
+
+        @app.get("/health")
+        async def health():
+            return {"ok": True}
+
+        app.add_middleware(AdmissionMiddleware, controller=make_controller(queue_size=1))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            running = [asyncio.create_task(client.post("/research")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+
+            rejected = await client.post("/research")
+            assert rejected.status_code == 429
+            assert int(rejected.headers["Retry-After"]) >= 1
+            assert (await client.get("/health")).status_code == 200
+
+            release.set()
+            assert [r.status_code for r in await asyncio.gather(*running)] == [200, 200, 200]
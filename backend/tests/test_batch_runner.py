@@ -0,0 +1,136 @@
+import asyncio
+import json
+from typing import Any, List, Optional
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from api.routes import chat_routes, document_routes
+from core.admission import AdmissionController
+from services.batch_runner import run_bounded
+from services.pinecone_vector_service import pinecone_vector_service
+
+
+class EchoLLM(BaseChatModel):
+    model: str = "echo"
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if messages[-1].content == "fail":
+            raise ValueError("bad prompt")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=messages[-1].content.upper()))])
+
+
+class SlowLLM(EchoLLM):
+    running: int = 0
+    max_running: int = 0
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.02)
+        self.running -= 1
+        return self._generate(messages)
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(chat_routes.router, prefix="/api/chat")
+    app.include_router(document_routes.router, prefix="/api/documents")
+    return app
+
+
+async def post_ndjson(path: str, body: dict):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+        response = await client.post(path, json=body)
+    lines = [json.loads(line) for line in response.text.splitlines()] if response.status_code == 200 else []
+    return response, sorted(lines, key=lambda line: line.get("index", -1))
+
+
+class TestRunBounded:
+    @pytest.mark.asyncio
+    async def test_limits_concurrency_and_reports_errors(self):
+        running, peak = 0, 0
+
+        async def job(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if value == 3:
+                raise ValueError("three")
+            return value * 10
+
+        jobs = [lambda value=value: job(value) for value in range(6)]
+        results = {index: (result, error) async for index, result, error in run_bounded(jobs, concurrency=2)}
+
+        assert peak == 2
+        assert sorted(results) == list(range(6))
+        assert results[1] == (10, None)
+        assert results[3][0] is None and str(results[3][1]) == "three"
+
+
+class TestBatchEndpoints:
+    @pytest.mark.asyncio
+    async def test_search_batch_streams_per_query_results(self):
+        pinecone_vector_service.upload_documents(
+            [Document(page_content=f"batch search chunk {i}", metadata={"source": f"s{i}"}) for i in range(5)],
+            namespace="batch-search",
+        )
+        queries = ["chunk 1", "chunk 2", "chunk 1"]
+
+        with patch.object(
+                pinecone_vector_service.embeddings, "embed_documents", wraps=pinecone_vector_service.embeddings.embed_documents
+        ) as embed:
+            response, lines = await post_ndjson(
+                "/api/documents/search/batch", {"queries": queries, "k": 2, "namespace": "batch-search"}
+            )
+
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [line["query"] for line in lines] == queries
+        assert all(len(line["results"]) == 2 for line in lines)
+        assert lines[0]["results"] == lines[2]["results"]
+        # duplicates are only encoded once, in a single call
+        embed.assert_called_once_with(["chunk 1", "chunk 2"])
+
+    @pytest.mark.asyncio
+    async def test_search_batch_rejects_empty(self):
+        response, _ = await post_ndjson("/api/documents/search/batch", {"queries": []})
+
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_chat_batch_isolates_failures(self):
+        items = [{"messages": [{"role": "user", "content": content}]} for content in ("one", "fail", "three")]
+
+        with patch.object(chat_routes.llm_service, "get_llm", return_value=EchoLLM()):
+            response, lines = await post_ndjson("/api/chat/batch", {"items": items, "concurrency": 2})
+
+        assert response.status_code == 200
+        assert lines[0] == {"index": 0, "response": "ONE", "model": "echo"}
+        assert lines[1]["index"] == 1 and "bad prompt" in lines[1]["error"]
+        assert lines[2]["response"] == "THREE"
+
+    @pytest.mark.asyncio
+    async def test_chat_batch_items_admitted_one_by_one(self):
+        items = [{"messages": [{"role": "user", "content": f"item {i}"}]} for i in range(4)]
+        llm = SlowLLM()
+        controller = AdmissionController(endpoint_limits={chat_routes.CHAT_BATCH_ITEMS_PATH: 2}, global_limit=8)
+
+        with patch.object(chat_routes.llm_service, "get_llm", return_value=llm), \
+                patch.object(chat_routes, "admission_controller", controller):
+            response, lines = await post_ndjson("/api/chat/batch", {"items": items, "concurrency": 4})
+
+        assert [line["response"] for line in lines] == [f"ITEM {i}" for i in range(4)]
+        assert llm.max_running == 2
+        assert controller.active == 0
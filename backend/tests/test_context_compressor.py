@@ -0,0 +1,90 @@
+import re
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from services.context_compressor import ContextCompressor, estimate_tokens, split_sentences
+from tools.retriever import serialize_documents
+
+VOCABULARY = ["bridge", "cost", "budget", "steel", "river", "weather", "rain", "football", "match", "goal"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Bag-of-words vectors, so similarity follows shared keywords."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        words = re.findall(r"[a-z]+", text.lower())
+        return [float(words.count(term)) for term in VOCABULARY]
+
+
+DOCUMENTS = [
+    Document(
+        page_content=(
+            "The bridge project ran over budget. The final cost of the bridge was twice the budget. "
+            "It rained for most of the spring. The football match was cancelled because of rain."
+        ),
+        metadata={"source": "bridge.pdf", "page": 3, "author": "x", "producer": "pdf tool", "document_id": "bridge.pdf"},
+    ),
+    Document(
+        page_content=(
+            "Steel prices drove the bridge cost up. The river crossing needed extra steel. "
+            "The local team scored a late goal in the match."
+        ),
+        metadata={"source": "steel.txt"},
+    ),
+]
+
+
+class TestContextCompressor:
+    def test_split_sentences(self):
+        text = "First sentence here. Second one follows!\n\n- a bullet point item\nShort. Tail of the text?"
+
+        assert split_sentences(text, min_chars=10) == [
+            "First sentence here.",
+            "Second one follows!",
+            "- a bullet point item Short.",
+            "Tail of the text?",
+        ]
+
+    def test_keeps_relevant_sentences_within_budget(self):
+        compressor = ContextCompressor(KeywordEmbeddings(), token_budget=40)
+
+        chunks = compressor.compress("what did the bridge cost against its budget", DOCUMENTS)
+        kept = [sentence for chunk in chunks for sentence in chunk.sentences]
+
+        assert "The final cost of the bridge was twice the budget." in kept
+        assert not any("football" in sentence or "goal" in sentence for sentence in kept)
+        assert sum(estimate_tokens(sentence) for sentence in kept) <= 40
+
+    def test_strips_metadata_to_source_fields(self):
+        compressor = ContextCompressor(KeywordEmbeddings(), token_budget=200)
+
+        text = compressor.compress_to_text("bridge cost", DOCUMENTS)
+
+        assert "Source: source=bridge.pdf, page=3" in text
+        assert "producer" not in text and "author" not in text
+        assert len(text) < len(serialize_documents(DOCUMENTS))
+
+    def test_best_sentence_kept_even_over_budget(self):
+        compressor = ContextCompressor(KeywordEmbeddings(), token_budget=1)
+
+        chunks = compressor.compress("steel river", DOCUMENTS)
+
+        assert [chunk.sentences for chunk in chunks] == [["The river crossing needed extra steel."]]
+        assert compressor.compress("anything", []) == []
+
+    def test_tabular_chunks_kept_whole(self):
+        compressor = ContextCompressor(KeywordEmbeddings(), token_budget=200)
+        table = Document(
+            page_content="item,cost\nsteel,120\nbridge deck,300\n",
+            metadata={"source": "costs.csv", "row_start": 0, "row_end": 1},
+        )
+
+        chunks = compressor.compress("bridge steel cost", [table, DOCUMENTS[1]])
+
+        assert ["item,cost\nsteel,120\nbridge deck,300"] in [chunk.sentences for chunk in chunks]
+        assert "Content: item,cost\nsteel,120\n" in compressor.compress_to_text("steel cost", [table])
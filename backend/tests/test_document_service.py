@@ -0,0 +1,227 @@
+import io
+import random
+import tempfile
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.corpus import write_pdf
+from services.document_loaders import loader_registry, register_loader
+from services.document_catalog import DocumentCatalog
+from services.document_service import DocumentProcessorService, DocumentVectorPipeline, DocumentExistsError
+from services.local_vector_service import LocalVectorService
+from services.tabular_ingestion import TabularChunker
+
+
+class TestParallelProcessing:
+    @pytest.fixture
+    def pdf_bytes(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            write_pdf(tmp.name, 400 * 1024, random.Random(1))
+            yield open(tmp.name, "rb").read()
+
+    @pytest.fixture
+    def parallel(self):
+        processor = DocumentProcessorService(parallel_workers=2)
+        yield processor
+        processor.get_pool().shutdown()
+
+    def test_parallel_pdf_matches_serial(self, pdf_bytes, parallel):
+        serial = DocumentProcessorService(parallel_workers=0)
+
+        expected = serial.load_and_process(pdf_bytes, "report.pdf", {"team": "a"})
+        actual = parallel.load_and_process(pdf_bytes, "report.pdf", {"team": "a"})
+
+        assert len(actual) == len(expected)
+        assert [c.page_content for c in actual] == [c.page_content for c in expected]
+        assert [c.metadata["page"] for c in actual] == [c.metadata["page"] for c in expected]
+        assert all(c.metadata["team"] == "a" for c in actual)
+        assert actual[0].metadata["total_pages"] == expected[0].metadata["total_pages"]
+
+    def test_parallel_output_is_deterministic(self, pdf_bytes, parallel):
+        first = parallel.load_and_process(pdf_bytes, "report.pdf")
+        second = parallel.load_and_process(pdf_bytes, "report.pdf")
+
+        assert [c.page_content for c in first] == [c.page_content for c in second]
+        assert [c.metadata["page"] for c in first] == [c.metadata["page"] for c in second]
+
+    def test_parallel_split_preserves_order(self, parallel):
+        documents = [
+            Document(page_content=f"row {i} " + "word " * random.Random(i).randint(10, 400), metadata={"row": i})
+            for i in range(600)
+        ]
+
+        expected = parallel.text_splitter.split_documents(documents)
+        actual = parallel.process_documents(documents)
+
+        assert [(c.metadata["row"], c.page_content) for c in actual] == \
+               [(c.metadata["row"], c.page_content) for c in expected]
+
+
+class TestInMemoryLoaders:
+    @pytest.fixture
+    def processor(self):
+        return DocumentProcessorService(parallel_workers=0)
+
+    def test_text_from_bytes(self, processor):
+        docs = processor.load_document("hello world".encode(), "notes.txt")
+
+        assert docs == [Document(page_content="hello world", metadata={"source": "notes.txt"})]
+
+    def test_csv_matches_langchain_loader(self, processor, tmp_path):
+        from langchain_community.document_loaders import CSVLoader
+
+        path = tmp_path / "table.csv"
+        path.write_text("name,price\nwidget, 3.50\ngadget,12\n")
+
+        expected = CSVLoader(str(path)).load()
+        actual = processor.load_document(io.BytesIO(path.read_bytes()), "table.csv")
+
+        assert [d.page_content for d in actual] == [d.page_content for d in expected]
+        assert [d.metadata["row"] for d in actual] == [0, 1]
+
+    def test_pdf_from_non_seekable_stream(self, processor):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            write_pdf(tmp.name, 20 * 1024, random.Random(2))
+            data = open(tmp.name, "rb").read()
+
+        class Pipe(io.RawIOBase):
+            def __init__(self):
+                self.inner = io.BytesIO(data)
+
+            def readable(self):
+                return True
+
+            def readinto(self, b):
+                return self.inner.readinto(b)
+
+        docs = processor.load_document(Pipe(), "report.pdf")
+
+        assert len(docs) > 1
+        assert docs[0].metadata["source"] == "report.pdf"
+        assert [d.metadata["page"] for d in docs] == list(range(len(docs)))
+
+    def test_custom_loader_and_unsupported_type(self, processor):
+        @register_loader(".log")
+        def load_log(stream, source):
+            return [Document(page_content=line, metadata={"source": source})
+                    for line in stream.read().decode().splitlines()]
+
+        try:
+            docs = processor.load_document(b"a\nb", "app.LOG")
+            assert [d.page_content for d in docs] == ["a", "b"]
+        finally:
+            loader_registry.pop(".log")
+
+        with pytest.raises(ValueError, match="Unsupported file type"):
+            processor.load_document(b"x", "archive.zip")
+
+
+class TestTabularChunker:
+    @pytest.fixture
+    def csv_bytes(self):
+        rows = ["id,category,description"] + [f"{i},{'ab'[i % 2]},item {i}" for i in range(10)]
+        return ("\n".join(rows) + "\n").encode()
+
+    def test_groups_rows_with_header_repeated(self, csv_bytes):
+        chunks = list(TabularChunker(rows_per_chunk=4).iter_chunks(io.BytesIO(csv_bytes), "t.csv"))
+
+        assert len(chunks) == 3
+        assert all(c.page_content.startswith("id,category,description\n") for c in chunks)
+        assert chunks[0].page_content.count("\n") == 5
+        assert [(c.metadata["row_start"], c.metadata["row_end"]) for c in chunks] == [(0, 3), (4, 7), (8, 9)]
+
+    def test_metadata_columns_become_filters(self, csv_bytes):
+        chunker = TabularChunker(rows_per_chunk=3, metadata_columns=["category"])
+        chunks = list(chunker.iter_chunks(io.BytesIO(csv_bytes), "t.csv", {"team": "x"}))
+
+        assert chunker.row_count == 10
+        assert {c.metadata["category"] for c in chunks} == {"a", "b"}
+        assert all("category" not in c.page_content for c in chunks)
+        assert all(c.metadata["team"] == "x" for c in chunks)
+        for chunk in chunks:
+            ids = [int(line.split(",")[0]) for line in chunk.page_content.splitlines()[1:]]
+            assert all("ab"[i % 2] == chunk.metadata["category"] for i in ids)
+            assert (ids[0], ids[-1]) == (chunk.metadata["row_start"], chunk.metadata["row_end"])
+
+    def test_char_limit_and_unknown_column(self, csv_bytes):
+        chunks = list(TabularChunker(rows_per_chunk=100, max_chunk_chars=60).iter_chunks(io.BytesIO(csv_bytes), "t.csv"))
+        assert len(chunks) > 1
+        assert sum(c.page_content.count("\n") - 1 for c in chunks) == 10
+
+        with pytest.raises(ValueError, match="price"):
+            list(TabularChunker(metadata_columns=["price"]).iter_chunks(io.BytesIO(csv_bytes), "t.csv"))
+
+
+class TestDocumentCatalog:
+    @pytest.fixture
+    def pipeline(self):
+        return DocumentVectorPipeline(
+            processor=DocumentProcessorService(chunk_size=200, chunk_overlap=0),
+            vector_service=LocalVectorService(),
+            catalog=DocumentCatalog(":memory:"),
+        )
+
+    @staticmethod
+    def stored_ids(pipeline, namespace):
+        return set(pipeline.vector_service.get_vectorstore(namespace).store)
+
+    def test_upload_records_chunk_ids(self, pipeline):
+        record = pipeline.process_and_upload(b"alpha beta gamma. " * 40, "a.txt", namespace="ns", metadata={"team": "x"})
+
+        assert record.document_id == "a.txt"
+        assert record.chunk_count > 1
+        assert set(pipeline.catalog.chunk_ids("ns", "a.txt")) == self.stored_ids(pipeline, "ns")
+        assert pipeline.catalog.list_documents("ns")[0].metadata == {"team": "x"}
+
+    def test_duplicate_upload_needs_replace(self, pipeline):
+        pipeline.process_and_upload(b"first version", "a.txt", namespace="ns")
+
+        with pytest.raises(DocumentExistsError):
+            pipeline.process_and_upload(b"second version", "a.txt", namespace="ns")
+
+        old_ids = set(pipeline.catalog.chunk_ids("ns", "a.txt"))
+        record = pipeline.process_and_upload(b"second version", "a.txt", namespace="ns", replace=True)
+
+        stored = self.stored_ids(pipeline, "ns")
+        assert not old_ids & stored
+        assert stored == set(pipeline.catalog.chunk_ids("ns", "a.txt"))
+        assert record.chunk_count == 1
+        assert pipeline.catalog.stats("ns").document_count == 1
+
+    def test_concurrent_duplicate_loses_at_catalog_write(self, pipeline):
+        pipeline.process_and_upload(b"first version", "a.txt", namespace="ns")
+        first_ids = set(pipeline.catalog.chunk_ids("ns", "a.txt"))
+
+        # a second upload that passed check_new before the first one was cataloged
+        with pytest.raises(DocumentExistsError):
+            pipeline.upload_batches([[Document(page_content="second version")]], "a.txt", "a.txt", "ns", replace=False)
+
+        assert set(pipeline.catalog.chunk_ids("ns", "a.txt")) == first_ids
+        assert self.stored_ids(pipeline, "ns") == first_ids
+
+    def test_delete_only_touches_one_document(self, pipeline):
+        pipeline.process_and_upload(b"keep me", "keep.txt", namespace="ns")
+        pipeline.process_and_upload(b"drop me", "drop.txt", namespace="ns")
+
+        record = pipeline.delete_document("drop.txt", namespace="ns")
+
+        assert record.filename == "drop.txt"
+        assert self.stored_ids(pipeline, "ns") == set(pipeline.catalog.chunk_ids("ns", "keep.txt"))
+        assert [r.document_id for r in pipeline.catalog.list_documents("ns")] == ["keep.txt"]
+        assert pipeline.delete_document("drop.txt", namespace="ns") is None
+
+    def test_stats_and_failed_upload_cleanup(self, pipeline):
+        pipeline.process_and_upload(b"x" * 50, "a.txt")
+        pipeline.process_and_upload(b"y" * 70, "b.txt")
+
+        def broken_batches():
+            yield [Document(page_content="partial")]
+            raise RuntimeError("loader blew up")
+
+        with pytest.raises(RuntimeError):
+            pipeline.upload_batches(broken_batches(), "c.txt", "c.txt")
+
+        stats = pipeline.catalog.stats(None)
+        assert (stats.document_count, stats.chunk_count, stats.char_count) == (2, 2, 120)
+        assert len(self.stored_ids(pipeline, None)) == 2
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from core.config import settings
+
+SAMPLE_TEXTS = [
+    "What is the capital of Azerbaijan?",
+    "The bridge project was delivered two years late and 40% over budget.",
+    "short",
+    "Pinecone stores dense vectors and supports metadata filtering on queries. " * 20,
+    "",
+]
+
+
+def load_backends(onnx_file):
+    pytest.importorskip("onnxruntime")
+    try:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        from services.embedding_service import OnnxEmbeddings
+
+        reference = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+        onnx = OnnxEmbeddings(onnx_file=onnx_file, batch_size=2, num_threads=1)
+    except Exception as e:
+        pytest.skip(f"embedding model not available offline: {e}")
+    return reference, onnx
+
+
+class TestOnnxEmbeddingParity:
+    @pytest.mark.parametrize("onnx_file,min_cosine", [
+        ("onnx/model.onnx", 0.999),
+        ("onnx/model_qint8_avx512_vnni.onnx", 0.95),
+    ])
+    def test_cosine_drift_is_bounded(self, onnx_file, min_cosine):
+        reference, onnx = load_backends(onnx_file)
+
+        expected = np.array(reference.embed_documents(SAMPLE_TEXTS))
+        actual = np.array(onnx.embed_documents(SAMPLE_TEXTS))
+
+        assert actual.shape == expected.shape
+        cosine = (expected * actual).sum(axis=1) / (
+            np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+        )
+        assert cosine.min() >= min_cosine
+
+    def test_query_matches_documents(self):
+        _, onnx = load_backends("onnx/model.onnx")
+
+        query = onnx.embed_query(SAMPLE_TEXTS[0])
+        documents = onnx.embed_documents(SAMPLE_TEXTS)
+
+        assert np.allclose(query, documents[0], atol=1e-5)
+
+
+class TestCreateEmbeddings:
+    def test_unknown_backend(self):
+        from services.embedding_service import create_embeddings
+
+        with pytest.raises(ValueError):
+            create_embeddings("word2vec")
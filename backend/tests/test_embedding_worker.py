@@ -0,0 +1,65 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.embedding_worker import EmbeddingWorkerServer, RemoteEmbeddings, EmbeddingServiceBusy
+
+
+def fake_embeddings():
+    return DeterministicFakeEmbedding(size=8)
+
+
+class SlowEmbedding(DeterministicFakeEmbedding):
+    def embed_documents(self, texts):
+        time.sleep(0.5)
+        return super().embed_documents(texts)
+
+
+def slow_embeddings():
+    return SlowEmbedding(size=8)
+
+
+class TestEmbeddingWorker:
+    @pytest.fixture
+    def socket_path(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield os.path.join(tmpdir, "embed.sock")
+
+    @pytest.mark.asyncio
+    async def test_remote_matches_local(self, socket_path):
+        server = EmbeddingWorkerServer(socket_path, processes=1, queue_size=4, embeddings_factory=fake_embeddings)
+        await server.start()
+        try:
+            client = RemoteEmbeddings(socket_path=socket_path, request_size=2)
+            texts = ["alpha", "beta", "gamma"]
+
+            vectors = await asyncio.to_thread(client.encode, texts)
+            query = await asyncio.to_thread(client.embed_query, "alpha")
+        finally:
+            await server.stop()
+
+        expected = np.array(fake_embeddings().embed_documents(texts), dtype=np.float32)
+        assert vectors.dtype == np.float32
+        assert np.allclose(vectors, expected)
+        assert np.allclose(query, expected[0])
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_requests(self, socket_path):
+        server = EmbeddingWorkerServer(socket_path, processes=1, queue_size=1, embeddings_factory=slow_embeddings)
+        await server.start()
+        try:
+            client = RemoteEmbeddings(socket_path=socket_path, busy_retry_timeout=0)
+            results = await asyncio.gather(
+                *[asyncio.to_thread(client.embed_query, f"text {i}") for i in range(4)],
+                return_exceptions=True,
+            )
+        finally:
+            await server.stop()
+
+        assert any(isinstance(r, EmbeddingServiceBusy) for r in results)
+        assert any(isinstance(r, list) for r in results)
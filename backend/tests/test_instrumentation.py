@@ -0,0 +1,102 @@
+import logging
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+from prometheus_client import REGISTRY
+
+from core.callbacks import RunTable, metrics_callback, with_metrics_callback
+from core.logging_config import SamplingFilter
+from core.metrics import stage_timer
+from core.middleware import MetricsMiddleware
+from tests.test_agent_integration import FakeLLM
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetricsCallbackHandler:
+    @pytest.mark.asyncio
+    async def test_llm_call_recorded(self):
+        llm = FakeLLM(callbacks=[metrics_callback])
+        before = sample("llm_call_duration_seconds_count", {"model": "FakeLLM", "status": "ok"})
+
+        await llm.ainvoke([HumanMessage(content="hi")])
+
+        after = sample("llm_call_duration_seconds_count", {"model": "FakeLLM", "status": "ok"})
+        assert after == before + 1
+        assert not metrics_callback.llm_runs
+
+    def test_tool_call_recorded(self):
+        @tool
+        def echo(text: str) -> str:
+            """echo the text back"""
+            return text
+
+        with_metrics_callback(echo)
+        with_metrics_callback(echo)
+        assert echo.callbacks.count(metrics_callback) == 1
+
+        before = sample("tool_call_duration_seconds_count", {"tool": "echo", "status": "ok"})
+        echo.invoke({"text": "hello"})
+
+        assert sample("tool_call_duration_seconds_count", {"tool": "echo", "status": "ok"}) == before + 1
+
+
+    def test_run_table_drops_stale_runs(self):
+        runs = RunTable(max_age=0.0, sweep_interval=0.0)
+        runs.start("cancelled", "model")
+        runs.start("current", "model")
+
+        assert list(runs) == ["current"]
+        assert runs["current"][1] == "model"
+
+
+class TestStageTimer:
+    def test_errors_counted(self):
+        before = sample("stage_errors_total", {"stage": "test_stage"})
+
+        with pytest.raises(ValueError):
+            with stage_timer("test_stage"):
+                raise ValueError("boom")
+
+        assert sample("stage_errors_total", {"stage": "test_stage"}) == before + 1
+        assert sample("stage_duration_seconds_count", {"stage": "test_stage"}) >= 1
+
+
+class TestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_requests_labelled_by_route_template(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: str):
+            return {"id": item_id}
+
+        labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+        before = sample("http_request_duration_seconds_count", labels)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/items/1")
+            await client.get("/items/2")
+
+        assert sample("http_request_duration_seconds_count", labels) == before + 2
+
+
+class TestSamplingFilter:
+    def record(self, sampled):
+        record = logging.LogRecord("test", logging.DEBUG, __file__, 1, "dump", None, None)
+        if sampled:
+            record.sampled = True
+        return record
+
+    def test_unsampled_records_pass(self):
+        assert SamplingFilter(0.0).filter(self.record(sampled=False))
+
+    def test_sampled_records_dropped_at_zero_rate(self):
+        assert not SamplingFilter(0.0).filter(self.record(sampled=True))
+        assert SamplingFilter(1.0).filter(self.record(sampled=True))
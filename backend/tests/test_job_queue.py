@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from chains.query_decomposition_chain import QueryDecompositionChain
+from services.job_queue import TaskQueue, QueuedResearchAgent, RemoteTaskError, RESEARCH
+from services.research_worker import ResearchWorker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest_asyncio.fixture
+async def queue():
+    redis = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    yield TaskQueue(redis, prefix="test", lease_seconds=0.2, max_attempts=2)
+    await redis.aclose()
+
+
+def start_worker(queue, handler, slots=2):
+    worker = ResearchWorker(queue, {RESEARCH: handler}, {RESEARCH: slots}, heartbeat_seconds=0.05)
+    return worker, asyncio.create_task(worker.run())
+
+
+class TestTaskQueue:
+    @pytest.mark.asyncio
+    async def test_worker_returns_result_through_queue(self, queue):
+        async def handler(payload):
+            return payload["query"].upper()
+
+        worker, run = start_worker(queue, handler)
+        try:
+            assert await queue.call(RESEARCH, {"query": "hello"}, timeout=2) == "HELLO"
+        finally:
+            worker.stop()
+            await run
+
+    @pytest.mark.asyncio
+    async def test_handler_errors_are_returned(self, queue):
+        async def handler(payload):
+            raise ValueError("no sources")
+
+        worker, run = start_worker(queue, handler)
+        try:
+            with pytest.raises(RemoteTaskError, match="no sources"):
+                await queue.call(RESEARCH, {"query": "x"}, timeout=2)
+        finally:
+            worker.stop()
+            await run
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_redelivered(self, queue):
+        task_id = await queue.submit(RESEARCH, {"query": "x"})
+        lost = await queue.claim(RESEARCH, timeout=0.1)
+        assert lost.attempts == 1
+
+        await asyncio.sleep(0.25)
+        assert await queue.reap() == 1
+
+        retried = await queue.claim(RESEARCH, timeout=0.1)
+        assert retried.id == task_id
+        assert retried.attempts == 2
+        await queue.complete(retried, result="done")
+        assert await queue.wait_result(task_id, timeout=1) == "done"
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, queue):
+        task_id = await queue.submit(RESEARCH, {"query": "x"})
+        for _ in range(2):
+            await queue.claim(RESEARCH, timeout=0.1)
+            await asyncio.sleep(0.25)
+            await queue.reap()
+
+        with pytest.raises(RemoteTaskError, match="abandoned"):
+            await queue.wait_result(task_id, timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_keeps_long_task_leased(self, queue):
+        calls = 0
+
+        async def slow(payload):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.6)
+            return "ok"
+
+        worker, run = start_worker(queue, slow, slots=1)
+        other, other_run = start_worker(queue, slow, slots=1)
+        try:
+            assert await queue.call(RESEARCH, {"query": "x"}, timeout=3) == "ok"
+            assert calls == 1
+        finally:
+            worker.stop()
+            other.stop()
+            await asyncio.gather(run, other_run)
+
+    @pytest.mark.asyncio
+    async def test_stopped_worker_releases_its_task(self, queue):
+        started = asyncio.Event()
+
+        async def hang(payload):
+            started.set()
+            await asyncio.sleep(10)
+
+        worker, run = start_worker(queue, hang, slots=1)
+        task_id = await queue.submit(RESEARCH, {"query": "x"})
+        await started.wait()
+        worker.stop()
+        await run
+
+        task = await queue.claim(RESEARCH, timeout=0.1)
+        assert task.id == task_id
+        assert task.attempts == 1
+
+    @pytest.mark.asyncio
+    async def test_sub_questions_fan_out_across_workers(self, queue):
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+        seen_by = {}
+
+        def make_handler(name):
+            async def handler(payload):
+                seen_by[payload["query"]] = name
+                await asyncio.sleep(0.05)
+                return f"answer to {payload['query']}"
+            return handler
+
+        workers = [start_worker(queue, make_handler(f"w{i}"), slots=1) for i in range(3)]
+        llm = FakeListChatModel(responses=[
+            '{"sub_questions": ["q1", "q2", "q3"], "reasoning": "split"}',
+            "final",
+        ])
+        chain = QueryDecompositionChain(llm=llm, research_agent=QueuedResearchAgent(queue, namespace="ns"))
+        try:
+            result = await chain.arun("big question")
+        finally:
+            for worker, _ in workers:
+                worker.stop()
+            await asyncio.gather(*[run for _, run in workers])
+
+        assert result["final_answer"] == "final"
+        assert [a["answer"] for a in result["sub_answers"]] == ["answer to q1", "answer to q2", "answer to q3"]
+        assert len(set(seen_by.values())) == 3
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from services.job_service import JobService, JobQueueFull
+
+
+@pytest_asyncio.fixture
+async def service():
+    service = JobService(workers=1, queue_size=2, result_ttl=60)
+    await service.start()
+    yield service
+    await service.stop()
+
+
+async def wait_done(job, timeout=2.0):
+    async def wait():
+        while not job.done:
+            await job.changed.wait()
+    await asyncio.wait_for(wait(), timeout)
+
+
+class TestJobService:
+    @pytest.mark.asyncio
+    async def test_job_runs_and_reports_progress(self, service):
+        async def run(job):
+            job.publish("step", {"n": 1})
+            await asyncio.sleep(0.01)
+            job.publish("step", {"n": 2})
+            return {"answer": 42}
+
+        job = service.submit("test", run)
+        events = [event async for event in service.subscribe(job)]
+
+        assert job.status == "succeeded"
+        assert job.result == {"answer": 42}
+        assert [e["event"] for e in events] == ["status", "status", "step", "step", "status"]
+        assert [e["data"].get("status") for e in events if e["event"] == "status"] == ["queued", "running", "succeeded"]
+
+    @pytest.mark.asyncio
+    async def test_failure_is_recorded(self, service):
+        async def run(job):
+            raise ValueError("bad input")
+
+        job = service.submit("test", run)
+        await wait_done(job)
+
+        assert job.status == "failed"
+        assert job.error == "bad input"
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_and_queued(self, service):
+        started = asyncio.Event()
+
+        async def slow(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        running = service.submit("test", slow)
+        queued = service.submit("test", slow)
+        await started.wait()
+
+        service.cancel(queued.id)
+        service.cancel(running.id)
+        await wait_done(running)
+
+        assert running.status == "cancelled"
+        assert queued.status == "cancelled"
+        assert queued.started_at is None
+
+    @pytest.mark.asyncio
+    async def test_queue_is_bounded(self, service):
+        started = asyncio.Event()
+
+        async def slow(job):
+            started.set()
+            await asyncio.sleep(10)
+
+        service.submit("test", slow)
+        await started.wait()
+        service.submit("test", slow)
+        service.submit("test", slow)
+
+        with pytest.raises(JobQueueFull):
+            service.submit("test", slow)
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_expire(self, service):
+        async def run(job):
+            return {}
+
+        job = service.submit("test", run)
+        await wait_done(job)
+        assert service.get(job.id) is job
+
+        job.finished_at -= 61
+        assert service.get(job.id) is None
@@ -0,0 +1,202 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+from unittest.mock import patch
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from services.llm_router import BackendHealth, RoutingChatModel
+
+
+class FakeBackend(BaseChatModel):
+    name: str
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        time.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.name))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.name))])
+
+
+def make_router(*backends: FakeBackend, **kwargs) -> RoutingChatModel:
+    health = [
+        BackendHealth(backend.name, window=20, breaker_failures=3, breaker_cooldown=0.2, min_samples=3)
+        for backend in backends
+    ]
+    kwargs.setdefault("hedge_delay", 0.05)
+    return RoutingChatModel(backends=list(backends), health=health, **kwargs)
+
+
+PROMPT = [HumanMessage(content="hello")]
+
+
+class TestRoutingChatModel:
+    @pytest.mark.asyncio
+    async def test_prefers_first_backend(self):
+        primary, secondary = FakeBackend(name="primary"), FakeBackend(name="secondary")
+        router = make_router(primary, secondary)
+
+        result = await router.ainvoke(PROMPT)
+
+        assert result.content == "primary"
+        assert result.response_metadata["llm_backend"] == "primary"
+        assert secondary.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_error(self):
+        primary, secondary = FakeBackend(name="primary", fail=True), FakeBackend(name="secondary")
+        router = make_router(primary, secondary)
+
+        result = await router.ainvoke(PROMPT)
+
+        assert result.content == "secondary"
+        assert router.health[0].consecutive_failures == 1
+
+    @pytest.mark.asyncio
+    async def test_raises_when_every_backend_fails(self):
+        router = make_router(FakeBackend(name="primary", fail=True), FakeBackend(name="secondary", fail=True))
+
+        with pytest.raises(ConnectionError):
+            await router.ainvoke(PROMPT)
+
+    @pytest.mark.asyncio
+    async def test_hedges_slow_request(self):
+        primary, secondary = FakeBackend(name="primary", delay=1.0), FakeBackend(name="secondary")
+        router = make_router(primary, secondary)
+
+        start = time.perf_counter()
+        result = await router.ainvoke(PROMPT)
+
+        assert result.content == "secondary"
+        assert time.perf_counter() - start < 0.5
+        # the cancelled loser is not counted against the primary
+        assert list(router.health[0].outcomes) == []
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_when_disabled(self):
+        primary, secondary = FakeBackend(name="primary", delay=0.1), FakeBackend(name="secondary")
+        router = make_router(primary, secondary, hedging=False)
+
+        result = await router.ainvoke(PROMPT)
+
+        assert result.content == "primary"
+        assert secondary.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_and_recovers(self):
+        primary, secondary = FakeBackend(name="primary", fail=True), FakeBackend(name="secondary")
+        router = make_router(primary, secondary)
+
+        for _ in range(3):
+            await router.ainvoke(PROMPT)
+        assert not router.health[0].available()
+
+        await router.ainvoke(PROMPT)
+        assert primary.calls == 3
+
+        # after the cooldown a single trial request goes to the primary again
+        primary.fail = False
+        await asyncio.sleep(0.25)
+        result = await router.ainvoke(PROMPT)
+
+        assert result.content == "primary"
+        assert router.health[0].available()
+        assert router.health[0].open_until == 0.0
+
+    @pytest.mark.asyncio
+    async def test_failed_trial_reopens_circuit(self):
+        primary, secondary = FakeBackend(name="primary", fail=True), FakeBackend(name="secondary")
+        router = make_router(primary, secondary)
+        for _ in range(3):
+            await router.ainvoke(PROMPT)
+
+        await asyncio.sleep(0.25)
+        await router.ainvoke(PROMPT)
+
+        assert primary.calls == 4
+        assert not router.health[0].available()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_send_one_trial(self):
+        primary, secondary = FakeBackend(name="primary", fail=True), FakeBackend(name="secondary")
+        router = make_router(primary, secondary, hedging=False)
+        for _ in range(3):
+            await router.ainvoke(PROMPT)
+
+        primary.fail, primary.delay = False, 0.05
+        await asyncio.sleep(0.25)
+        results = await asyncio.gather(*(router.ainvoke(PROMPT) for _ in range(5)))
+
+        assert primary.calls == 4
+        assert sorted(r.content for r in results) == ["primary"] + ["secondary"] * 4
+        assert router.health[0].available() and not router.health[1].trial_in_flight
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_keeps_someone_elses_trial(self):
+        primary, secondary = FakeBackend(name="primary", delay=0.5), FakeBackend(name="secondary")
+        router = make_router(primary, secondary, hedging=False)
+
+        # started while the circuit was closed, so it holds no trial
+        stale = asyncio.create_task(router.ainvoke(PROMPT))
+        await asyncio.sleep(0.01)
+        router.health[0].open_until = time.monotonic() - 1
+        assert router.health[0].acquire()
+
+        stale.cancel()
+        await asyncio.gather(stale, return_exceptions=True)
+
+        assert router.health[0].trial_in_flight
+        assert not router.health[0].available()
+
+    @pytest.mark.asyncio
+    async def test_switches_to_much_faster_backend(self):
+        primary, secondary = FakeBackend(name="primary"), FakeBackend(name="secondary")
+        router = make_router(primary, secondary, hedging=False)
+        router.health[0].latencies.extend([0.5] * 5)
+        router.health[1].latencies.extend([0.1] * 5)
+
+        result = await router.ainvoke(PROMPT)
+
+        assert result.content == "secondary"
+
+    def test_sync_invoke_fails_over(self):
+        primary, secondary = FakeBackend(name="primary", fail=True), FakeBackend(name="secondary")
+        router = make_router(primary, secondary)
+
+        assert router.invoke(PROMPT).content == "secondary"
+
+
+class TestRouterProvider:
+    @patch('services.llm_service.settings.LLM_PROVIDER', 'router')
+    def test_creates_router_over_both_providers(self):
+        from langchain_anthropic import ChatAnthropic
+        from langchain_ollama import ChatOllama
+        from services.llm_service import LLMService
+
+        service = LLMService()
+        llm = service.get_llm()
+
+        assert isinstance(llm, RoutingChatModel)
+        assert [type(backend) for backend in llm.backends] == [ChatAnthropic, ChatOllama]
+        assert llm.backends[0].max_retries == 0
+        assert llm.model == "router:anthropic,ollama"
+        # health is shared across models so every request sees the same provider state
+        assert service.get_llm().health[0] is llm.health[0]
@@ -5,7 +5,7 @@ from unittest.mock import patch
 
 class TestLLMService:
     @patch('services.llm_service.settings.LLM_PROVIDER', 'anthropic')
-    @patch('services.llm_service.settings.MODEL_NAME', 'claude-sonnet-4-5-20250929')
+    @patch('services.llm_service.settings.ANTHROPIC_MODEL_NAME', 'claude-sonnet-4-5-20250929')
     def test_creates_anthropic_llm(self):
         service = LLMService()
         llm = service.get_llm()
@@ -14,7 +14,7 @@ class TestLLMService:
         assert isinstance(llm, ChatAnthropic)
 
     @patch('services.llm_service.settings.LLM_PROVIDER', 'ollama')
-    @patch('services.llm_service.settings.MODEL_NAME', 'llama3.1:8b')
+    @patch('services.llm_service.settings.OLLAMA_MODEL_NAME', 'llama3.1:8b')
     def test_creates_ollama_llm(self):
         service = LLMService()
         llm = service.get_llm()
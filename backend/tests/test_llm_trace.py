@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any, List, Optional, Sequence
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from agents.base_agent import BaseAgent
+from core.callbacks import RunTable
+from services.llm_trace import ReplayChatModel, ReplayTool, TraceMismatchError, TraceRecorder, TraceReplay, request_key
+
+
+class LookupLLM(BaseChatModel):
+    """Looks the question up with the lookup tool, then answers with what it found."""
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "lookup"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        if results:
+            message = AIMessage(content=f"answer: {results[-1].content}", usage_metadata={
+                "input_tokens": 10, "output_tokens": 3, "total_tokens": 13,
+            })
+        else:
+            question = messages[-1].content
+            message = AIMessage(content="", tool_calls=[
+                {"name": "lookup", "args": {"term": question.split()[-1]}, "id": f"call-{self.calls}"}
+            ])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+lookups = []
+
+
+@tool
+def lookup(term: str) -> str:
+    """Look a term up."""
+    lookups.append(term)
+    return f"{term} is {len(term)} letters long"
+
+
+def make_agent(llm, tools):
+    return BaseAgent(tools=tools, system_prompt="You look things up", llm=llm)
+
+
+class TestTraceRecordReplay:
+    @pytest.mark.asyncio
+    async def test_replayed_run_matches_recording_offline(self, tmp_path):
+        path = str(tmp_path / "trace.jsonl")
+        recorder = TraceRecorder(path)
+        recorded_tool = lookup.model_copy(update={"callbacks": [recorder]})
+        questions = ["define bridge", "define steel"]
+
+        agents = [make_agent(LookupLLM(callbacks=[recorder]), [recorded_tool]) for _ in questions]
+        recorded = await asyncio.gather(*(agent.run(q) for agent, q in zip(agents, questions)))
+        recorder.close()
+        lookups.clear()
+
+        trace = TraceReplay.load(path)
+        assert sorted(len(v) for v in trace.by_name.values()) == [2, 4]
+
+        replay_llm = ReplayChatModel(trace=trace, latency_scale=0)
+        replay_tool = ReplayTool.replacing(lookup, trace, latency_scale=0)
+        # reversed, so answers have to be matched by prompt rather than by order
+        replayed = await asyncio.gather(*(
+            make_agent(replay_llm, [replay_tool]).run(q) for q in reversed(questions)
+        ))
+
+        assert [r["output"] for r in reversed(replayed)] == [r["output"] for r in recorded]
+        assert recorded[0]["output"] == "answer: bridge is 6 letters long"
+        assert lookups == []
+        assert trace.misses == 0
+
+    def test_request_key_ignores_cache_blocks(self):
+        plain = [SystemMessage(content="You look things up"), HumanMessage(content="hi")]
+        cached = [
+            SystemMessage(content=[{"type": "text", "text": "You look things up", "cache_control": {"type": "ephemeral"}}]),
+            HumanMessage(content="hi"),
+        ]
+
+        assert request_key(plain) == request_key(cached)
+        assert request_key(plain) != request_key([plain[0], HumanMessage(content="hello")])
+
+    def test_unmatched_calls_fall_back_in_order(self):
+        trace = TraceReplay([
+            {"kind": "tool", "key": '{"term": "a"}', "name": "lookup", "latency": 0.1, "output": "first"},
+            {"kind": "tool", "key": '{"term": "b"}', "name": "lookup", "latency": 0.1, "output": "second"},
+        ])
+
+        assert trace.take("tool", '{"term": "b"}', "lookup")["output"] == "second"
+        assert trace.take("tool", '{"term": "zzz"}', "lookup")["output"] == "first"
+        assert trace.misses == 1
+        with pytest.raises(TraceMismatchError):
+            trace.take("tool", "{}", "web_search")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_calls_not_recorded_or_kept(self, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        recorder = TraceRecorder(str(path))
+        recorder.runs = RunTable(max_age=0.0, sweep_interval=0.0)
+
+        class SlowLookupLLM(LookupLLM):
+            async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+                await asyncio.sleep(1)
+                return self._generate(messages, stop, run_manager, **kwargs)
+
+        cancelled = asyncio.create_task(SlowLookupLLM(callbacks=[recorder]).ainvoke([HumanMessage(content="define x")]))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert len(recorder.runs) == 1
+
+        await LookupLLM(callbacks=[recorder]).ainvoke([HumanMessage(content="define y")])
+        recorder.close()
+
+        assert recorder.runs == {}
+        assert len(path.read_text().splitlines()) == 1
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from services.memory_writer import VectorMemoryWriter
+from tests.test_agent_integration import FakeLLM
+
+
+class RecordingVectorService:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.uploads = []
+        self.store = InMemoryVectorStore(embedding=DeterministicFakeEmbedding(size=16))
+
+    def upload_documents(self, documents, namespace=None):
+        time.sleep(self.delay)
+        self.uploads.append((namespace, [doc.page_content for doc in documents]))
+        self.store.add_documents(documents)
+
+
+class TestVectorMemoryWriter:
+    def test_batches_by_namespace(self):
+        service = RecordingVectorService()
+        writer = VectorMemoryWriter(service, batch_size=10, flush_interval=0.05)
+
+        writer.enqueue("a", [Document(page_content="one")])
+        writer.enqueue("b", [Document(page_content="two")])
+        writer.enqueue("a", [Document(page_content="three")])
+
+        assert writer.flush(timeout=5)
+        assert sorted(service.uploads) == [("a", ["one", "three"]), ("b", ["two"])]
+
+    def test_drops_when_queue_full(self):
+        service = RecordingVectorService(delay=0.2)
+        writer = VectorMemoryWriter(service, batch_size=1, flush_interval=0.01, queue_size=1)
+
+        for i in range(5):
+            writer.enqueue(None, [Document(page_content=str(i))])
+
+        assert writer.flush(timeout=5)
+        assert 1 <= len(service.uploads) < 5
+
+    def test_upload_failure_does_not_stop_writer(self):
+        class Flaky(RecordingVectorService):
+            def upload_documents(self, documents, namespace=None):
+                if namespace == "broken":
+                    raise ConnectionError("down")
+                super().upload_documents(documents, namespace)
+
+        service = Flaky()
+        writer = VectorMemoryWriter(service, batch_size=1, flush_interval=0.01)
+
+        writer.enqueue("broken", [Document(page_content="lost")])
+        writer.enqueue("ok", [Document(page_content="kept")])
+
+        assert writer.flush(timeout=5)
+        assert service.uploads == [("ok", ["kept"])]
+
+
+class TestWriteBehindAgentMemory:
+    @pytest.fixture
+    def service(self):
+        return RecordingVectorService(delay=0.3)
+
+    @pytest.fixture
+    def agent(self, service, tmp_path):
+        from agents.base_agent import BaseAgent
+        from storage_adapters.file_storage_adapter import FileStorageAdapter
+
+        return BaseAgent(
+            tools=[],
+            system_prompt="You are a helpful assistant",
+            llm=FakeLLM(),
+            session_id="write_behind",
+            storage_adapter=FileStorageAdapter(storage_dir=str(tmp_path)),
+            memory_config={
+                'short_term': True,
+                'vector_retriever': service.store.as_retriever(),
+                'memory_writer': VectorMemoryWriter(service, flush_interval=0.01),
+                'namespace': "ns",
+            },
+        )
+
+    @pytest.mark.asyncio
+    async def test_turn_is_written_off_the_request_path(self, agent, service):
+        start = time.perf_counter()
+        await agent.run("What is Python?")
+
+        assert time.perf_counter() - start < 0.3
+        assert service.uploads == []
+
+        writer = agent.memory.memories[1].writer
+        assert await asyncio.to_thread(writer.flush, 5)
+        assert service.uploads == [("ns", ["input: What is Python?\noutput: this is a first test response."])]
+
+        memory_vars = await agent.aload_memory("Python")
+        assert "What is Python?" in memory_vars["long_term_context"]
+        assert len(memory_vars["chat_history"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_history_read_overlaps_long_term_lookup(self, agent, service):
+        overlap = threading.Barrier(2, timeout=2)
+
+        original_load = agent.load_chat_history
+        agent.load_chat_history = lambda memory: (overlap.wait(), original_load(memory))
+
+        retriever = agent.memory.memories[1].retriever
+
+        class Waiting(type(retriever)):
+            async def _aget_relevant_documents(self, query, *, run_manager):
+                await asyncio.to_thread(overlap.wait)
+                return []
+
+        agent.memory.memories[1].retriever = Waiting(vectorstore=retriever.vectorstore)
+
+        # both sides wait on the barrier, so this only finishes if they run at the same time
+        memory_vars = await agent.aload_memory("anything")
+
+        assert memory_vars["long_term_context"] == ""
+        assert memory_vars["chat_history"] == []
@@ -0,0 +1,146 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_anthropic import ChatAnthropic
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.tools import tool
+from prometheus_client import REGISTRY
+
+from agents.research_agent import ResearchAgent
+from chains.query_decomposition_chain import QueryDecompositionChain
+from core.callbacks import metrics_callback
+from services.llm_service import llm_service
+
+
+class MockAnthropic(BaseHTTPRequestHandler):
+    """Messages API stand-in that reports a cache write for a new prefix and a cache read after that."""
+
+    requests = []
+    seen_prefixes = set()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append(body)
+
+        prefix = json.dumps([body.get("tools"), body.get("system")], sort_keys=True)
+        cached = prefix in self.seen_prefixes
+        self.seen_prefixes.add(prefix)
+
+        system_text = json.dumps(body.get("system"))
+        if "decompose it into" in system_text:
+            text = json.dumps({"sub_questions": ["a?", "b?"], "reasoning": "split"})
+        else:
+            text = "done"
+
+        usage = {
+            "input_tokens": 12,
+            "output_tokens": 3,
+            "cache_creation_input_tokens": 0 if cached else 500,
+            "cache_read_input_tokens": 500 if cached else 0,
+        }
+        message = {
+            "id": "msg_test",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        }
+
+        if body.get("stream"):
+            events = [
+                ("message_start", {"type": "message_start", "message": {**message, "content": [], "stop_reason": None}}),
+                ("content_block_start", {"type": "content_block_start", "index": 0,
+                                         "content_block": {"type": "text", "text": ""}}),
+                ("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                         "delta": {"type": "text_delta", "text": text}}),
+                ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                   "usage": usage}),
+                ("message_stop", {"type": "message_stop"}),
+            ]
+            payload = "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events).encode()
+            content_type = "text/event-stream"
+        else:
+            payload = json.dumps(message).encode()
+            content_type = "application/json"
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return "nothing"
+
+
+def cache_tokens(token_type: str) -> float:
+    return REGISTRY.get_sample_value("llm_tokens_total", {"model": "claude-mock", "type": token_type}) or 0.0
+
+
+class TestPromptCaching:
+    @pytest.fixture
+    def llm(self):
+        MockAnthropic.requests = []
+        MockAnthropic.seen_prefixes = set()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), MockAnthropic)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield ChatAnthropic(
+            model="claude-mock",
+            anthropic_api_url=f"http://127.0.0.1:{server.server_port}",
+            api_key="test",
+            max_retries=0,
+            callbacks=[metrics_callback],
+        )
+        server.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_agent_marks_tools_and_system_prompt(self, llm):
+        agent = ResearchAgent(tools=[lookup], llm=llm)
+        reads_before = cache_tokens("cache_read")
+        writes_before = cache_tokens("cache_write")
+
+        await agent.run("first question")
+        await agent.run("second question")
+
+        first, second = MockAnthropic.requests
+        assert first["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert first["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert first["system"] == second["system"]
+        assert first["messages"][-1]["content"] == "first question"
+
+        assert cache_tokens("cache_write") - writes_before == 500
+        assert cache_tokens("cache_read") - reads_before == 500
+
+    @pytest.mark.asyncio
+    async def test_decomposition_template_is_a_cached_system_prefix(self, llm):
+        class StubAgent:
+            async def research(self, query):
+                return {"output": f"answer {query}"}
+
+        chain = QueryDecompositionChain(llm=llm, research_agent=StubAgent())
+        await chain.arun("Compare X and Y")
+
+        decomposition, synthesis = MockAnthropic.requests
+        assert decomposition["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert "Compare X and Y" not in json.dumps(decomposition["system"])
+        assert "Compare X and Y" in json.dumps(decomposition["messages"])
+        assert synthesis["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+    def test_other_providers_get_plain_prompts(self):
+        llm = FakeListChatModel(responses=["ok"])
+
+        assert llm_service.cacheable_system_message("static", llm).content == "static"
+        assert llm_service.cacheable_tools([lookup], llm) == [lookup]
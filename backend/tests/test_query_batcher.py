@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.query_batcher import MicroBatchingEmbeddings
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return super().embed_documents(texts)
+
+
+class TestMicroBatchingEmbeddings:
+    @pytest.fixture
+    def inner(self):
+        return CountingEmbedding(size=8, calls=[])
+
+    def test_concurrent_queries_share_batches(self, inner):
+        batcher = MicroBatchingEmbeddings(inner, max_batch_size=16, max_wait_ms=50)
+        texts = [f"query {i}" for i in range(16)]
+        barrier = threading.Barrier(len(texts))
+
+        def query(text):
+            barrier.wait()
+            return batcher.embed_query(text)
+
+        with ThreadPoolExecutor(max_workers=len(texts)) as pool:
+            results = list(pool.map(query, texts))
+
+        assert results == [inner.embed_query(t) for t in texts]
+        assert sum(inner.calls) == len(texts)
+        assert len(inner.calls) < len(texts)
+
+    def test_batch_size_is_capped(self, inner):
+        batcher = MicroBatchingEmbeddings(inner, max_batch_size=4, max_wait_ms=50)
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(batcher.embed_query, [f"q{i}" for i in range(10)]))
+
+        assert max(inner.calls) <= 4
+
+    def test_duplicate_queries_encoded_once(self, inner):
+        batcher = MicroBatchingEmbeddings(inner, max_batch_size=8, max_wait_ms=50)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(batcher.embed_query, ["same"] * 8))
+
+        assert all(r == results[0] for r in results)
+        assert sum(inner.calls) < 8
+
+    @pytest.mark.asyncio
+    async def test_async_queries(self, inner):
+        batcher = MicroBatchingEmbeddings(inner, max_batch_size=8, max_wait_ms=20)
+
+        results = await asyncio.gather(*[batcher.aembed_query(f"q{i}") for i in range(5)])
+
+        assert results[2] == inner.embed_query("q2")
+        assert inner.calls[0] == 5
+
+    @pytest.mark.asyncio
+    async def test_cancelled_query_does_not_stall_the_batcher(self, inner):
+        batcher = MicroBatchingEmbeddings(inner, max_batch_size=8, max_wait_ms=50)
+
+        cancelled = asyncio.create_task(batcher.aembed_query("gone"))
+        kept = asyncio.create_task(batcher.aembed_query("kept"))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+
+        assert await asyncio.wait_for(kept, 1) == inner.embed_query("kept")
+        assert await asyncio.wait_for(batcher.aembed_query("next"), 1) == inner.embed_query("next")
+        assert batcher.worker.is_alive()
+        assert inner.calls[0] == 1
+
+    def test_errors_reach_every_caller(self):
+        class Broken(DeterministicFakeEmbedding):
+            def embed_documents(self, texts):
+                raise RuntimeError("model crashed")
+
+        batcher = MicroBatchingEmbeddings(Broken(size=8), max_wait_ms=1)
+
+        with pytest.raises(RuntimeError, match="model crashed"):
+            batcher.embed_query("anything")
@@ -0,0 +1,77 @@
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from services.query_router import QueryRouter, heuristic_route
+
+VOCAB = ["define", "latest", "compare", "cost", "news", "meaning"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """one dimension per vocabulary word plus a constant, enough to make prototypes separable"""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        words = text.lower().split()
+        return [float(sum(w.startswith(v) for w in words)) for v in VOCAB] + [0.1]
+
+
+class TestHeuristics:
+    @pytest.mark.parametrize("query, route", [
+        ("Compare the schedule of project A versus project B", "decompose"),
+        ("What failed? Who was responsible? What did it cost?", "decompose"),
+        ("What is the latest Python release?", "agent"),
+        ("What does the uploaded document say about budgets?", "agent"),
+        ("What is 17 * 23?", "direct"),
+        ("Define entropy", "direct"),
+    ])
+    def test_clear_cases(self, query, route):
+        assert heuristic_route(query).route == route
+
+    def test_ambiguous_query_has_no_heuristic_opinion(self):
+        assert heuristic_route("Tell me about the history of bridges in Azerbaijan") is None
+
+
+class TestQueryRouter:
+    @pytest.fixture
+    def router(self):
+        return QueryRouter(
+            embeddings=KeywordEmbeddings(),
+            prototypes={
+                "direct": ["define meaning", "meaning of"],
+                "agent": ["latest news", "news today"],
+                "decompose": ["compare cost", "cost compare"],
+            },
+        )
+
+    @pytest.mark.asyncio
+    async def test_classifier_handles_what_heuristics_skip(self, router):
+        decision = await router.route("give me the meaning of quorum", "research_harder", "decompose")
+
+        assert decision.route == "direct"
+        assert decision.source == "classifier"
+        assert decision.scores["direct"] > decision.scores["agent"]
+
+    @pytest.mark.asyncio
+    async def test_low_margin_falls_back_to_agent(self, router):
+        decision = await router.route("tell me a story about bridges", "research_harder", "decompose")
+
+        assert decision.route == "agent"
+        assert decision.source == "default"
+
+    @pytest.mark.asyncio
+    async def test_automatic_route_is_capped_by_endpoint(self, router):
+        decision = await router.route("Compare A versus B", "research", "agent")
+
+        assert decision.route == "agent"
+        assert "capped" in decision.reason
+
+    @pytest.mark.asyncio
+    async def test_override_wins(self, router):
+        decision = await router.route("Define entropy", "research", "agent", override="decompose")
+
+        assert decision.route == "decompose"
+        assert decision.source == "override"
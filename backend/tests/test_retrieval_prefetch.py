@@ -0,0 +1,136 @@
+from concurrent.futures import Future
+from typing import Any, List, Optional, Sequence
+from unittest.mock import patch
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from prometheus_client import REGISTRY
+
+from agents.base_agent import BaseAgent
+from core.context_vars import request_namespace
+from services.pinecone_vector_service import pinecone_vector_service
+from services.retrieval_prefetch import RetrievalPrefetch, query_overlap
+from tools.retriever import retrieve_context
+
+
+def sample(outcome):
+    return REGISTRY.get_sample_value("retrieval_prefetch_total", {"outcome": outcome}) or 0
+
+
+def done(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class RetrievingLLM(BaseChatModel):
+    """Asks for retrieve_context with tool_query on the first call, then answers."""
+    tool_query: str
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "retrieving"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        if self.calls == 1:
+            message = AIMessage(content="", tool_calls=[
+                {"name": "retrieve_context", "args": {"query": self.tool_query}, "id": "call-1"}
+            ])
+        else:
+            message = AIMessage(content="done")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class TestRetrievalPrefetch:
+    def test_query_overlap(self):
+        assert query_overlap("What is the bridge cost?", "bridge cost what is the") == 1.0
+        assert query_overlap("bridge cost", "what did the bridge cost") == 1.0
+        assert query_overlap("bridge cost", "bridge weather") == 0.5
+        assert query_overlap("", "bridge") == 0.0
+
+    def test_query_overlap_needs_the_same_entities(self):
+        assert query_overlap("what is the GDP of Germany", "what is the GDP of France") == 0.5
+        assert query_overlap("Ford", "Compare Tesla and Ford revenue growth") == 0.2
+        assert query_overlap("Can you tell me how much the bridge project cost?", "bridge project cost") == 0.75
+        assert query_overlap("what is the", "what is the") == 0.0
+
+        prefetch = RetrievalPrefetch("what is the GDP of Germany", "ns", done("docs"), min_overlap=0.6)
+        assert prefetch.take("what is the GDP of France", "ns") is None
+        assert prefetch.take("GDP of Germany", "ns") == "docs"
+
+    def test_take_once_when_query_and_namespace_match(self):
+        prefetch = RetrievalPrefetch("bridge cost overruns", "ns", done("docs"), min_overlap=0.6)
+        hits, misses = sample("hit"), sample("miss")
+
+        assert prefetch.take("football scores", "ns") is None
+        assert prefetch.take("bridge cost overruns", "other") is None
+        assert prefetch.take("the bridge cost overruns", "ns") == "docs"
+        assert prefetch.take("bridge cost overruns", "ns") is None
+
+        assert sample("hit") == hits + 1
+        assert sample("miss") == misses + 2
+
+    def test_failed_or_unused_prefetch(self):
+        failed = Future()
+        failed.set_exception(ConnectionError("index down"))
+        errors, wasted = sample("error"), sample("wasted")
+
+        assert RetrievalPrefetch("bridge", None, failed).take("bridge", None) is None
+
+        unused = RetrievalPrefetch("bridge", None, Future())
+        unused.finish()
+        unused.finish()
+
+        assert unused.future.cancelled()
+        assert sample("error") == errors + 1
+        assert sample("wasted") == wasted + 1
+
+
+class TestAgentPrefetch:
+    @pytest.fixture(autouse=True)
+    def seeded_namespace(self):
+        pinecone_vector_service.upload_documents(
+            [Document(page_content=f"The bridge cost report, part {i}.", metadata={"source": "report"}) for i in range(3)],
+            namespace="prefetch",
+        )
+        token = request_namespace.set("prefetch")
+        yield
+        request_namespace.reset(token)
+
+    async def run_agent(self, query: str, tool_query: str):
+        agent = BaseAgent(tools=[retrieve_context], system_prompt="You are a helpful assistant",
+                          llm=RetrievingLLM(tool_query=tool_query))
+        with patch.object(
+                pinecone_vector_service, "similarity_search_with_vectors",
+                wraps=pinecone_vector_service.similarity_search_with_vectors
+        ) as search:
+            result = await agent.run(query)
+        return result, search.call_count
+
+    @pytest.mark.asyncio
+    async def test_tool_served_from_prefetch(self):
+        hits = sample("hit")
+
+        result, searches = await self.run_agent("What did the bridge cost?", "bridge cost")
+
+        assert result["output"] == "done"
+        assert searches == 1
+        assert sample("hit") == hits + 1
+
+    @pytest.mark.asyncio
+    async def test_unrelated_tool_query_falls_back(self):
+        misses, wasted = sample("miss"), sample("wasted")
+
+        _, searches = await self.run_agent("What did the bridge cost?", "football results this weekend")
+
+        assert searches == 2
+        assert sample("miss") == misses + 1
+        assert sample("wasted") == wasted + 1
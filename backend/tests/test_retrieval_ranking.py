@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+
+from services.local_vector_service import LocalVectorService
+from services.retrieval_ranking import collapse_adjacent, diverse_search, merge_overlap, mmr_order
+from tests.test_context_compressor import KeywordEmbeddings
+
+SPLIT_TEXT = "The bridge cost was reviewed twice by the council. The steel budget was raised after the river survey."
+
+
+def chunk(text, source="bridge.pdf", **metadata):
+    return Document(page_content=text, metadata={"source": source, **metadata})
+
+
+class TestMMR:
+    def test_relevance_only_with_lambda_one(self):
+        vectors = [[0.2, 1.0], [1.0, 0.0], [0.9, 0.1]]
+
+        assert mmr_order([1.0, 0.0], vectors, k=3, lambda_mult=1.0) == [1, 2, 0]
+
+    def test_skips_near_duplicates(self):
+        # the second candidate is a copy of the first, the third is less relevant but new
+        vectors = [[1.0, 0.1], [1.0, 0.1], [0.6, 0.8]]
+
+        assert mmr_order([1.0, 0.2], vectors, k=2, lambda_mult=0.5) == [0, 2]
+        assert mmr_order([1.0, 0.2], [], k=2) == []
+
+
+class TestCollapse:
+    def test_merge_overlap(self):
+        first, second = SPLIT_TEXT[:60], SPLIT_TEXT[35:]
+
+        assert merge_overlap(first, second, min_overlap=20) == SPLIT_TEXT
+        assert merge_overlap(second, first, min_overlap=20) is None
+        assert merge_overlap(SPLIT_TEXT, SPLIT_TEXT[10:40]) == SPLIT_TEXT
+        assert merge_overlap("short", "unrelated text") is None
+
+    def test_collapses_neighbours_from_same_source_only(self):
+        documents = [
+            chunk(SPLIT_TEXT[35:], page=1),
+            chunk("Football results from the weekend are in.", source="sport.txt"),
+            chunk(SPLIT_TEXT[:60], page=1),
+            chunk(SPLIT_TEXT[:60], page=2),
+            chunk("Another unrelated chunk about the weather.", source="weather.txt"),
+        ]
+
+        results = collapse_adjacent(documents, k=3)
+
+        assert [doc.page_content for doc in results] == [SPLIT_TEXT, documents[1].page_content, SPLIT_TEXT[:60]]
+        assert results[0].metadata == {"source": "bridge.pdf", "page": 1, "merged_chunks": 2}
+
+    def test_respects_max_chars(self):
+        documents = [chunk(SPLIT_TEXT[35:]), chunk(SPLIT_TEXT[:60])]
+
+        assert len(collapse_adjacent(documents, k=2, max_chars=50)) == 2
+
+
+class TestDiverseSearch:
+    def test_over_fetches_and_diversifies(self):
+        service = LocalVectorService()
+        service.embeddings = KeywordEmbeddings()
+        texts = [
+            "bridge cost bridge cost",
+            "bridge cost bridge cost bridge",
+            "bridge cost bridge cost bridge cost",
+            "bridge budget steel river",
+            "football match goal",
+        ]
+        service.upload_documents([chunk(text, source=f"doc{i}") for i, text in enumerate(texts)], namespace="ns")
+        query_vector = service.embeddings.embed_query("bridge cost budget")
+
+        plain = service.similarity_search_by_vector(query_vector, k=2, namespace="ns")
+        diverse = diverse_search(service, query_vector, k=2, fetch_k=5, lambda_mult=0.5, namespace="ns")
+
+        assert all(doc.page_content.startswith("bridge cost") for doc in plain)
+        assert "bridge budget steel river" in [doc.page_content for doc in diverse]
+        assert diverse_search(service, query_vector, namespace="empty") == []
+
+    def test_filter_is_passed_through(self):
+        service = LocalVectorService()
+        service.embeddings = KeywordEmbeddings()
+        service.upload_documents([chunk("bridge cost", source="a"), chunk("bridge budget", source="b")])
+
+        results = diverse_search(service, service.embeddings.embed_query("bridge"), k=2, filter={"source": "b"})
+
+        assert [doc.metadata["source"] for doc in results] == ["b"]
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from services.session_cache import SessionAgentCache
+
+
+class FakeAgent:
+    def __init__(self, session_id, config):
+        self.session_id = session_id
+        self.config = config
+        self.saves = 0
+        self.running = 0
+        self.max_running = 0
+
+    def save_chat_history(self):
+        self.saves += 1
+
+    async def research(self, query):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.02)
+        self.running -= 1
+        return {"output": query}
+
+
+class TestSessionAgentCache:
+    @pytest.fixture
+    def built(self):
+        return []
+
+    @pytest.fixture
+    def make_cache(self, built):
+        def factory(session_id, config):
+            agent = FakeAgent(session_id, config)
+            built.append(agent)
+            return agent
+
+        def make(**kwargs):
+            kwargs.setdefault("agent_bytes", 1)
+            return SessionAgentCache(factory, **kwargs)
+        return make
+
+    @pytest.mark.asyncio
+    async def test_reuses_agent_per_session(self, make_cache, built):
+        cache = make_cache()
+
+        for _ in range(3):
+            async with cache.session("s1", ("ns", 6)) as agent:
+                await agent.research("hi")
+        async with cache.session("s2", ("ns", 6)):
+            pass
+
+        assert [agent.session_id for agent in built] == ["s1", "s2"]
+
+    @pytest.mark.asyncio
+    async def test_write_through_after_each_turn(self, make_cache, built):
+        cache = make_cache(idle_ttl=0.05)
+
+        async with cache.session("s1", None):
+            pass
+        await cache.wait_for_writes()
+        assert built[0].saves == 1
+
+        async with cache.session("s1", None):
+            pass
+        await cache.wait_for_writes()
+        assert built[0].saves == 2
+
+        # nothing left to write on eviction
+        await asyncio.sleep(0.1)
+        await cache.evict()
+        assert "s1" not in cache.entries
+        assert built[0].saves == 2
+
+    @pytest.mark.asyncio
+    async def test_deferred_writes_only_on_eviction(self, make_cache, built):
+        cache = make_cache(write_through=False)
+
+        for _ in range(3):
+            async with cache.session("s1", None):
+                pass
+        assert built[0].saves == 0
+
+        await cache.close()
+        assert built[0].saves == 1
+
+    @pytest.mark.asyncio
+    async def test_same_session_serialises_other_sessions_overlap(self, make_cache, built):
+        cache = make_cache()
+
+        async def send(session_id):
+            async with cache.session(session_id, None) as agent:
+                await agent.research("hi")
+
+        await asyncio.gather(*(send("a") for _ in range(4)), *(send(f"b{i}") for i in range(4)))
+
+        agent_a = next(agent for agent in built if agent.session_id == "a")
+        assert agent_a.max_running == 1
+        assert len(built) == 5
+
+    @pytest.mark.asyncio
+    async def test_idle_sessions_flushed_and_evicted(self, make_cache, built):
+        cache = make_cache(idle_ttl=0.05, write_through=False)
+        async with cache.session("s1", None):
+            pass
+
+        await asyncio.sleep(0.1)
+        await cache.evict()
+
+        assert "s1" not in cache.entries
+        assert built[0].saves == 1
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_count_and_bytes(self, make_cache, built):
+        cache = make_cache(max_sessions=2, write_through=False)
+        for session_id in ("s1", "s2", "s1", "s3"):
+            async with cache.session(session_id, None):
+                pass
+        assert list(cache.entries) == ["s1", "s3"]
+        assert built[1].saves == 1
+
+        cache = make_cache(max_bytes=250, agent_bytes=100)
+        for session_id in ("s4", "s5", "s6"):
+            async with cache.session(session_id, None):
+                pass
+        assert list(cache.entries) == ["s5", "s6"]
+
+    @pytest.mark.asyncio
+    async def test_session_in_use_is_not_evicted(self, make_cache, built):
+        cache = make_cache(max_sessions=1)
+
+        async with cache.session("busy", None):
+            async with cache.session("other", None):
+                pass
+            assert "busy" in cache.entries
+
+    @pytest.mark.asyncio
+    async def test_config_change_rebuilds_after_flush(self, make_cache, built):
+        cache = make_cache(write_through=False)
+        async with cache.session("s1", ("ns-a", 6)):
+            pass
+        async with cache.session("s1", ("ns-b", 6)) as agent:
+            assert agent.config == ("ns-b", 6)
+
+        assert len(built) == 2
+        assert built[0].saves == 1
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_everything(self, make_cache, built):
+        cache = make_cache()
+        await cache.start()
+        for session_id in ("s1", "s2"):
+            async with cache.session(session_id, None):
+                pass
+
+        await cache.close()
+
+        assert cache.entries == {}
+        assert [agent.saves for agent in built] == [1, 1]
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from core.singleflight import SingleFlight, normalize_query
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_duplicates_share_one_run(self):
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(10)])
+
+        assert results == ["answer"] * 10
+        assert calls == 1
+        assert flight.in_flight == {}
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        flight = SingleFlight("test")
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2)))
+
+        assert results == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_and_are_not_cached(self):
+        flight = SingleFlight("test", result_ttl=60)
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        with pytest.raises(RuntimeError):
+            await flight.do("k", fail)
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_result_cache_covers_late_duplicates(self):
+        flight = SingleFlight("test", result_ttl=0.05)
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await flight.do("k", work) == 1
+        assert await flight.do("k", work) == 1
+        await asyncio.sleep(0.06)
+        assert await flight.do("k", work) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_follower_does_not_cancel_run(self):
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+
+        assert await leader == "done"
+
+    def test_normalize_query(self):
+        assert normalize_query("  What IS\tthe  answer ") == normalize_query("what is the answer")
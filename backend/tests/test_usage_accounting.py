@@ -0,0 +1,179 @@
+import asyncio
+from typing import Any, List, Optional, Sequence
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from prometheus_client import REGISTRY
+
+from agents.base_agent import BaseAgent
+from api.routes import chat_routes
+from services import usage_accounting
+from services.llm_router import BackendHealth, RoutingChatModel
+from services.usage_accounting import BudgetExceeded, UsageCallbackHandler, UsageTracker, usage_scope
+
+PRICING = {
+    "claude-haiku-4-5": {"input": 1.0, "output": 5.0, "cache_read": 0.1, "cache_write": 1.25},
+    "claude": {"input": 100.0, "output": 100.0},
+}
+
+
+class MeteredLLM(BaseChatModel):
+    """Reports fixed token usage; keeps calling the ping tool if looping."""
+    model: str = "claude-haiku-4-5-20251001"
+    looping: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "metered"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        usage = {"input_tokens": 1000, "output_tokens": 100, "total_tokens": 1100}
+        if self.looping:
+            message = AIMessage(content="", usage_metadata=usage, tool_calls=[
+                {"name": "ping", "args": {}, "id": f"call-{self.calls}"}
+            ])
+        else:
+            message = AIMessage(content="pong", usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class SlowMeteredLLM(MeteredLLM):
+    delay: float = 0.0
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return self._generate(messages, stop, run_manager, **kwargs)
+
+
+@tool
+def ping() -> str:
+    """Ping."""
+    return "pong"
+
+
+def make_tracker(**kwargs) -> UsageTracker:
+    kwargs.setdefault("budgets", {})
+    return UsageTracker(":memory:", pricing=PRICING, **kwargs)
+
+
+def usage(input=0, output=0, cache_read=0, cache_write=0):
+    return {"input": input, "output": output, "cache_read": cache_read, "cache_write": cache_write}
+
+
+class TestUsageTracker:
+    def test_cost_uses_longest_price_and_cache_rates(self):
+        tracker = make_tracker()
+
+        # 1000 uncached input at $1/M, 500 output at $5/M, 2000 cache reads at $0.1/M, 1000 cache writes at $1.25/M
+        cost = tracker.cost("claude-haiku-4-5-20251001", usage(4000, 500, cache_read=2000, cache_write=1000))
+
+        assert cost == pytest.approx((1000 * 1.0 + 500 * 5.0 + 2000 * 0.1 + 1000 * 1.25) / 1_000_000)
+        assert tracker.cost("claude-opus", usage(1_000_000)) == pytest.approx(100.0)
+        assert tracker.cost("llama3.1:8b", usage(1_000_000, 1_000_000)) == 0.0
+
+    def test_summary_and_budgets(self):
+        tracker = make_tracker(budgets={"team-a": 1.0})
+        first = tracker.open_scope("/api/agents/research", "team-a")
+        second = tracker.open_scope("/api/agents/chat_agentically", "team-a", session_id="s1")
+        tracker.record(first, "claude-haiku-4-5", usage(100_000, 10_000))
+        tracker.record(first, "claude-haiku-4-5", usage(100_000, 10_000))
+        tracker.record(second, "claude-haiku-4-5", usage(100_000))
+        tracker.record(None, "llama3.1:8b", usage(50))
+
+        by_namespace = {row.key: row for row in tracker.summary("namespace")}
+        assert by_namespace["team-a"].requests == 2 and by_namespace["team-a"].calls == 3
+        assert by_namespace["team-a"].input_tokens == 300_000
+        assert by_namespace["team-a"].cost == pytest.approx(0.4)
+        assert by_namespace[None].cost == 0.0
+        assert [row.key for row in tracker.summary("session", namespace="team-a")] == [None, "s1"]
+        assert first.cost == pytest.approx(0.3) and first.tokens["output"] == 20_000
+
+        statuses = {status.namespace: status for status in tracker.budget_statuses()}
+        assert statuses["team-a"].remaining == pytest.approx(0.6)
+        assert statuses[None].budget is None
+
+    def test_open_scope_rejects_exhausted_namespace(self):
+        tracker = make_tracker(budgets={"team-a": 0.1}, default_budget=10.0)
+        tracker.record(tracker.open_scope("/api/chat/chat", "team-a"), "claude-haiku-4-5", usage(100_000))
+
+        with pytest.raises(BudgetExceeded):
+            tracker.open_scope("/api/chat/chat", "team-a")
+        assert tracker.open_scope("/api/chat/chat", "team-a", enforce=False).spent_before == pytest.approx(0.1)
+        assert tracker.open_scope("/api/chat/chat", "team-b").budget == 10.0
+
+
+class TestUsageCallback:
+    @pytest.mark.asyncio
+    async def test_calls_attributed_to_scope(self):
+        tracker = make_tracker()
+        llm = MeteredLLM(callbacks=[UsageCallbackHandler(tracker)])
+
+        with patch.object(usage_accounting, "usage_tracker", tracker):
+            with usage_scope("/api/chat/chat", "team-a", session_id="s1") as scope:
+                await llm.ainvoke([HumanMessage(content="ping")])
+                llm.invoke([HumanMessage(content="ping")])
+
+        [row] = tracker.summary("request")
+        assert row.key == scope.request_id and row.calls == 2
+        assert tracker.summary("model")[0].key == "claude-haiku-4-5-20251001"
+        assert scope.tokens["input"] == 2000
+
+    @pytest.mark.asyncio
+    async def test_agent_loop_capped_when_over_budget(self):
+        tracker = make_tracker(request_max_cost=0.002)
+        llm = MeteredLLM(looping=True, callbacks=[UsageCallbackHandler(tracker)])
+        agent = BaseAgent(tools=[ping], system_prompt="ping forever", llm=llm, max_iterations=10)
+
+        with patch.object(usage_accounting, "usage_tracker", tracker):
+            with usage_scope("/api/agents/research", "team-a") as scope:
+                result = await agent.run("go")
+
+        # each call costs $0.0015, so the second one crosses the per-request cap
+        assert llm.calls == 2
+        assert scope.over_budget()
+        assert "stopped" in result["output"]
+
+    @pytest.mark.asyncio
+    async def test_route_returns_429_over_budget(self):
+        tracker = make_tracker(default_budget=0.0)
+        app = FastAPI()
+        app.include_router(chat_routes.router, prefix="/api/chat")
+
+        with patch.object(usage_accounting, "usage_tracker", tracker):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.post("/api/chat/chat", json={"messages": [{"role": "user", "content": "hi"}]})
+
+        assert response.status_code == 429
+        assert "budget" in response.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_hedge_loser_released(self):
+        tracker = make_tracker()
+        handler = UsageCallbackHandler(tracker)
+        slow = SlowMeteredLLM(model="claude-slow", delay=0.5, callbacks=[handler])
+        fast = SlowMeteredLLM(callbacks=[handler])
+        router = RoutingChatModel(
+            backends=[slow, fast],
+            health=[BackendHealth("slow"), BackendHealth("fast")],
+            hedge_delay=0.02,
+        )
+        unaccounted = REGISTRY.get_sample_value("llm_unaccounted_calls_total", {"model": "claude-slow"}) or 0
+
+        with patch.object(usage_accounting, "usage_tracker", tracker):
+            with usage_scope("/api/chat/chat", "team-a"):
+                await router.ainvoke([HumanMessage(content="ping")])
+
+        assert [row.key for row in tracker.summary("model")] == ["claude-haiku-4-5-20251001"]
+        assert handler.runs == {}
+        assert REGISTRY.get_sample_value("llm_unaccounted_calls_total", {"model": "claude-slow"}) == unaccounted + 1
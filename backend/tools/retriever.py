@@ -1,17 +1,60 @@
+import logging
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
 from langchain_core.tools import tool
 
-from core.context_vars import request_namespace
+from core.config import settings
+from core.context_vars import request_namespace, retrieval_prefetch
+from core.metrics import RETRIEVAL_CONTEXT_CHARS
+from services.context_compressor import ContextCompressor
 from services.pinecone_vector_service import pinecone_vector_service
+from services.retrieval_ranking import diverse_search
+
+logger = logging.getLogger(__name__)
+
+context_compressor = ContextCompressor(pinecone_vector_service.embeddings)
+
+
+def serialize_documents(documents: List[Document]) -> str:
+    return "\n\n".join(
+        (f"Source: {doc.metadata}\nContent: {doc.page_content}")
+        for doc in documents
+    )
+
+
+def fetch_documents(query: str, namespace: Optional[str]) -> Tuple[List[float], List[Document]]:
+    # embedded once, for the search and for scoring sentences during compression
+    query_vector = pinecone_vector_service.embeddings.embed_query(query)
+    if settings.RETRIEVER_SEARCH_TYPE == "mmr":
+        retrieved_docs = diverse_search(pinecone_vector_service, query_vector, namespace=namespace)
+    else:
+        retrieved_docs = pinecone_vector_service.similarity_search_by_vector(
+            query_vector, k=settings.RETRIEVER_K, namespace=namespace
+        )
+    return query_vector, retrieved_docs
 
 
 @tool(response_format="content_and_artifact")
 def retrieve_context(query: str):
     """Retrieve relevant context from the vector database based on the query."""
     namespace = request_namespace.get()
-    print(namespace)
-    retrieved_docs = pinecone_vector_service.similarity_search(query, k=3, namespace=namespace)
-    serialized = "\n\n".join(
-        (f"Source: {doc.metadata}\nContent: {doc.page_content}")
-        for doc in retrieved_docs
-    )
+    logger.debug("retrieving context from namespace %s", namespace)
+
+    prefetch = retrieval_prefetch.get()
+    fetched = prefetch.take(query, namespace) if prefetch else None
+    if fetched is None:
+        query_vector, retrieved_docs = fetch_documents(query, namespace)
+    else:
+        query_vector, retrieved_docs = fetched
+        if not prefetch.same_query(query):
+            # close enough to reuse the documents, but sentences are scored against what was asked
+            query_vector = None
+
+    serialized = serialize_documents(retrieved_docs)
+    RETRIEVAL_CONTEXT_CHARS.labels("raw").observe(len(serialized))
+    if settings.CONTEXT_COMPRESSION_ENABLED:
+        serialized = context_compressor.compress_to_text(query, retrieved_docs, query_vector)
+        RETRIEVAL_CONTEXT_CHARS.labels("compressed").observe(len(serialized))
+    # the full chunks stay available as the artifact, which is not sent to the model
     return serialized, retrieved_docs